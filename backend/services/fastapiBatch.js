@@ -0,0 +1,136 @@
+const axios = require('axios');
+
+/**
+ * Packed binary batch client for the FastAPI /batch/packed endpoint.
+ * Sends many fare / ETA / geofence queries in one request instead of one
+ * JSON request per estimate. Layouts (all little-endian) mirror
+ * fastapi/app/services/packed_batch.py.
+ */
+
+const OP_FARE = 1;
+const OP_ETA = 2;
+const OP_GEOFENCE = 4;
+
+const STATUS_OK = 0;
+const STATUS_UNSERVICEABLE = 1;
+const STATUS_INVALID = 2;
+
+const QUERY_SIZE = 56;
+const RESULT_HEADER_SIZE = 48;
+
+/**
+ * Encode queries into a request frame
+ * @param {Array<Object>} queries - { op, origin: {lat, lng}, destination?, timestamp? (ms or Date), traffic_level? }
+ * @returns {Buffer}
+ */
+function encodeQueries(queries) {
+  const buffer = Buffer.alloc(queries.length * QUERY_SIZE);
+  queries.forEach((query, i) => {
+    const offset = i * QUERY_SIZE;
+    const destination = query.destination || query.origin;
+    const timestamp = query.timestamp ? new Date(query.timestamp).getTime() / 1000 : 0;
+    buffer.writeUInt32LE(query.op, offset);
+    buffer.writeUInt32LE(0, offset + 4);
+    buffer.writeDoubleLE(query.origin.lat, offset + 8);
+    buffer.writeDoubleLE(query.origin.lng, offset + 16);
+    buffer.writeDoubleLE(destination.lat, offset + 24);
+    buffer.writeDoubleLE(destination.lng, offset + 32);
+    buffer.writeDoubleLE(timestamp, offset + 40);
+    buffer.writeDoubleLE(query.traffic_level || 0, offset + 48);
+  });
+  return buffer;
+}
+
+function fenceIds(bits, geofences) {
+  return geofences.filter((_, i) => (bits >>> i) & 1);
+}
+
+function orNull(value) {
+  return Number.isNaN(value) ? null : value;
+}
+
+/**
+ * Decode a response frame
+ * @param {Buffer} body - Response body
+ * @param {string[]} vehicleTypes - From the X-Vehicle-Types header
+ * @param {string[]} geofences - From the X-Geofences header
+ * @returns {Array<Object>} One result per query, in order
+ */
+function decodeResults(body, vehicleTypes, geofences = []) {
+  const recordSize = RESULT_HEADER_SIZE + 8 * vehicleTypes.length;
+  const results = [];
+  for (let offset = 0; offset + recordSize <= body.length; offset += recordSize) {
+    const fares = {};
+    vehicleTypes.forEach((type, v) => {
+      const fare = body.readDoubleLE(offset + RESULT_HEADER_SIZE + 8 * v);
+      if (!Number.isNaN(fare)) fares[type] = fare;
+    });
+    results.push({
+      status: body.readUInt32LE(offset),
+      origin_zones: fenceIds(body.readUInt32LE(offset + 4), geofences),
+      destination_zones: fenceIds(body.readUInt32LE(offset + 8), geofences),
+      eta_seconds: orNull(body.readDoubleLE(offset + 16)),
+      confidence: orNull(body.readDoubleLE(offset + 24)),
+      distance_km: orNull(body.readDoubleLE(offset + 32)),
+      duration_min: orNull(body.readDoubleLE(offset + 40)),
+      fares
+    });
+  }
+  return results;
+}
+
+class FastAPIBatchClient {
+  constructor() {
+    this.baseURL = process.env.FASTAPI_URL || 'http://localhost:8001';
+    this.client = axios.create({
+      baseURL: this.baseURL,
+      timeout: 5000,
+      headers: {
+        'Content-Type': 'application/octet-stream'
+      },
+      responseType: 'arraybuffer'
+    });
+  }
+
+  /**
+   * Answer many queries in one round trip
+   * @param {Array<Object>} queries - See encodeQueries
+   * @returns {Promise<Object>} { results, currency, rules_version }
+   */
+  async estimate(queries) {
+    const response = await this.client.post('/batch/packed', encodeQueries(queries));
+    const split = (header) => (header ? header.split(',') : []);
+    return {
+      results: decodeResults(
+        Buffer.from(response.data),
+        split(response.headers['x-vehicle-types']),
+        split(response.headers['x-geofences'])
+      ),
+      currency: response.headers['x-currency'],
+      rules_version: response.headers['x-rules-version']
+    };
+  }
+
+  /**
+   * Fare quotes and ETAs for several trips at once
+   * @param {Array<Object>} trips - { origin, destination, traffic_level? }
+   * @returns {Promise<Array<Object>>} Results aligned with trips
+   */
+  async estimateTrips(trips) {
+    const now = Date.now();
+    const { results } = await this.estimate(
+      trips.map((trip) => ({ ...trip, op: OP_FARE | OP_ETA, timestamp: now }))
+    );
+    return results;
+  }
+}
+
+module.exports = new FastAPIBatchClient();
+module.exports.encodeQueries = encodeQueries;
+module.exports.decodeResults = decodeResults;
+module.exports.OP_FARE = OP_FARE;
+module.exports.OP_ETA = OP_ETA;
+module.exports.OP_GEOFENCE = OP_GEOFENCE;
+module.exports.STATUS_OK = STATUS_OK;
+module.exports.STATUS_UNSERVICEABLE = STATUS_UNSERVICEABLE;
+module.exports.STATUS_INVALID = STATUS_INVALID;
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from app.services.packed_batch import MEDIA_TYPE, decode_queries, answer_queries
+from app.core.config import settings
+from app.core.logging import get_logger
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+logger = get_logger(__name__)
+
+
+@router.post(
+    "/packed",
+    response_class=Response,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+    }}},
+    responses={200: {"content": {MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}}}}
+)
+async def packed_batch(request: Request):
+    """
+    Answer many fare, ETA and geofence queries from one packed binary frame.
+    
+    The body is a sequence of fixed 56-byte little-endian query records and
+    the response one result record per query, in order (see
+    `app/services/packed_batch.py` for the layouts). Response headers give
+    the vehicle type order of the fare columns (`X-Vehicle-Types`), the
+    fence bit order (`X-Geofences`), `X-Rules-Version`, `X-Currency` and
+    `X-Record-Size`.
+    """
+    body = await request.body()
+    try:
+        queries = decode_queries(body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    if len(queries) > settings.packed_batch_max_queries:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.packed_batch_max_queries} queries")
+    
+    try:
+        results, metadata = answer_queries(queries)
+    except Exception as e:
+        logger.error(f"Packed batch error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Packed batch failed: {str(e)}")
+    
+    return Response(
+        content=results.tobytes(),
+        media_type=MEDIA_TYPE,
+        headers={
+            "X-Vehicle-Types": metadata["vehicle_types"],
+            "X-Geofences": metadata["geofences"],
+            "X-Rules-Version": metadata["rules_version"],
+            "X-Currency": metadata["currency"],
+            "X-Record-Size": str(results.dtype.itemsize),
+        }
+    )
@@ -0,0 +1,44 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.schemas.response import NearbyDriversResponse
+from app.services.driver_index import get_driver_index, nearest_by_eta
+from app.core.config import settings
+from app.core.logging import get_logger
+
+router = APIRouter(prefix="/drivers", tags=["Drivers"])
+logger = get_logger(__name__)
+
+
+@router.get("/nearest", response_model=NearbyDriversResponse)
+async def nearest_drivers(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=100),
+    radius_km: Optional[float] = Query(None, gt=0, le=50),
+    vehicle_type: Optional[str] = None,
+    by: Literal["distance", "eta"] = "distance"
+):
+    """
+    Find the nearest online drivers to a pickup point.
+    
+    - **k**: Number of drivers to return
+    - **radius_km**: Search radius (default `DRIVER_INDEX_MAX_KM`)
+    - **vehicle_type**: Only drivers of this vehicle type
+    - **by**: `distance` (straight line) or `eta` (predicted pickup ETA)
+    
+    Served from the in-process driver index kept current by driver
+    location events; drivers that stop reporting drop out after
+    `DRIVER_INDEX_TTL_S`.
+    """
+    if not settings.driver_index_enabled:
+        raise HTTPException(status_code=503, detail="Driver index is disabled")
+    index = get_driver_index()
+    try:
+        if by == "eta":
+            drivers = nearest_by_eta(index, lat, lng, k, vehicle_type, radius_km)
+        else:
+            drivers = index.nearest(lat, lng, k, radius_km, vehicle_type)
+        return NearbyDriversResponse(drivers=drivers, online=len(index))
+    except Exception as e:
+        logger.error(f"Nearest driver query error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Nearest driver query failed: {str(e)}")
@@ -1,16 +1,35 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from app.schemas.request import ETARequest, AsyncJobRequest
 from app.schemas.response import ETAResponse, AsyncJobResponse, AsyncJobStatusResponse
-from app.services.eta_service import predict_eta
+from app.services.eta_service import predict_eta_json
+from app.services.model_manager import get_model_manager
 from app.tasks.tasks import async_eta_prediction_task
+from app.tasks.celery_app import app as celery_app
+from app.utils.job_events import get_job_notifier
+from app.utils.redis_client import cache_get, generate_eta_key, TTL_ETA
+from app.utils.fast_json import RawJSONResponse, json_body_openapi
+from app.utils import single_flight
+from app.core.config import settings
 from app.core.logging import get_logger
+from celery import states
+import asyncio
+import uuid
 
 router = APIRouter(prefix="/predict", tags=["ETA Prediction"])
 logger = get_logger(__name__)
 
+TERMINAL_JOB_STATUSES = {"completed", "failed", "revoked"}
 
-@router.post("/eta", response_model=ETAResponse)
-async def predict_eta_endpoint(request: ETARequest):
+
+@router.post(
+    "/eta",
+    response_model=ETAResponse,
+    response_class=RawJSONResponse,
+    openapi_extra=json_body_openapi(ETARequest)
+)
+async def predict_eta_endpoint(request: Request):
     """
     Predict estimated time of arrival (ETA) for a ride.
     
@@ -20,29 +39,84 @@ async def predict_eta_endpoint(request: ETARequest):
     - **traffic_level**: Optional traffic multiplier (1.0 = normal)
     - **historical_mean_eta**: Optional historical average ETA in seconds
     
-    Returns ETA in seconds and confidence score.
+    Returns ETA in seconds and confidence score. The body is validated
+    straight from its JSON and the response is sent pre-encoded (verbatim
+    from cache on a hit).
     """
     try:
-        result = predict_eta(request.dict())
-        return result
+        payload = ETARequest.model_validate_json(await request.body()).model_dump()
+    except ValidationError as e:
+        # Inputs are left out: for malformed JSON it is the raw body bytes
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+    
+    try:
+        return RawJSONResponse(predict_eta_json(payload))
     except Exception as e:
         logger.error(f"ETA prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"ETA prediction failed: {str(e)}")
 
 
+@router.get("/models")
+async def model_stats():
+    """
+    Per-region model statistics.
+    
+    Reports which region models are loaded, their size against the
+    `MODEL_CACHE_MAX_MB` budget, and per-region cache hits, loads, load
+    errors, cumulative load time and evictions.
+    """
+    return get_model_manager().stats()
+
+
 @router.post("/eta/async", response_model=AsyncJobResponse)
 async def predict_eta_async(request: AsyncJobRequest):
     """
     Queue an async ETA prediction job.
     
+    Identical requests are coalesced: if the prediction is already cached
+    the job completes immediately with the result attached, and if an
+    identical job is already queued or running its job ID is returned
+    instead of enqueuing a new one.
+    
     Returns a job ID that can be used to poll for results.
     """
     try:
+        payload = request.model_dump()
+        cache_key = generate_eta_key(payload["origin"], payload["destination"], payload.get("traffic_level") or 1.0)
+        job_id = str(uuid.uuid4())
+        
+        cached = cache_get(cache_key)
+        if cached:
+            result = {'status': 'completed', **cached}
+            try:
+                celery_app.backend.store_result(job_id, result, states.SUCCESS)
+            except Exception as e:
+                logger.warning(f"Could not record cached ETA job {job_id}: {e}")
+            return AsyncJobResponse(
+                job_id=job_id,
+                status="completed",
+                message="ETA prediction served from cache",
+                result=ETAResponse(**cached)
+            )
+        
+        existing_id = single_flight.claim(cache_key, job_id, TTL_ETA)
+        if existing_id:
+            logger.info(f"Coalesced async ETA request onto job {existing_id}")
+            return AsyncJobResponse(
+                job_id=existing_id,
+                status="pending",
+                message="Identical ETA prediction job already queued"
+            )
+        
         # Submit async task to Celery
-        task = async_eta_prediction_task.delay(request.dict())
+        try:
+            async_eta_prediction_task.apply_async(args=[payload], task_id=job_id)
+        except Exception:
+            single_flight.release(cache_key, job_id)
+            raise
         
         return AsyncJobResponse(
-            job_id=task.id,
+            job_id=job_id,
             status="pending",
             message="ETA prediction job queued successfully"
         )
@@ -51,48 +125,103 @@ async def predict_eta_async(request: AsyncJobRequest):
         raise HTTPException(status_code=500, detail=f"Job submission failed: {str(e)}")
 
 
+def _job_status(job_id: str) -> AsyncJobStatusResponse:
+    """Build the status response for an async ETA job from the result backend."""
+    task = celery_app.AsyncResult(job_id)
+    
+    if task.state == 'PENDING':
+        return AsyncJobStatusResponse(job_id=job_id, status="pending")
+    elif task.state in ('STARTED', 'PROGRESS'):
+        return AsyncJobStatusResponse(job_id=job_id, status="processing")
+    elif task.state == 'SUCCESS':
+        result = task.result
+        if result.get('status') == 'completed':
+            return AsyncJobStatusResponse(
+                job_id=job_id,
+                status="completed",
+                result=ETAResponse(
+                    eta_seconds=result['eta_seconds'],
+                    confidence=result['confidence']
+                )
+            )
+        else:
+            return AsyncJobStatusResponse(
+                job_id=job_id,
+                status="failed",
+                error=result.get('error', 'Unknown error')
+            )
+    elif task.state == 'FAILURE':
+        return AsyncJobStatusResponse(
+            job_id=job_id,
+            status="failed",
+            error=str(task.info)
+        )
+    else:
+        return AsyncJobStatusResponse(job_id=job_id, status=task.state.lower())
+
+
+def _job_ready(job_id: str) -> bool:
+    return celery_app.AsyncResult(job_id).ready()
+
+
 @router.get("/eta/status/{job_id}", response_model=AsyncJobStatusResponse)
-async def get_eta_job_status(job_id: str):
+async def get_eta_job_status(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=settings.job_wait_max_s, description="Seconds to wait for completion")
+):
     """
     Get status of an async ETA prediction job.
     
     - **job_id**: Job ID returned from /predict/eta/async
+    - **wait**: Long-poll for up to this many seconds; returns as soon as the job finishes
     """
     try:
-        from app.tasks.celery_app import app as celery_app
-        
-        task = celery_app.AsyncResult(job_id)
+        if wait > 0:
+            await get_job_notifier().wait_for(job_id, wait, lambda: _job_ready(job_id))
         
-        if task.state == 'PENDING':
-            return AsyncJobStatusResponse(job_id=job_id, status="pending")
-        elif task.state == 'PROGRESS':
-            return AsyncJobStatusResponse(job_id=job_id, status="processing")
-        elif task.state == 'SUCCESS':
-            result = task.result
-            if result.get('status') == 'completed':
-                return AsyncJobStatusResponse(
-                    job_id=job_id,
-                    status="completed",
-                    result=ETAResponse(
-                        eta_seconds=result['eta_seconds'],
-                        confidence=result['confidence']
-                    )
-                )
-            else:
-                return AsyncJobStatusResponse(
-                    job_id=job_id,
-                    status="failed",
-                    error=result.get('error', 'Unknown error')
-                )
-        elif task.state == 'FAILURE':
-            return AsyncJobStatusResponse(
-                job_id=job_id,
-                status="failed",
-                error=str(task.info)
-            )
-        else:
-            return AsyncJobStatusResponse(job_id=job_id, status=task.state.lower())
+        return await asyncio.to_thread(_job_status, job_id)
             
     except Exception as e:
         logger.error(f"Job status check error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Status check failed: {str(e)}")
+
+
+@router.get("/eta/stream/{job_id}")
+async def stream_eta_job_status(job_id: str):
+    """
+    Stream status of an async ETA prediction job as Server-Sent Events.
+    
+    Sends the current status immediately and the final status as soon as
+    the job finishes, then closes. Comment lines are sent as keep-alives.
+    Result backend reads run in worker threads so open streams do not
+    block the event loop.
+    """
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.job_stream_timeout_s
+        notifier = get_job_notifier()
+        
+        status = await asyncio.to_thread(_job_status, job_id)
+        yield f"event: status\ndata: {status.model_dump_json()}\n\n"
+        
+        while status.status not in TERMINAL_JOB_STATUSES:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            
+            finished = await notifier.wait_for(
+                job_id, min(remaining, settings.job_stream_keepalive_s), lambda: _job_ready(job_id)
+            )
+            if not finished:
+                yield ": keep-alive\n\n"
+                continue
+            
+            status = await asyncio.to_thread(_job_status, job_id)
+            yield f"event: status\ndata: {status.model_dump_json()}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
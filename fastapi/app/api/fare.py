@@ -1,15 +1,26 @@
-from fastapi import APIRouter, HTTPException
-from app.schemas.request import FareRequest
-from app.schemas.response import FareResponse
-from app.services.fare_service import compute_fare
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import ValidationError
+from app.schemas.request import FareRequest, FareQuoteRequest, FareQuoteBatchRequest, FinalFareRequest
+from app.schemas.response import FareResponse, FareQuoteResponse, FareQuoteBatchResponse, FinalFareResponse
+from app.services.fare_service import (
+    compute_fare_json, compute_final_fare, parse_trace, quote_fares, quote_fares_batch
+)
+from app.utils.fast_json import RawJSONResponse, json_body_openapi
+from app.core.config import settings
 from app.core.logging import get_logger
 
 router = APIRouter(prefix="/fare", tags=["Fare"])
 logger = get_logger(__name__)
 
 
-@router.post("/calc", response_model=FareResponse)
-async def calculate_fare(request: FareRequest):
+@router.post(
+    "/calc",
+    response_model=FareResponse,
+    response_class=RawJSONResponse,
+    openapi_extra=json_body_openapi(FareRequest)
+)
+async def calculate_fare(request: Request):
     """
     Calculate fare for a ride.
     
@@ -17,10 +28,91 @@ async def calculate_fare(request: FareRequest):
     - **destination**: Ending location coordinates
     - **timestamp**: ISO-8601 timestamp of ride request
     - **traffic_level**: Optional traffic multiplier (1.0 = normal, >1 = heavy traffic)
+    
+    The body is validated straight from its JSON and the response is sent
+    pre-encoded (verbatim from cache on a hit).
     """
     try:
-        result = compute_fare(request.dict())
-        return result
+        payload = FareRequest.model_validate_json(await request.body()).model_dump()
+    except ValidationError as e:
+        # Inputs are left out: for malformed JSON it is the raw body bytes
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+    
+    try:
+        return RawJSONResponse(compute_fare_json(payload))
     except Exception as e:
         logger.error(f"Fare calculation error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Fare calculation failed: {str(e)}")
+
+
+@router.post("/quote", response_model=FareQuoteResponse)
+async def quote_fare(request: FareQuoteRequest):
+    """
+    Quote fares for every vehicle type from the pricing rules.
+    
+    Applies per-vehicle base, per-km and per-minute rates, time-of-day
+    bands for the request's local time, the surge multiplier
+    (`traffic_level`, capped per vehicle) and minimum fares.
+    """
+    try:
+        return quote_fares(request.model_dump())
+    except Exception as e:
+        logger.error(f"Fare quote error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Fare quote failed: {str(e)}")
+
+
+@router.post("/quote/batch", response_model=FareQuoteBatchResponse)
+async def quote_fare_batch(request: FareQuoteBatchRequest):
+    """
+    Quote fares for up to 1000 trips in one call.
+    """
+    try:
+        results = quote_fares_batch([quote.model_dump() for quote in request.quotes])
+        return FareQuoteBatchResponse(results=results)
+    except Exception as e:
+        logger.error(f"Batch fare quote error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch fare quote failed: {str(e)}")
+
+
+@router.post(
+    "/final",
+    response_model=FinalFareResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": FinalFareRequest.model_json_schema()},
+        "application/octet-stream": {"schema": {"type": "string", "format": "binary"}}
+    }}}
+)
+async def calculate_final_fare(request: Request):
+    """
+    Calculate the metered fare of a completed ride from its GPS trace.
+    
+    Send either JSON (`{"points": [[unix_ts, lat, lng], ...]}`) or, for
+    large traces, `application/octet-stream` with little-endian float64
+    triples (unix_ts, lat, lng) packed back to back. Jittered fixes are
+    filtered, the trace is simplified and distance plus waiting time are
+    priced with the configured rates.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/octet-stream"):
+            trace = parse_trace(body)
+        else:
+            trace = np.array(FinalFareRequest.model_validate_json(body).points, dtype=np.float64)
+            if trace.ndim != 2 or trace.shape[1] != 3:
+                raise ValueError("Each point must be [unix_ts, lat, lng]")
+    except ValidationError as e:
+        # Inputs are left out: for malformed JSON it is the raw body bytes
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    if len(trace) > settings.trace_max_points:
+        raise HTTPException(status_code=413, detail=f"Trace exceeds {settings.trace_max_points} points")
+    
+    try:
+        return compute_final_fare(trace)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Final fare calculation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Final fare calculation failed: {str(e)}")
@@ -1,6 +1,12 @@
 from fastapi import APIRouter, Query, HTTPException
-from app.schemas.response import ReverseGeoResponse
-from app.services.geo_service import reverse_geocode
+from app.schemas.request import ReverseGeoBatchRequest, GeofenceBatchRequest
+from app.schemas.response import (
+    ReverseGeoResponse, ReverseGeoBatchResponse, GeofenceMembership, GeofenceBatchResponse
+)
+from app.services.geo_service import reverse_geocode, reverse_geocode_batch
+from app.services.geofence import get_geofences
+from app.core.config import settings
+from app.utils.geo_cache import stats as geo_cache_stats
 from app.core.logging import get_logger
 
 router = APIRouter(prefix="/geo", tags=["Geocoding"])
@@ -26,3 +32,68 @@ async def reverse_geocode_endpoint(
     except Exception as e:
         logger.error(f"Reverse geocoding error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Reverse geocoding failed: {str(e)}")
+
+
+@router.post("/reverse/batch", response_model=ReverseGeoBatchResponse)
+async def reverse_geocode_batch_endpoint(request: ReverseGeoBatchRequest):
+    """
+    Reverse geocode up to 1000 coordinates in one call.
+    
+    Points sharing a cache cell are resolved once, cached results are read
+    with a single multi-get, and misses go through the rate-limited
+    upstream queue behind live single lookups. Misses still pending after
+    `GEOCODER_LIVE_TIMEOUT_S` come back as coordinate-only placeholders
+    (counted in `stats.unresolved`) and are cached once resolved, so a
+    retry picks them up.
+    """
+    try:
+        points = [(point.lat, point.lon) for point in request.points]
+        results, stats = await reverse_geocode_batch(points, timeout=settings.geocoder_live_timeout_s)
+        return ReverseGeoBatchResponse(results=results, stats=stats)
+    except Exception as e:
+        logger.error(f"Batch reverse geocoding error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch reverse geocoding failed: {str(e)}")
+
+
+def _memberships(lat, lng):
+    fences = get_geofences()
+    if fences is None:
+        raise HTTPException(status_code=503, detail="No geofences configured")
+    return [
+        GeofenceMembership(fences=fences.describe(hits), serviceable=fences.unserviceable_reason(hits, hits) is None)
+        for hits in fences.fences_at_many(lat, lng)
+    ]
+
+
+@router.get("/geofence", response_model=GeofenceMembership)
+async def geofence_endpoint(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude")
+):
+    """
+    Geofences (service areas, airport zones, restricted areas) containing a point.
+    """
+    return _memberships([lat], [lng])[0]
+
+
+@router.post("/geofence/batch", response_model=GeofenceBatchResponse)
+async def geofence_batch_endpoint(request: GeofenceBatchRequest):
+    """
+    Geofence membership for up to 10000 points.
+    
+    Answered from a precomputed grid index; exact point-in-polygon tests
+    run only for points in cells crossed by a fence boundary.
+    """
+    points = request.points
+    return GeofenceBatchResponse(results=_memberships([p.lat for p in points], [p.lng for p in points]))
+
+
+@router.get("/cache/stats")
+async def geo_cache_stats_endpoint():
+    """
+    Geocode cache statistics for tuning `GEO_CACHE_RADIUS_M`.
+    
+    Returns exact and near hit counts, misses, and a histogram of the
+    distance between requested points and the cached points reused for them.
+    """
+    return geo_cache_stats.snapshot()
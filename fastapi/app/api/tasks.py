@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import Optional
-from app.tasks.tasks import train_model_task, async_eta_prediction_task, bulk_eta_prediction_task
+from typing import Optional, List
+from app.tasks.tasks import (
+    train_model_task, async_eta_prediction_task, bulk_eta_prediction_task, geocode_backfill_task
+)
 from app.tasks.celery_app import app as celery_app
+from app.utils import result_store
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -17,6 +20,11 @@ class TrainModelRequest(BaseModel):
     model_path: str = "app/models/model.pkl"
 
 
+class GeocodeBackfillRequest(BaseModel):
+    """Request model for geocode backfill"""
+    dataset_path: Optional[str] = None
+    points: Optional[List[dict]] = None
+
 
 class TaskResponse(BaseModel):
     """Response model for task submission"""
@@ -33,6 +41,16 @@ class TaskStatusResponse(BaseModel):
     error: Optional[str] = None
 
 
+class TaskResultsPage(BaseModel):
+    """Response model for a page of stored task results"""
+    task_id: str
+    items: List[dict]
+    next_cursor: Optional[str] = None
+    complete: bool = False
+    stored: int = 0
+    total: Optional[int] = None
+
+
 @router.post("/train-model", response_model=TaskResponse)
 async def trigger_model_training(request: TrainModelRequest):
     """
@@ -55,6 +73,31 @@ async def trigger_model_training(request: TrainModelRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/geocode-backfill", response_model=TaskResponse)
+async def trigger_geocode_backfill(request: GeocodeBackfillRequest):
+    """
+    Trigger a geocode backfill of historical ride endpoints.
+    
+    Geocodes the endpoints in `dataset_path` (training CSV or ride segment
+    directory) and/or `points` into the cache without competing with live
+    lookups for the upstream rate limit.
+    """
+    if not request.dataset_path and not request.points:
+        raise HTTPException(status_code=400, detail="Provide dataset_path or points")
+    try:
+        task = geocode_backfill_task.delay(request.dataset_path, request.points)
+        logger.info(f"Geocode backfill task started: {task.id}")
+        
+        return TaskResponse(
+            task_id=task.id,
+            status="started",
+            message="Geocode backfill task submitted successfully"
+        )
+    except Exception as e:
+        logger.error(f"Failed to start geocode backfill task: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{task_id}", response_model=TaskStatusResponse)
 async def get_task_status(task_id: str):
     """
@@ -92,6 +135,42 @@ async def get_task_status(task_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{task_id}/results", response_model=TaskResultsPage)
+async def get_task_results(
+    task_id: str,
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum rows per page")
+):
+    """
+    Page through results of a bulk task.
+    
+    Results become readable as soon as each chunk is written, so this can be
+    polled while the task is still running. Keep passing the returned
+    `next_cursor` until `complete` is true and a page comes back empty.
+    """
+    try:
+        page = result_store.read_results(task_id, cursor=cursor, limit=limit)
+        meta = page["meta"]
+        
+        if meta is None and not page["items"]:
+            raise HTTPException(status_code=404, detail=f"No stored results for task {task_id}")
+        
+        return TaskResultsPage(
+            task_id=task_id,
+            items=page["items"],
+            next_cursor=page["next_cursor"],
+            complete=bool(meta) and meta["status"] in ("completed", "failed"),
+            stored=meta["stored"] if meta else len(page["items"]),
+            total=meta["total"] if meta else None
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to read task results: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/{task_id}")
 async def cancel_task(task_id: str):
     """
@@ -1,10 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import fare, eta, geo, tasks
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.api import fare, eta, geo, tasks, drivers, batch
 from app.schemas.response import HealthResponse
-from app.services.eta_service import is_model_loaded
-from app.utils.rmq import check_rabbitmq_connection
-from app.utils.redis_client import check_redis_connection
+from app.services.health_service import get_health_monitor
+from app.utils.rmq import close_publishers
+from app.utils.http_client import get_http_client
+from app.utils.geo_store import get_geo_store, close_geo_store
+from app.services.local_geocoder import get_local_geocoder
+from app.services.geo_service import get_geocode_scheduler
+from app.utils.job_events import get_job_notifier
+from app.services.driver_index import get_driver_feed
 from app.core.config import settings
 from app.core.logging import get_logger
 
@@ -16,7 +22,8 @@ app = FastAPI(
     version=settings.api_version,
     description=settings.api_description,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -44,6 +51,8 @@ app.include_router(fare.router)
 app.include_router(eta.router)
 app.include_router(geo.router)
 app.include_router(tasks.router)
+app.include_router(drivers.router)
+app.include_router(batch.router)
 
 
 @app.get("/", tags=["Root"])
@@ -62,23 +71,48 @@ async def health_check():
     """
     Health check endpoint.
     
-    Returns service status, model loading status, and queue connectivity.
+    Returns the latest background probe snapshot: model loading status,
+    queue and Redis connectivity, probe age and per-probe latency.
     """
-    # Check if model is loaded
-    model_status = is_model_loaded()
-    
-    # Check RabbitMQ connection
-    queue_status = check_rabbitmq_connection(settings.rabbitmq_url)
-    
-    # Check Redis connection
-    redis_status = check_redis_connection()
+    monitor = get_health_monitor()
+    probes = await monitor.get_snapshot()
     
     return HealthResponse(
         status="ok",
-        model_loaded=model_status,
-        queue_connected=queue_status,
-        redis_connected=redis_status,
-        version=settings.api_version
+        model_loaded=probes.get("model", {}).get("ok", False),
+        queue_connected=probes.get("rabbitmq", {}).get("ok", False),
+        redis_connected=probes.get("redis", {}).get("ok", False),
+        version=settings.api_version,
+        probe_age_s=monitor.age_s,
+        probes=probes
+    )
+
+
+@app.get("/livez", tags=["Health"])
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", tags=["Health"])
+async def readiness_check():
+    """
+    Readiness probe.
+    
+    Returns 503 until a fresh probe snapshot exists and every probe in
+    `HEALTH_REQUIRED_PROBES` is passing.
+    """
+    monitor = get_health_monitor()
+    await monitor.get_snapshot()
+    ready = monitor.is_ready()
+    
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "probe_age_s": monitor.age_s,
+            "probes": monitor.snapshot
+        }
     )
 
 
@@ -87,12 +121,34 @@ async def startup_event():
     """Run on application startup"""
     logger.info(f"Starting {settings.api_title} v{settings.api_version}")
     logger.info(f"Documentation available at http://{settings.fastapi_host}:{settings.fastapi_port}/docs")
+    
+    # Shared outbound HTTP pool and offline index for reverse geocoding
+    await get_http_client().start()
+    get_local_geocoder()
+    get_geo_store()
+    
+    # Subscribe to job completion notifications for long-poll/SSE status
+    await get_job_notifier().start()
+    
+    # Keep the driver index current from driver location events
+    if settings.driver_index_enabled:
+        await get_driver_feed().start()
+    
+    # Probe dependencies in the background; /health serves the snapshot
+    await get_health_monitor().start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown"""
     logger.info("Shutting down FastAPI application")
+    await get_health_monitor().stop()
+    await get_job_notifier().stop()
+    await get_driver_feed().stop()
+    await get_geocode_scheduler().stop()
+    await get_http_client().close()
+    close_geo_store()
+    close_publishers()
 
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import os
+from app.utils.segment_store import is_segment_dir, load_segments
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -22,15 +23,19 @@ class ETAModelTrainer:
         
     def load_data(self, data_path: str) -> pd.DataFrame:
         """
-        Load training data from CSV file.
+        Load training data from a CSV file or an ingested segment directory.
         
         Args:
-            data_path: Path to CSV file
+            data_path: Path to CSV file or segment directory
         
         Returns:
             DataFrame with training data
         """
         logger.info(f"Loading data from {data_path}")
+        if is_segment_dir(data_path):
+            df = load_segments(data_path)
+            logger.info(f"Loaded {len(df)} rows from segment store")
+            return df
         df = pd.read_csv(data_path)
         return df
     
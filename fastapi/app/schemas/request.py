@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -29,6 +29,50 @@ class FareRequest(BaseModel):
         }
 
 
+class FareQuoteRequest(BaseModel):
+    """Request schema for per-vehicle fare quotes"""
+    origin: LatLng
+    destination: LatLng
+    timestamp: Optional[str] = Field(None, description="ISO-8601 timestamp (local time selects time bands)")
+    traffic_level: Optional[float] = Field(None, ge=0.5, le=3.0, description="Surge multiplier, capped per vehicle")
+    eta_seconds: Optional[float] = Field(None, ge=0, description="Predicted trip duration for per-minute charges")
+    vehicle_types: Optional[List[str]] = Field(None, description="Vehicle types to quote (default all)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "origin": {"lat": 12.9716, "lng": 77.5946},
+                "destination": {"lat": 12.9352, "lng": 77.6245},
+                "timestamp": "2025-11-28T10:21:00+05:30",
+                "traffic_level": 1.2,
+                "vehicle_types": ["bike", "auto", "car"]
+            }
+        }
+
+
+class FareQuoteBatchRequest(BaseModel):
+    """Request schema for batch fare quotes"""
+    quotes: List[FareQuoteRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class FinalFareRequest(BaseModel):
+    """Request schema for the metered fare of a completed ride"""
+    points: List[List[float]] = Field(..., min_length=2, description="GPS fixes as [unix_ts, lat, lng]")
+    ride_id: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "points": [
+                    [1764305460.0, 12.9716, 77.5946],
+                    [1764305461.0, 12.97165, 77.59468],
+                    [1764305462.0, 12.97171, 77.59477]
+                ],
+                "ride_id": "ride_12345"
+            }
+        }
+
+
 class ETARequest(BaseModel):
     """Request schema for ETA prediction"""
     origin: LatLng
@@ -55,6 +99,16 @@ class ReverseGeoRequest(BaseModel):
     lon: float = Field(..., ge=-180, le=180)
 
 
+class ReverseGeoBatchRequest(BaseModel):
+    """Request schema for batch reverse geocoding"""
+    points: List[ReverseGeoRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class GeofenceBatchRequest(BaseModel):
+    """Request schema for batch geofence membership"""
+    points: List[LatLng] = Field(..., min_length=1, max_length=10000)
+
+
 class AsyncJobRequest(BaseModel):
     """Request schema for async ETA prediction"""
     origin: LatLng
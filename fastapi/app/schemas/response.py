@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 
 class FareResponse(BaseModel):
@@ -18,6 +18,78 @@ class FareResponse(BaseModel):
         }
 
 
+class FareQuoteResponse(BaseModel):
+    """Response schema for per-vehicle fare quotes"""
+    fares: Dict[str, float] = Field(..., description="Fare per vehicle type")
+    distance_km: float = Field(..., description="Distance in kilometers")
+    duration_min: float = Field(..., description="Trip duration used for per-minute charges")
+    currency: str = Field(default="INR", description="Currency code")
+    rules_version: str = Field(..., description="Version of the pricing rules applied")
+    serviceable: bool = Field(default=True, description="False if the pickup or drop cannot be served")
+    unserviceable_reason: Optional[str] = Field(default=None, description="Why the trip cannot be served")
+    zones: List[str] = Field(default=[], description="Geofences containing the pickup or drop")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "fares": {"bike": 86.7, "auto": 122.21, "car": 200.21},
+                "distance_km": 7.134,
+                "duration_min": 14.3,
+                "currency": "INR",
+                "rules_version": "2025-11-28",
+                "serviceable": True,
+                "unserviceable_reason": None,
+                "zones": ["blr_service_area"]
+            }
+        }
+
+
+class FareQuoteBatchResponse(BaseModel):
+    """Response schema for batch fare quotes"""
+    results: List[FareQuoteResponse]
+
+
+class FinalFareResponse(FareResponse):
+    """Response schema for the metered fare of a completed ride"""
+    duration_s: float = Field(..., description="Trip duration from first to last valid fix")
+    waiting_time_s: float = Field(..., description="Time spent below the waiting speed threshold")
+    distance_fare: float = Field(..., description="Distance component of the fare")
+    waiting_fare: float = Field(..., description="Waiting component of the fare")
+    points_received: int = Field(..., description="GPS points in the request")
+    points_used: int = Field(..., description="Points left after cleaning and simplification")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "fare": 131.3,
+                "distance_km": 12.4,
+                "currency": "INR",
+                "duration_s": 2280.0,
+                "waiting_time_s": 540.0,
+                "distance_fare": 99.2,
+                "waiting_fare": 9.0,
+                "points_received": 2281,
+                "points_used": 164
+            }
+        }
+
+
+class NearbyDriver(BaseModel):
+    """A driver returned by a nearest-driver query"""
+    driver_id: str
+    lat: float
+    lng: float
+    vehicle_type: Optional[str] = None
+    distance_km: float = Field(..., description="Straight-line distance to the query point")
+    eta_seconds: Optional[int] = Field(default=None, description="Predicted pickup ETA (by=eta only)")
+
+
+class NearbyDriversResponse(BaseModel):
+    """Response schema for nearest-driver queries"""
+    drivers: List[NearbyDriver]
+    online: int = Field(..., description="Drivers currently in the index")
+
+
 class ETAResponse(BaseModel):
     """Response schema for ETA prediction"""
     eta_seconds: int = Field(..., description="Estimated time of arrival in seconds")
@@ -62,6 +134,25 @@ class HealthResponse(BaseModel):
     queue_connected: bool = False
     redis_connected: bool = False
     version: str = "1.0.0"
+    probe_age_s: Optional[float] = None
+    probes: Dict[str, Dict[str, Any]] = {}
+
+
+class GeofenceMembership(BaseModel):
+    """Geofences containing one point"""
+    fences: List[Dict[str, Optional[str]]] = Field(..., description="Containing fences (id, kind, name)")
+    serviceable: bool = Field(..., description="Inside a service area (if any are defined) and no restricted area")
+
+
+class GeofenceBatchResponse(BaseModel):
+    """Response schema for batch geofence membership"""
+    results: List[GeofenceMembership]
+
+
+class ReverseGeoBatchResponse(BaseModel):
+    """Response schema for batch reverse geocoding"""
+    results: List[ReverseGeoResponse]
+    stats: Dict[str, int] = {}
 
 
 class AsyncJobResponse(BaseModel):
@@ -69,6 +160,7 @@ class AsyncJobResponse(BaseModel):
     job_id: str
     status: str = "pending"
     message: str = "Job queued successfully"
+    result: Optional[ETAResponse] = None
 
 
 class AsyncJobStatusResponse(BaseModel):
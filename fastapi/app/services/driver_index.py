@@ -0,0 +1,384 @@
+"""
+In-memory index of online drivers.
+Driver positions live in preallocated numpy arrays (one slot per driver)
+bucketed into a lat/lng grid, so location updates are O(1) and k-nearest
+and within-radius queries only touch the cells around the query point.
+Drivers that stop reporting expire after `driver_index_ttl_s`.
+
+The API process keeps the index current from driver location events on
+the `driver_locations` fanout exchange; each process binds its own queue,
+so every worker holds the full index.
+"""
+import asyncio
+import math
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.trace_utils import haversine_m
+from app.utils.rmq_consumer import AsyncConsumer, Message
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+KM_PER_DEG = 111.195
+
+# Driver statuses that make a driver matchable
+AVAILABLE_STATUSES = {"available", "online", "idle"}
+
+
+class DriverIndex:
+    """
+    Grid-bucketed driver locations with array-backed storage.
+
+    Not thread-safe; use from a single event loop.
+
+    Args:
+        capacity: Initial slot count (grows by doubling)
+        cell_deg: Grid cell size in degrees
+        ttl_s: Drivers silent for longer are ignored and swept
+    """
+
+    def __init__(self, capacity: int = None, cell_deg: float = None, ttl_s: float = None):
+        capacity = capacity or settings.driver_index_capacity
+        self.cell_deg = cell_deg or settings.driver_index_cell_deg
+        self.ttl_s = ttl_s or settings.driver_index_ttl_s
+        self._cols = int(math.ceil(360.0 / self.cell_deg)) + 1
+
+        self.lat = np.zeros(capacity)
+        self.lng = np.zeros(capacity)
+        self.updated_at = np.zeros(capacity)
+        self.vehicle = np.zeros(capacity, dtype=np.int16)
+        self.cell = np.full(capacity, -1, dtype=np.int64)
+
+        self._ids: List[Optional[str]] = [None] * capacity
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._cells: Dict[int, set] = {}
+        self._vehicle_codes: Dict[str, int] = {}
+        self._vehicle_names: List[str] = [""]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # ----- Storage -----
+
+    def _cell_of(self, lat: float, lng: float) -> int:
+        return int((lat + 90.0) // self.cell_deg) * self._cols + int((lng + 180.0) // self.cell_deg)
+
+    def _vehicle_code(self, vehicle_type: Optional[str]) -> int:
+        if not vehicle_type:
+            return 0
+        name = vehicle_type.lower()
+        code = self._vehicle_codes.get(name)
+        if code is None:
+            code = len(self._vehicle_names)
+            self._vehicle_codes[name] = code
+            self._vehicle_names.append(name)
+        return code
+
+    def _grow(self):
+        old = len(self._ids)
+        new = old * 2
+        for name in ("lat", "lng", "updated_at", "vehicle"):
+            array = getattr(self, name)
+            grown = np.zeros(new, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        cell = np.full(new, -1, dtype=np.int64)
+        cell[:old] = self.cell
+        self.cell = cell
+        self._ids.extend([None] * old)
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    def update(self, driver_id: str, lat: float, lng: float,
+               vehicle_type: Optional[str] = None, ts: float = None):
+        """Insert or move an available driver."""
+        slot = self._slots.get(driver_id)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._slots[driver_id] = slot
+            self._ids[slot] = driver_id
+
+        cell = self._cell_of(lat, lng)
+        old_cell = int(self.cell[slot])
+        if old_cell != cell:
+            if old_cell >= 0:
+                self._discard(old_cell, slot)
+            self._cells.setdefault(cell, set()).add(slot)
+            self.cell[slot] = cell
+
+        self.lat[slot] = lat
+        self.lng[slot] = lng
+        self.updated_at[slot] = time.time() if ts is None else ts
+        if vehicle_type is not None:
+            self.vehicle[slot] = self._vehicle_code(vehicle_type)
+
+    def remove(self, driver_id: str) -> bool:
+        """Drop a driver (offline or on a trip)."""
+        slot = self._slots.pop(driver_id, None)
+        if slot is None:
+            return False
+        self._discard(int(self.cell[slot]), slot)
+        self.cell[slot] = -1
+        self.vehicle[slot] = 0
+        self._ids[slot] = None
+        self._free.append(slot)
+        return True
+
+    def _discard(self, cell: int, slot: int):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(slot)
+            if not members:
+                del self._cells[cell]
+
+    def expire(self, now: float = None) -> int:
+        """Remove drivers that have not reported within the TTL."""
+        cutoff = (time.time() if now is None else now) - self.ttl_s
+        stale = np.flatnonzero((self.cell >= 0) & (self.updated_at < cutoff))
+        for slot in stale.tolist():
+            self.remove(self._ids[slot])
+        return len(stale)
+
+    # ----- Queries -----
+
+    def _candidates(self, lat: float, lng: float, ring: int, row: int, col: int) -> List[int]:
+        slots = []
+        cells = self._cells
+        if ring == 0:
+            members = cells.get(row * self._cols + col)
+            return list(members) if members else slots
+        for d_row in range(-ring, ring + 1):
+            if abs(d_row) == ring:
+                d_cols = range(-ring, ring + 1)
+            else:
+                d_cols = (-ring, ring)
+            base = (row + d_row) * self._cols + col
+            for d_col in d_cols:
+                members = cells.get(base + d_col)
+                if members:
+                    slots.extend(members)
+        return slots
+
+    def _search(self, lat: float, lng: float, k: Optional[int], max_km: float,
+                vehicle_type: Optional[str], now: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Ring search; returns (slots, distances in km) sorted by distance."""
+        code = self._vehicle_codes.get(vehicle_type.lower()) if vehicle_type else 0
+        if code is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        cutoff = (time.time() if now is None else now) - self.ttl_s
+
+        row = int((lat + 90.0) // self.cell_deg)
+        col = int((lng + 180.0) // self.cell_deg)
+        # Rings fully covered by radius r: everything within r * cell_km has been seen
+        cell_km = self.cell_deg * KM_PER_DEG * max(math.cos(math.radians(abs(lat) + self.cell_deg)), 0.01)
+        max_ring = int(math.ceil(max_km / cell_km)) + 1
+
+        found_slots: List[np.ndarray] = []
+        found_dist: List[np.ndarray] = []
+        count = 0
+        for ring in range(max_ring + 1):
+            slots = self._candidates(lat, lng, ring, row, col)
+            if slots:
+                slots = np.array(slots, dtype=np.int64)
+                keep = self.updated_at[slots] >= cutoff
+                if code:
+                    keep &= self.vehicle[slots] == code
+                slots = slots[keep]
+                if len(slots):
+                    dist = haversine_m(lat, lng, self.lat[slots], self.lng[slots]) / 1000
+                    within = dist <= max_km
+                    found_slots.append(slots[within])
+                    found_dist.append(dist[within])
+                    count += int(within.sum())
+            if k is not None and count >= k:
+                dist = np.concatenate(found_dist)
+                if np.partition(dist, k - 1)[k - 1] <= ring * cell_km:
+                    break
+
+        if not found_slots:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        slots = np.concatenate(found_slots)
+        dist = np.concatenate(found_dist)
+        order = np.argsort(dist, kind="stable")
+        if k is not None:
+            order = order[:k]
+        return slots[order], dist[order]
+
+    def _results(self, slots: np.ndarray, dist: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {
+                "driver_id": self._ids[slot],
+                "lat": float(self.lat[slot]),
+                "lng": float(self.lng[slot]),
+                "vehicle_type": self._vehicle_names[self.vehicle[slot]] or None,
+                "distance_km": round(float(d), 3),
+            }
+            for slot, d in zip(slots.tolist(), dist.tolist())
+        ]
+
+    def nearest(self, lat: float, lng: float, k: int = 5, max_km: float = None,
+                vehicle_type: str = None, now: float = None) -> List[Dict[str, Any]]:
+        """
+        The k closest fresh drivers within `max_km`, closest first.
+
+        Args:
+            lat: Query latitude
+            lng: Query longitude
+            k: Number of drivers
+            max_km: Search radius (default `driver_index_max_km`)
+            vehicle_type: Only drivers of this vehicle type
+        """
+        max_km = max_km or settings.driver_index_max_km
+        return self._results(*self._search(lat, lng, k, max_km, vehicle_type, now))
+
+    def within(self, lat: float, lng: float, radius_km: float,
+               vehicle_type: str = None, now: float = None) -> List[Dict[str, Any]]:
+        """All fresh drivers within `radius_km`, closest first."""
+        return self._results(*self._search(lat, lng, None, radius_km, vehicle_type, now))
+
+
+def nearest_by_eta(index: DriverIndex, lat: float, lng: float, k: int = 5,
+                   vehicle_type: str = None, max_km: float = None) -> List[Dict[str, Any]]:
+    """
+    The k drivers with the shortest predicted pickup ETA.
+
+    Takes `driver_index_eta_candidates` times k drivers nearest by distance
+    and ranks them by ETA from the driver to the pickup point, scored in one
+    batch through predict_eta_batch.
+    """
+    from app.services.eta_service import predict_eta_batch
+
+    candidates = index.nearest(lat, lng, k * settings.driver_index_eta_candidates, max_km, vehicle_type)
+    if not candidates:
+        return []
+
+    pickup = {"lat": lat, "lng": lng}
+    timestamp = datetime.now(timezone.utc).isoformat()
+    etas = predict_eta_batch([
+        {"origin": {"lat": c["lat"], "lng": c["lng"]}, "destination": pickup, "timestamp": timestamp}
+        for c in candidates
+    ])
+    for candidate, eta in zip(candidates, etas):
+        candidate["eta_seconds"] = eta["eta_seconds"]
+    candidates.sort(key=lambda c: (c["eta_seconds"], c["distance_km"]))
+    return candidates[:k]
+
+
+# ----- Event feed -----
+
+def apply_location_event(index: DriverIndex, event: Dict[str, Any]) -> bool:
+    """
+    Apply one driver location event.
+
+    Expected fields: driver_id, location {"lat", "lng"} (or lat/lng at the
+    top level), optional status ("online", "busy", "offline", ...) or
+    available (bool), vehicle_type and timestamp (epoch seconds/ms).
+
+    Returns:
+        False if the event was malformed
+    """
+    try:
+        driver_id = str(event["driver_id"])
+        if "available" in event:
+            available = bool(event["available"])
+        else:
+            available = str(event.get("status", "online")).lower() in AVAILABLE_STATUSES
+        if not available:
+            index.remove(driver_id)
+            return True
+
+        location = event.get("location") or event
+        lat, lng = float(location["lat"]), float(location.get("lng", location.get("lon")))
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return False
+        ts = event.get("timestamp")
+        if ts is not None:
+            ts = float(ts)
+            ts = ts / 1000 if ts > 1e11 else ts
+        index.update(driver_id, lat, lng, event.get("vehicle_type"), ts)
+        return True
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+class DriverLocationFeed:
+    """
+    Keeps a DriverIndex current from the driver location exchange and
+    sweeps expired drivers. Runs as a background task in the API process.
+    """
+
+    def __init__(self, index: DriverIndex):
+        self.index = index
+        self.applied = 0
+        self.skipped = 0
+        self._consumer: Optional[AsyncConsumer] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def handle(self, messages: List[Message]):
+        """AsyncConsumer batch handler."""
+        for message in messages:
+            try:
+                ok = apply_location_event(self.index, message.json())
+            except ValueError:
+                ok = False
+            if ok:
+                self.applied += 1
+            else:
+                self.skipped += 1
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.index.ttl_s / 4))
+            expired = self.index.expire()
+            if expired:
+                logger.debug(f"Expired {expired} stale drivers, {len(self.index)} online")
+
+    async def start(self):
+        if self._tasks:
+            return
+        queue = f"{settings.driver_locations_exchange}.{socket.gethostname()}.{os.getpid()}"
+        self._consumer = AsyncConsumer(settings.rabbitmq_url)
+        self._consumer.subscribe(queue, self.handle, batch_size=500, batch_timeout=0.02,
+                                 concurrency=1, requeue_on_error=False,
+                                 exchange=settings.driver_locations_exchange)
+        self._tasks = [
+            asyncio.create_task(self._consumer.run()),
+            asyncio.create_task(self._sweep_loop()),
+        ]
+
+    async def stop(self):
+        if self._consumer is not None:
+            await self._consumer.stop(drain_timeout=2.0)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._consumer = None
+        self._tasks = []
+
+
+# Global index and feed
+_driver_index: Optional[DriverIndex] = None
+_driver_feed: Optional[DriverLocationFeed] = None
+
+
+def get_driver_index() -> DriverIndex:
+    """Get the process-wide driver index."""
+    global _driver_index
+    if _driver_index is None:
+        _driver_index = DriverIndex()
+    return _driver_index
+
+
+def get_driver_feed() -> DriverLocationFeed:
+    """Get the process-wide driver location feed."""
+    global _driver_feed
+    if _driver_feed is None:
+        _driver_feed = DriverLocationFeed(get_driver_index())
+    return _driver_feed
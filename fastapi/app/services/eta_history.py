@@ -0,0 +1,266 @@
+"""
+Historical ETA feature store.
+Keeps rolling per-(origin zone, destination zone, hour-of-week) averages
+of actual trip duration and speed, updated from ride-completed events,
+and serves them as the `historical_mean_eta` model feature.
+
+Aggregates live in dense (pairs, 169) arrays - one column per hour of the
+week plus an all-hours column - indexed through a dict of zone pairs, so
+both updates and lookups are O(1). The ride ingest process owns the
+writable table and publishes compressed snapshots to Redis; API workers
+load the latest snapshot and look features up locally.
+
+Zones are the 0.1 degree grid of `compute_zone_features`.
+"""
+import base64
+import io
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.utils.features import extract_time_features
+from app.utils.redis_client import get_redis, KEY_PREFIX
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+ETA_HISTORY_SNAPSHOT_KEY = f"{KEY_PREFIX}eta_history:snapshot"
+ETA_HISTORY_VERSION_KEY = f"{KEY_PREFIX}eta_history:version"
+
+# Zone grid, as in compute_zone_features
+ZONE_DEG = 0.1
+
+HOURS_PER_WEEK = 168
+ALL_HOURS = HOURS_PER_WEEK  # Column holding the pair's aggregate over every hour
+MIN_SPEED_KMH = 1.0
+
+
+def _zone_key(zone_lat: int, zone_lng: int) -> int:
+    return int(zone_lat) * 10000 + int(zone_lng)
+
+
+def _pair_key(origin_zone: int, dest_zone: int) -> int:
+    # Zone keys stay well inside +-5e7, so this is collision-free
+    return origin_zone * 10**8 + dest_zone
+
+
+def _coord_zone(coord: Dict[str, float]) -> int:
+    return _zone_key(math.floor(coord["lat"] / ZONE_DEG), math.floor(coord["lng"] / ZONE_DEG))
+
+
+class EtaHistory:
+    """
+    Array-backed rolling trip aggregates per zone pair and hour of week.
+
+    Each cell holds a sample count and running means of duration and
+    speed. Means are exact until a cell has 1/alpha samples and then
+    become an exponentially weighted average, so the table follows
+    changing road conditions without keeping raw trips.
+
+    Args:
+        max_pairs: Maximum zone pairs tracked; trips for new pairs beyond
+            this are dropped
+        alpha: Minimum EWMA weight of a new sample
+        min_samples: Samples an hour cell needs before it is served;
+            sparser cells fall back to the pair's all-hours column
+    """
+
+    def __init__(self, max_pairs: int = None, alpha: float = None, min_samples: int = None):
+        self.max_pairs = max_pairs or settings.eta_history_max_pairs
+        self.alpha = alpha or settings.eta_history_alpha
+        self.min_samples = min_samples or settings.eta_history_min_samples
+        self._rows: Dict[int, int] = {}
+        self.dropped = 0
+        self._allocate(min(1024, self.max_pairs))
+
+    def _allocate(self, capacity: int):
+        shape = (capacity, HOURS_PER_WEEK + 1)
+        count = np.zeros(shape, dtype=np.uint32)
+        duration = np.zeros(shape, dtype=np.float32)
+        speed = np.zeros(shape, dtype=np.float32)
+        n = len(self._rows)
+        if n:
+            count[:n] = self.count[:n]
+            duration[:n] = self.mean_duration[:n]
+            speed[:n] = self.mean_speed[:n]
+        self.count, self.mean_duration, self.mean_speed = count, duration, speed
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _row(self, pair: int, create: bool) -> Optional[int]:
+        row = self._rows.get(pair)
+        if row is None and create:
+            n = len(self._rows)
+            if n >= self.max_pairs:
+                self.dropped += 1
+                return None
+            if n >= len(self.count):
+                self._allocate(min(len(self.count) * 2, self.max_pairs))
+            row = self._rows[pair] = n
+        return row
+
+    def _update(self, row: int, column: int, duration_s: float, speed_kmh: float):
+        count = int(self.count[row, column]) + 1
+        self.count[row, column] = count
+        weight = max(1.0 / count, self.alpha)
+        self.mean_duration[row, column] += weight * (duration_s - self.mean_duration[row, column])
+        self.mean_speed[row, column] += weight * (speed_kmh - self.mean_speed[row, column])
+
+    def record(self, origin_zone: int, dest_zone: int, hour_of_week: int,
+               duration_s: float, speed_kmh: float) -> bool:
+        """Add one completed trip. Returns False if it was dropped."""
+        if duration_s <= 0 or not math.isfinite(speed_kmh):
+            return False
+        row = self._row(_pair_key(origin_zone, dest_zone), create=True)
+        if row is None:
+            return False
+        self._update(row, hour_of_week, duration_s, speed_kmh)
+        self._update(row, ALL_HOURS, duration_s, speed_kmh)
+        return True
+
+    def record_rows(self, rows: List[Dict[str, float]]) -> int:
+        """
+        Add parsed ride-completed rows (see `parse_ride_completed`).
+
+        Returns:
+            Number of rows recorded
+        """
+        recorded = 0
+        for row in rows:
+            recorded += self.record(
+                _zone_key(row["origin_zone_lat"], row["origin_zone_lng"]),
+                _zone_key(row["dest_zone_lat"], row["dest_zone_lng"]),
+                int(row["day_of_week"]) * 24 + int(row["hour"]),
+                float(row["eta_seconds"]),
+                float(row["avg_speed_kmh"]),
+            )
+        return recorded
+
+    def lookup(self, origin: Dict[str, float], destination: Dict[str, float],
+               timestamp: str, distance_km: float = None) -> Optional[float]:
+        """
+        Historical ETA in seconds for a trip, or None without enough history.
+
+        With `distance_km`, the estimate is the trip distance at the
+        historical mean speed, which holds up better than raw durations for
+        trips of different lengths inside the same large zones.
+        """
+        row = self._rows.get(_pair_key(_coord_zone(origin), _coord_zone(destination)))
+        if row is None:
+            return None
+        time_features = extract_time_features(timestamp)
+        column = time_features["day_of_week"] * 24 + time_features["hour"]
+        if self.count[row, column] < self.min_samples:
+            column = ALL_HOURS
+            if self.count[row, column] < self.min_samples:
+                return None
+
+        speed = float(self.mean_speed[row, column])
+        if distance_km and speed >= MIN_SPEED_KMH:
+            return round(distance_km / speed * 3600, 1)
+        return round(float(self.mean_duration[row, column]), 1)
+
+    def stats(self) -> Dict[str, Any]:
+        n = len(self._rows)
+        return {
+            "pairs": n,
+            "trips": int(self.count[:n, ALL_HOURS].sum()),
+            "dropped": self.dropped,
+        }
+
+    # ----- Snapshots -----
+
+    def to_bytes(self) -> bytes:
+        """Serialize the populated part of the table (compressed npz)."""
+        n = len(self._rows)
+        pairs = np.fromiter(self._rows.keys(), dtype=np.int64, count=n)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, pairs=pairs, count=self.count[:n],
+                            mean_duration=self.mean_duration[:n], mean_speed=self.mean_speed[:n])
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **kwargs) -> "EtaHistory":
+        """Rebuild a table from `to_bytes` output."""
+        arrays = np.load(io.BytesIO(data))
+        pairs = arrays["pairs"]
+        history = cls(**kwargs)
+        history.max_pairs = max(history.max_pairs, len(pairs))
+        if len(pairs):
+            history.count = arrays["count"]
+            history.mean_duration = arrays["mean_duration"]
+            history.mean_speed = arrays["mean_speed"]
+        history._rows = {pair: row for row, pair in enumerate(pairs.tolist())}
+        return history
+
+
+def publish_snapshot(history: EtaHistory) -> bool:
+    """Store a snapshot in Redis for API workers (ride ingest side)."""
+    try:
+        client = get_redis()
+        if client is None:
+            return False
+        version = json.dumps({"updated_at": time.time(), **history.stats()})
+        pipe = client.pipeline()
+        pipe.set(ETA_HISTORY_SNAPSHOT_KEY, base64.b64encode(history.to_bytes()).decode("ascii"))
+        pipe.set(ETA_HISTORY_VERSION_KEY, version)
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to publish ETA history snapshot: {e}")
+        return False
+
+
+def load_snapshot() -> Optional[EtaHistory]:
+    """Load the latest snapshot from Redis, or None if there is none."""
+    try:
+        client = get_redis()
+        data = client.get(ETA_HISTORY_SNAPSHOT_KEY) if client is not None else None
+        return EtaHistory.from_bytes(base64.b64decode(data)) if data else None
+    except Exception as e:
+        logger.warning(f"Failed to load ETA history snapshot: {e}")
+        return None
+
+
+# Snapshot served to predictions
+_history: Optional[EtaHistory] = None
+_history_version: Optional[str] = None
+_history_checked_at: Optional[float] = None
+
+
+def _refresh_history():
+    global _history, _history_version, _history_checked_at
+    _history_checked_at = time.monotonic()
+    try:
+        client = get_redis()
+        version = client.get(ETA_HISTORY_VERSION_KEY) if client is not None else None
+    except Exception as e:
+        logger.warning(f"Failed to check ETA history snapshot: {e}")
+        return
+    if version is None or version == _history_version:
+        return
+    history = load_snapshot()
+    if history is not None:
+        _history, _history_version = history, version
+        logger.info(f"Loaded ETA history snapshot: {history.stats()}")
+
+
+def lookup_historical_eta(origin: Dict[str, float], destination: Dict[str, float],
+                          timestamp: str, distance_km: float = None) -> Optional[float]:
+    """
+    Historical ETA feature for a trip from the latest published snapshot.
+
+    The snapshot version is re-checked at most every
+    `eta_history_snapshot_interval_s`; a failed check keeps the current
+    table. Returns None when disabled or without enough history.
+    """
+    if not settings.eta_history_enabled:
+        return None
+    if _history_checked_at is None or time.monotonic() - _history_checked_at >= settings.eta_history_snapshot_interval_s:
+        _refresh_history()
+    if _history is None:
+        return None
+    return _history.lookup(origin, destination, timestamp, distance_km)
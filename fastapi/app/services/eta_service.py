@@ -1,45 +1,69 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
 from app.schemas.response import ETAResponse
 from app.utils.geo_utils import haversine_km
+from app.services.routing_engine import trip_distance_km
+from app.services.eta_history import lookup_historical_eta
+from app.services.model_manager import get_model_manager
 from app.utils.features import build_features_for_prediction
-from app.utils.redis_client import cache_get, cache_set, generate_eta_key, TTL_ETA
+from app.utils.redis_client import (
+    cache_get, cache_set, cache_get_raw, cache_set_raw, cache_get_many, cache_set_many,
+    generate_eta_key, TTL_ETA
+)
+from app.utils import fast_json
 from app.core.config import settings
 from app.core.logging import get_logger
-import os
+import numpy as np
+import time
 
 logger = get_logger(__name__)
 
-# Global model cache
-_model = None
-_model_loaded = False
+def get_model(coord: Optional[Dict[str, float]] = None):
+    """
+    Get the ML model for the region containing `coord`.
+    
+    Models are routed, lazily loaded, hot-reloaded and evicted by the
+    model manager. Without `coord` the default region's model is returned.
+    
+    Returns:
+        Model artifacts, or None if the region has no usable model
+    """
+    manager = get_model_manager()
+    if coord is None:
+        return manager.get(manager.default) if manager.default else None
+    return manager.model_for(coord)
 
 
-def get_model():
-    """Load and cache the ML model"""
-    global _model, _model_loaded
+def warm_model() -> float:
+    """
+    Load the default region's model and run one throwaway prediction so
+    the first real request does not pay for loading or lazy initialisation.
+    Other regions load on first use.
     
-    if _model is None:
-        try:
-            from app.models.infer import load_model
-            model_path = settings.model_path
-            
-            if os.path.exists(model_path):
-                _model = load_model(model_path)
-                _model_loaded = True
-                logger.info(f"Model loaded successfully from {model_path}")
-            else:
-                logger.warning(f"Model file not found at {model_path}, using baseline prediction")
-                _model_loaded = False
-        except Exception as e:
-            logger.error(f"Failed to load model: {str(e)}")
-            _model_loaded = False
+    Returns:
+        Seconds taken until the first prediction completed
+    """
+    start = time.perf_counter()
+    model = get_model()
     
-    return _model
+    if model is not None:
+        from app.models.infer import predict
+        
+        origin = {"lat": 12.9716, "lng": 77.5946}
+        destination = {"lat": 12.9352, "lng": 77.6245}
+        features = build_features_for_prediction(
+            origin=origin,
+            destination=destination,
+            distance_km=haversine_km(origin, destination),
+            timestamp="2025-01-01T09:00:00+05:30"
+        )
+        predict(model, features)
+    
+    return time.perf_counter() - start
 
 
 def is_model_loaded() -> bool:
-    """Check if model is loaded"""
-    return _model_loaded
+    """Check if the default region's model is loaded"""
+    return get_model_manager().is_loaded()
 
 
 def predict_eta_baseline(distance_km: float, traffic_level: float = 1.0) -> tuple[int, float]:
@@ -66,6 +90,48 @@ def predict_eta_baseline(distance_km: float, traffic_level: float = 1.0) -> tupl
     return eta_seconds, confidence
 
 
+def _predict_single(payload: Dict[str, Any]) -> ETAResponse:
+    origin = payload["origin"]
+    destination = payload["destination"]
+    traffic_level = payload.get("traffic_level") or 1.0
+    
+    # Calculate distance
+    distance_km = trip_distance_km(origin, destination)
+    
+    # Try to use the origin region's ML model first
+    model = get_model(origin)
+    
+    if model is not None:
+        # Use ML model for prediction
+        from app.models.infer import predict
+        
+        features = build_features_for_prediction(
+            origin=origin,
+            destination=destination,
+            distance_km=distance_km,
+            timestamp=payload["timestamp"],
+            traffic_level=traffic_level,
+            # Filled from the zone-pair store if the caller did not send it
+            historical_mean_eta=_historical_eta(payload, distance_km)
+        )
+        
+        eta_seconds, confidence = predict(model, features)
+        logger.info(f"ML model prediction: {eta_seconds}s (confidence: {confidence})")
+    else:
+        # Fall back to baseline prediction
+        eta_seconds, confidence = predict_eta_baseline(distance_km, traffic_level)
+        logger.info(f"Baseline prediction: {eta_seconds}s (confidence: {confidence})")
+    
+    return ETAResponse(
+        eta_seconds=int(eta_seconds),
+        confidence=round(confidence, 2)
+    )
+
+
+def _eta_key(payload: Dict[str, Any]) -> str:
+    return generate_eta_key(payload["origin"], payload["destination"], payload.get("traffic_level") or 1.0)
+
+
 def predict_eta(payload: Dict[str, Any]) -> ETAResponse:
     """
     Predict ETA using ML model or baseline heuristic.
@@ -78,49 +144,14 @@ def predict_eta(payload: Dict[str, Any]) -> ETAResponse:
         ETAResponse with predicted ETA and confidence
     """
     try:
-        origin = payload["origin"]
-        destination = payload["destination"]
-        timestamp = payload["timestamp"]
-        traffic_level = payload.get("traffic_level", 1.0)
-        historical_mean_eta = payload.get("historical_mean_eta")
-        
         # Check cache first
-        cache_key = generate_eta_key(origin, destination, traffic_level)
+        cache_key = _eta_key(payload)
         cached = cache_get(cache_key)
         if cached:
             logger.info(f"Cache HIT for ETA: {cache_key}")
             return ETAResponse(**cached)
         
-        # Calculate distance
-        distance_km = haversine_km(origin, destination)
-        
-        # Try to use ML model first
-        model = get_model()
-        
-        if model is not None and _model_loaded:
-            # Use ML model for prediction
-            from app.models.infer import predict
-            
-            features = build_features_for_prediction(
-                origin=origin,
-                destination=destination,
-                distance_km=distance_km,
-                timestamp=timestamp,
-                traffic_level=traffic_level,
-                historical_mean_eta=historical_mean_eta
-            )
-            
-            eta_seconds, confidence = predict(model, features)
-            logger.info(f"ML model prediction: {eta_seconds}s (confidence: {confidence})")
-        else:
-            # Fall back to baseline prediction
-            eta_seconds, confidence = predict_eta_baseline(distance_km, traffic_level)
-            logger.info(f"Baseline prediction: {eta_seconds}s (confidence: {confidence})")
-        
-        result = ETAResponse(
-            eta_seconds=int(eta_seconds),
-            confidence=round(confidence, 2)
-        )
+        result = _predict_single(payload)
         
         # Cache the result
         cache_set(cache_key, result.model_dump(), TTL_ETA)
@@ -130,3 +161,123 @@ def predict_eta(payload: Dict[str, Any]) -> ETAResponse:
     except Exception as e:
         logger.error(f"Error predicting ETA: {str(e)}")
         raise
+
+
+def predict_eta_json(payload: Dict[str, Any]) -> Union[bytes, str]:
+    """
+    Fast path of predict_eta for the HTTP endpoint.
+    
+    Returns the encoded ETAResponse body. The body is cached as is, so a
+    cache hit returns the stored JSON without decoding, validating or
+    re-encoding it.
+    
+    Args:
+        payload: Request payload with origin, destination, timestamp, traffic_level
+    
+    Returns:
+        ETAResponse JSON body
+    """
+    try:
+        cache_key = _eta_key(payload)
+        cached = cache_get_raw(cache_key)
+        if cached:
+            logger.debug(f"Cache HIT for ETA: {cache_key}")
+            return cached
+        
+        body = fast_json.dumps(_predict_single(payload).model_dump())
+        cache_set_raw(cache_key, body, TTL_ETA)
+        
+        return body
+        
+    except Exception as e:
+        logger.error(f"Error predicting ETA: {str(e)}")
+        raise
+
+
+def _historical_eta(payload: Dict[str, Any], distance_km: float) -> Optional[float]:
+    historical_mean_eta = payload.get("historical_mean_eta")
+    if historical_mean_eta is None:
+        historical_mean_eta = lookup_historical_eta(
+            payload["origin"], payload["destination"], payload["timestamp"], distance_km
+        )
+    return historical_mean_eta
+
+
+def predict_eta_batch(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Predict ETAs for many requests at once.
+    
+    Cache lookups are done with a single multi-get, misses are scored
+    through the vectorized model path (or the baseline heuristic) and
+    written back with one pipelined round trip.
+    
+    Args:
+        payloads: List of request payloads (same shape as predict_eta)
+    
+    Returns:
+        List of dicts with eta_seconds and confidence, aligned with payloads
+    """
+    if not payloads:
+        return []
+    
+    try:
+        keys = [
+            generate_eta_key(p["origin"], p["destination"], p.get("traffic_level") or 1.0)
+            for p in payloads
+        ]
+        results = cache_get_many(keys)
+        
+        miss_idx = [i for i, cached in enumerate(results) if cached is None]
+        if not miss_idx:
+            return results
+        
+        distances = [trip_distance_km(payloads[i]["origin"], payloads[i]["destination"]) for i in miss_idx]
+        predictions = [None] * len(miss_idx)
+        
+        # Score each region's misses with its own model in one call
+        manager = get_model_manager()
+        groups: Dict[Optional[str], List[int]] = {}
+        for j, i in enumerate(miss_idx):
+            groups.setdefault(manager.region_for(payloads[i]["origin"]), []).append(j)
+        
+        for region, rows in groups.items():
+            model = manager.get(region) if region is not None else None
+            
+            if model is not None:
+                from app.models.infer import batch_predict
+                
+                features_list = [
+                    build_features_for_prediction(
+                        origin=payloads[miss_idx[j]]["origin"],
+                        destination=payloads[miss_idx[j]]["destination"],
+                        distance_km=distances[j],
+                        timestamp=payloads[miss_idx[j]]["timestamp"],
+                        traffic_level=payloads[miss_idx[j]].get("traffic_level") or 1.0,
+                        historical_mean_eta=_historical_eta(payloads[miss_idx[j]], distances[j])
+                    )
+                    for j in rows
+                ]
+                scored = batch_predict(model, features_list)
+            else:
+                traffic = np.array([payloads[miss_idx[j]].get("traffic_level") or 1.0 for j in rows])
+                avg_speed = settings.avg_speed_kmh / traffic
+                eta = (np.array([distances[j] for j in rows]) / avg_speed * 3600).astype(int)
+                scored = [(int(e), 0.70) for e in eta]
+            
+            for j, prediction in zip(rows, scored):
+                predictions[j] = prediction
+        
+        fresh = {}
+        for i, (eta_seconds, confidence) in zip(miss_idx, predictions):
+            results[i] = {"eta_seconds": int(eta_seconds), "confidence": round(confidence, 2)}
+            fresh[keys[i]] = results[i]
+        
+        cache_set_many(fresh, TTL_ETA)
+        logger.info(f"Batch ETA: {len(payloads)} requests, {len(miss_idx)} scored, "
+                    f"{len(payloads) - len(miss_idx)} from cache")
+        
+        return results
+        
+    except Exception as e:
+        logger.error(f"Error predicting batch ETA: {str(e)}")
+        raise
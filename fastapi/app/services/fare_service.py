@@ -1,13 +1,55 @@
-from typing import Dict, Any
-from app.schemas.response import FareResponse
-from app.utils.geo_utils import haversine_km
-from app.utils.redis_client import cache_get, cache_set, generate_fare_key, TTL_FARE
+from typing import Dict, Any, List, Optional, Tuple, Union
+import numpy as np
+from app.schemas.response import FareResponse, FinalFareResponse, FareQuoteResponse
+from app.services.pricing_engine import CompiledRules, get_pricing_rules, minute_of_week
+from app.services.geofence import GeofenceIndex, get_geofences
+from app.services.routing_engine import trip_distance_km
+from app.services.surge_engine import get_surge_multiplier
+from app.utils.trace_utils import clean_trace, simplify, segment_lengths_m, waiting_time_s
+from app.utils.redis_client import (
+    cache_get, cache_set, cache_get_raw, cache_set_raw, generate_fare_key, TTL_FARE
+)
+from app.utils import fast_json
 from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
 
+def _fare_key(payload: Dict[str, Any]):
+    traffic_level = payload.get("traffic_level") or 1.0
+    surge = get_surge_multiplier(payload["origin"])
+    cache_key = generate_fare_key(payload["origin"], payload["destination"], traffic_level, surge)
+    return cache_key, traffic_level, surge
+
+
+def _calculate_fare(payload: Dict[str, Any], traffic_level: float, surge: float) -> FareResponse:
+    # Calculate distance using Haversine formula
+    distance_km = trip_distance_km(payload["origin"], payload["destination"])
+    
+    # Base fare calculation
+    base_fare = settings.base_fare
+    per_km_rate = settings.per_km_rate
+    fare = base_fare + (per_km_rate * distance_km)
+    
+    # Apply traffic and zone surge multipliers
+    fare = fare * traffic_level * surge
+    
+    # Round fare to 2 decimal places
+    fare = round(fare, 2)
+    
+    logger.info(
+        f"Calculated fare: {fare} {settings.currency} for distance {distance_km} km "
+        f"(traffic: {traffic_level}, surge: {surge})"
+    )
+    
+    return FareResponse(
+        fare=fare,
+        distance_km=distance_km,
+        currency=settings.currency
+    )
+
+
 def compute_fare(payload: Dict[str, Any]) -> FareResponse:
     """
     Calculate fare based on distance and traffic conditions.
@@ -20,49 +62,226 @@ def compute_fare(payload: Dict[str, Any]) -> FareResponse:
         FareResponse with calculated fare and distance
     """
     try:
-        origin = payload["origin"]
-        destination = payload["destination"]
-        traffic_level = payload.get("traffic_level", 1.0)
-        
         # Check cache first
-        cache_key = generate_fare_key(origin, destination, traffic_level)
+        cache_key, traffic_level, surge = _fare_key(payload)
         cached = cache_get(cache_key)
         if cached:
             logger.info(f"Cache HIT for fare: {cache_key}")
             return FareResponse(**cached)
         
-        # Calculate distance using Haversine formula
-        distance_km = haversine_km(origin, destination)
+        result = _calculate_fare(payload, traffic_level, surge)
+        
+        # Cache the result
+        cache_set(cache_key, result.model_dump(), TTL_FARE)
+        
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error computing fare: {str(e)}")
+        raise
+
+
+def compute_fare_json(payload: Dict[str, Any]) -> Union[bytes, str]:
+    """
+    Fast path of compute_fare for the HTTP endpoint.
+    
+    Returns the encoded FareResponse body. The body is cached as is, so a
+    cache hit returns the stored JSON without decoding, validating or
+    re-encoding it.
+    
+    Args:
+        payload: Request payload containing origin, destination, and traffic_level
+    
+    Returns:
+        FareResponse JSON body
+    """
+    try:
+        cache_key, traffic_level, surge = _fare_key(payload)
+        cached = cache_get_raw(cache_key)
+        if cached:
+            logger.debug(f"Cache HIT for fare: {cache_key}")
+            return cached
+        
+        body = fast_json.dumps(_calculate_fare(payload, traffic_level, surge).model_dump())
+        cache_set_raw(cache_key, body, TTL_FARE)
+        
+        return body
+        
+    except Exception as e:
+        logger.error(f"Error computing fare: {str(e)}")
+        raise
+
+
+def price_trips(
+    payloads: List[Dict[str, Any]],
+    snapshot: Optional[Tuple[CompiledRules, Optional[GeofenceIndex]]] = None
+) -> Dict[str, Any]:
+    """
+    Evaluate the compiled pricing rules and geofences for many trips at once.
+    
+    Args:
+        payloads: Quote payloads with origin, destination and optional
+            timestamp, traffic_level (surge) and eta_seconds
+        snapshot: (rules, fences) to price with, for callers that must
+            describe the result with the same versions across a hot
+            reload; the current ones if omitted
+    
+    Returns:
+        Dict with the rules used, `fares` (n, vehicle types), `distances`
+        and `durations` (n,), the fences containing each pickup and drop
+        (`pickups`, `drops`; None without geofences), the unserviceable
+        `reasons` (None where serviceable) and the `fences` index
+    """
+    rules, fences = snapshot or (get_pricing_rules(), get_geofences())
+    distances = np.array([trip_distance_km(p["origin"], p["destination"]) for p in payloads])
+    
+    # Without an ETA, assume the configured average speed
+    eta_seconds = [p.get("eta_seconds") for p in payloads]
+    durations = np.array([
+        eta / 60 if eta is not None else distance / settings.avg_speed_kmh * 60
+        for eta, distance in zip(eta_seconds, distances)
+    ])
+    minutes = np.array([minute_of_week(p.get("timestamp")) for p in payloads])
+    surge = np.array([
+        (p.get("traffic_level") or 1.0) * get_surge_multiplier(p["origin"]) for p in payloads
+    ])
+    
+    pickups = drops = None
+    reasons = [None] * len(payloads)
+    fees = None
+    if fences is not None:
+        pickups = fences.fences_at_many([p["origin"]["lat"] for p in payloads],
+                                        [p["origin"]["lng"] for p in payloads])
+        drops = fences.fences_at_many([p["destination"]["lat"] for p in payloads],
+                                      [p["destination"]["lng"] for p in payloads])
+        reasons = [fences.unserviceable_reason(pickup, drop) for pickup, drop in zip(pickups, drops)]
+        fees = rules.fee_matrix([
+            {fences.kinds[f] for f in pickup} | {fences.kinds[f] for f in drop}
+            for pickup, drop in zip(pickups, drops)
+        ])
+    
+    return {
+        "rules": rules,
+        "fares": rules.evaluate(distances, durations, minutes, surge, fees),
+        "distances": distances,
+        "durations": durations,
+        "pickups": pickups,
+        "drops": drops,
+        "reasons": reasons,
+        "fences": fences,
+    }
+
+
+def quote_fares_batch(payloads: List[Dict[str, Any]]) -> List[FareQuoteResponse]:
+    """
+    Price every vehicle type for many trips in one evaluation of the
+    compiled pricing rules.
+    
+    Pickups and drops are checked against the geofences: trips that
+    cannot be served come back with no fares and a reason, and zone fees
+    (e.g. airport) are added for the fence kinds a trip touches.
+    
+    Args:
+        payloads: Quote payloads with origin, destination and optional
+            timestamp, traffic_level (surge), eta_seconds and vehicle_types
+    
+    Returns:
+        One FareQuoteResponse per payload, in order
+    """
+    if not payloads:
+        return []
+    
+    try:
+        priced = price_trips(payloads)
+        rules, fares, fences, reasons = priced["rules"], priced["fares"], priced["fences"], priced["reasons"]
+        
+        results = []
+        for i, payload in enumerate(payloads):
+            columns = rules.columns(payload.get("vehicle_types")) if reasons[i] is None else []
+            zones = sorted(set(priced["pickups"][i]) | set(priced["drops"][i])) if fences is not None else []
+            results.append(FareQuoteResponse(
+                fares={rules.vehicle_types[c]: float(fares[i, c]) for c in columns},
+                distance_km=float(priced["distances"][i]),
+                duration_min=round(float(priced["durations"][i]), 1),
+                currency=rules.currency,
+                rules_version=rules.version,
+                serviceable=reasons[i] is None,
+                unserviceable_reason=reasons[i],
+                zones=[fences.ids[f] for f in zones]
+            ))
+        return results
         
-        # Base fare calculation
-        base_fare = settings.base_fare
-        per_km_rate = settings.per_km_rate
-        fare = base_fare + (per_km_rate * distance_km)
+    except Exception as e:
+        logger.error(f"Error quoting fares: {str(e)}")
+        raise
+
+
+def quote_fares(payload: Dict[str, Any]) -> FareQuoteResponse:
+    """Price every vehicle type for a single trip."""
+    return quote_fares_batch([payload])[0]
+
+
+def parse_trace(body: bytes) -> np.ndarray:
+    """
+    Decode a packed binary GPS trace.
+
+    The body is consecutive little-endian float64 triples
+    (unix timestamp, lat, lng), i.e. a C-ordered float64 array of shape (n, 3).
+
+    Raises:
+        ValueError: If the body is not a whole number of points
+    """
+    if len(body) % 24:
+        raise ValueError("Binary trace length must be a multiple of 24 bytes (3 x float64 per point)")
+    return np.frombuffer(body, dtype="<f8").reshape(-1, 3)
+
+
+def compute_final_fare(trace: np.ndarray) -> FinalFareResponse:
+    """
+    Calculate the metered fare from the GPS trace of a completed ride.
+
+    Invalid and jittered fixes are dropped, the trace is simplified with
+    Douglas-Peucker and distance is summed along the simplified line.
+    Waiting time (below `waiting_speed_kmh`) is taken from the cleaned
+    trace and charged per minute.
+
+    Args:
+        trace: Array of shape (n, 3) with (unix timestamp, lat, lng) rows
+
+    Returns:
+        FinalFareResponse with fare, distance and timing breakdown
+    """
+    try:
+        trace = np.asarray(trace, dtype=np.float64)
+        t, lat, lng = clean_trace(trace[:, 0], trace[:, 1], trace[:, 2], settings.trace_max_speed_kmh)
+        if len(t) < 2:
+            raise ValueError("Trace needs at least two valid points")
         
-        # Apply traffic multiplier if present
-        traffic_level = payload.get("traffic_level", 1.0)
-        if traffic_level:
-            fare = fare * traffic_level
+        keep = simplify(lat, lng, settings.trace_simplify_tolerance_m)
+        distance_km = float(segment_lengths_m(lat[keep], lng[keep]).sum()) / 1000
+        waiting_s = waiting_time_s(t, lat, lng, settings.waiting_speed_kmh)
         
-        # Round fare to 2 decimal places
-        fare = round(fare, 2)
+        distance_fare = settings.per_km_rate * distance_km
+        waiting_fare = settings.per_min_waiting_rate * waiting_s / 60
+        fare = round(settings.base_fare + distance_fare + waiting_fare, 2)
         
         logger.info(
-            f"Calculated fare: {fare} {settings.currency} for distance {distance_km} km "
-            f"(traffic: {traffic_level})"
+            f"Final fare: {fare} {settings.currency} for {distance_km:.3f} km, "
+            f"{waiting_s:.0f}s waiting ({len(trace)} points, {int(keep.sum())} after simplification)"
         )
         
-        result = FareResponse(
+        return FinalFareResponse(
             fare=fare,
-            distance_km=distance_km,
-            currency=settings.currency
+            distance_km=round(distance_km, 3),
+            currency=settings.currency,
+            duration_s=round(float(t[-1] - t[0]), 1),
+            waiting_time_s=round(waiting_s, 1),
+            distance_fare=round(distance_fare, 2),
+            waiting_fare=round(waiting_fare, 2),
+            points_received=len(trace),
+            points_used=int(keep.sum())
         )
         
-        # Cache the result
-        cache_set(cache_key, result.model_dump(), TTL_FARE)
-        
-        return result
-        
     except Exception as e:
-        logger.error(f"Error computing fare: {str(e)}")
+        logger.error(f"Error computing final fare: {str(e)}")
         raise
@@ -1,77 +1,227 @@
-from typing import Optional
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
 from app.schemas.response import ReverseGeoResponse
-from app.utils.redis_client import cache_get, cache_set, generate_geo_key, TTL_GEO
+from app.utils.geo_cache import geo_cache_get, geo_cache_get_many, geo_cache_set
+from app.utils.redis_client import generate_geo_key
+from app.utils.http_client import get_http_client
+from app.services.local_geocoder import get_local_geocoder
+from app.services.geocode_scheduler import (
+    GeocodeScheduler, UpstreamThrottled, PRIORITY_LIVE, PRIORITY_BACKFILL
+)
+from app.core.config import settings
 from app.core.logging import get_logger
-import aiohttp
 
 logger = get_logger(__name__)
 
+# Global upstream scheduler
+_scheduler: Optional[GeocodeScheduler] = None
 
-async def reverse_geocode(lat: float, lon: float) -> ReverseGeoResponse:
+
+def reverse_geocode_local(lat: float, lon: float) -> Optional[ReverseGeoResponse]:
+    """
+    Reverse geocode from the offline gazetteer index.
+    
+    Args:
+        lat: Latitude
+        lon: Longitude
+    
+    Returns:
+        ReverseGeoResponse, or None if no index is loaded or nothing is nearby
+    """
+    geocoder = get_local_geocoder()
+    if geocoder is None:
+        return None
+    
+    place = geocoder.lookup(lat, lon)
+    if place is None:
+        return None
+    
+    region = " ".join(part for part in (place["state"], place["postcode"]) if part)
+    formatted = ", ".join(part for part in (place["locality"], place["city"], region, place["country"]) if part)
+    return ReverseGeoResponse(
+        city=place["city"],
+        locality=place["locality"],
+        state=place["state"],
+        country=place["country"],
+        postal_code=place["postcode"],
+        formatted_address=formatted or None
+    )
+
+
+async def fetch_remote(lat: float, lon: float) -> Optional[ReverseGeoResponse]:
+    """
+    Call Nominatim once and cache the result.
+    
+    Only called by the scheduler, which owns rate limiting and retries.
+    
+    Args:
+        lat: Latitude
+        lon: Longitude
+    
+    Returns:
+        ReverseGeoResponse, or None if the upstream failed
+    
+    Raises:
+        UpstreamThrottled: If Nominatim answered 429
+    """
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "format": "json",
+        "addressdetails": 1
+    }
+    
+    status, data = await get_http_client().get_json(settings.geocoder_url, params=params, max_retries=0)
+    if status == 429:
+        raise UpstreamThrottled()
+    if status != 200 or data is None:
+        logger.warning(f"Reverse geocoding failed with status {status}")
+        return None
+    
+    address = data.get("address", {})
+    result = ReverseGeoResponse(
+        city=address.get("city") or address.get("town") or address.get("village"),
+        locality=address.get("suburb") or address.get("neighbourhood") or address.get("locality"),
+        state=address.get("state"),
+        country=address.get("country"),
+        postal_code=address.get("postcode"),
+        formatted_address=data.get("display_name")
+    )
+    
+    # Cache the result (24 hours - addresses rarely change)
+    geo_cache_set(lat, lon, result.model_dump())
+    return result
+
+
+def _cached_at_dispatch(lat: float, lon: float) -> Optional[ReverseGeoResponse]:
+    cached, _ = geo_cache_get(lat, lon, record=False)
+    return ReverseGeoResponse(**cached) if cached else None
+
+
+def get_geocode_scheduler() -> GeocodeScheduler:
+    """Get the process-wide upstream geocoding scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = GeocodeScheduler(fetch_remote, cached=_cached_at_dispatch)
+    return _scheduler
+
+
+async def reverse_geocode(lat: float, lon: float, priority: int = PRIORITY_LIVE) -> ReverseGeoResponse:
     """
     Perform reverse geocoding to get location details from coordinates.
-    Uses Nominatim (OpenStreetMap) API with Redis caching.
+    Uses the local gazetteer index when available, falling back to the
+    Nominatim (OpenStreetMap) API with Redis caching.
     
     Args:
         lat: Latitude
         lon: Longitude
+        priority: PRIORITY_LIVE for rider-facing lookups, PRIORITY_BACKFILL
+            for bulk jobs that may wait behind them
     
     Returns:
         ReverseGeoResponse with location details
     """
     try:
-        # Check cache first (geocoding results rarely change)
-        cache_key = generate_geo_key(lat, lon)
-        cached = cache_get(cache_key)
+        # Local index answers in microseconds, ahead of any network hop
+        local = reverse_geocode_local(lat, lon)
+        if local is not None:
+            return local
+        
+        # Then the cache, reusing results cached for nearby points
+        cached, distance_m = geo_cache_get(lat, lon)
         if cached:
-            logger.info(f"Cache HIT for geocode: {cache_key}")
+            logger.info(f"Cache HIT for geocode at {distance_m}m: {lat}, {lon}")
             return ReverseGeoResponse(**cached)
         
-        # Use Nominatim API (free, for demonstration)
-        url = "https://nominatim.openstreetmap.org/reverse"
-        params = {
-            "lat": lat,
-            "lon": lon,
-            "format": "json",
-            "addressdetails": 1
-        }
-        headers = {
-            "User-Agent": "RapidRide/1.0"
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    address = data.get("address", {})
-                    
-                    result = ReverseGeoResponse(
-                        city=address.get("city") or address.get("town") or address.get("village"),
-                        locality=address.get("suburb") or address.get("neighbourhood") or address.get("locality"),
-                        state=address.get("state"),
-                        country=address.get("country"),
-                        postal_code=address.get("postcode"),
-                        formatted_address=data.get("display_name")
-                    )
-                    
-                    # Cache the result (24 hours - addresses rarely change)
-                    cache_set(cache_key, result.model_dump(), TTL_GEO)
-                    
-                    return result
-                else:
-                    logger.warning(f"Reverse geocoding failed with status {response.status}")
-                    return ReverseGeoResponse(formatted_address=f"Location: {lat}, {lon}")
-                    
+        if settings.geocoder_remote_fallback:
+            # Rate-limited, deduplicated call to Nominatim
+            timeout = settings.geocoder_live_timeout_s if priority == PRIORITY_LIVE else None
+            result = await get_geocode_scheduler().lookup(lat, lon, priority=priority, timeout=timeout)
+            if result is not None:
+                return result
+            
     except Exception as e:
         logger.error(f"Error in reverse geocoding: {str(e)}")
-        # Return minimal response with coordinates
-        return ReverseGeoResponse(formatted_address=f"Location: {lat}, {lon}")
+    
+    # Return minimal response with coordinates
+    return ReverseGeoResponse(formatted_address=f"Location: {lat}, {lon}")
+
+
+async def reverse_geocode_batch(points: List[Tuple[float, float]], priority: int = PRIORITY_BACKFILL,
+                                timeout: Optional[float] = None) -> Tuple[List[ReverseGeoResponse], Dict[str, int]]:
+    """
+    Reverse geocode many coordinates at once.
+    
+    Points falling in the same cache cell are resolved once. Each unique
+    cell is tried against the local index, then a single cache multi-get;
+    the remaining misses go through the rate-limited upstream scheduler.
+    
+    Args:
+        points: (lat, lon) pairs
+        priority: Scheduler lane for upstream misses
+        timeout: Stop waiting for upstream misses after this many seconds;
+            their lookups still complete and fill the cache
+    
+    Returns:
+        (results aligned with points, resolution counts)
+    """
+    cells: Dict[str, Tuple[float, float]] = {}
+    for lat, lon in points:
+        cells.setdefault(generate_geo_key(lat, lon), (lat, lon))
+    
+    resolved: Dict[str, ReverseGeoResponse] = {}
+    counts = {"points": len(points), "unique": len(cells), "local": 0, "cache": 0, "upstream": 0, "unresolved": 0}
+    
+    pending = []
+    for key, (lat, lon) in cells.items():
+        local = reverse_geocode_local(lat, lon)
+        if local is not None:
+            resolved[key] = local
+            counts["local"] += 1
+        else:
+            pending.append(key)
+    
+    if pending:
+        cached = geo_cache_get_many([cells[key] for key in pending])
+        misses = []
+        for key, (value, _) in zip(pending, cached):
+            if value:
+                resolved[key] = ReverseGeoResponse(**value)
+                counts["cache"] += 1
+            else:
+                misses.append(key)
+        
+        if misses and settings.geocoder_remote_fallback:
+            scheduler = get_geocode_scheduler()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            
+            async def resolve(key: str):
+                lat, lon = cells[key]
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    result = await asyncio.wait_for(scheduler.lookup(lat, lon, priority=priority), remaining)
+                except asyncio.TimeoutError:
+                    result = None
+                if result is not None:
+                    resolved[key] = result
+                    counts["upstream"] += 1
+            
+            await asyncio.gather(*(resolve(key) for key in misses))
+    
+    results = []
+    for lat, lon in points:
+        result = resolved.get(generate_geo_key(lat, lon))
+        results.append(result or ReverseGeoResponse(formatted_address=f"Location: {lat}, {lon}"))
+    counts["unresolved"] = counts["unique"] - len(resolved)
+    
+    return results, counts
 
 
 def reverse_geocode_sync(lat: float, lon: float) -> ReverseGeoResponse:
     """
-    Synchronous version of reverse geocoding (simplified).
-    Returns basic location information.
+    Synchronous version of reverse geocoding.
+    Uses the local gazetteer index or cache; never calls the remote API.
     
     Args:
         lat: Latitude
@@ -80,15 +230,17 @@ def reverse_geocode_sync(lat: float, lon: float) -> ReverseGeoResponse:
     Returns:
         ReverseGeoResponse with basic location info
     """
-    # Check cache first
-    cache_key = generate_geo_key(lat, lon)
-    cached = cache_get(cache_key)
+    local = reverse_geocode_local(lat, lon)
+    if local is not None:
+        return local
+    
+    # Then the cache
+    cached, distance_m = geo_cache_get(lat, lon)
     if cached:
-        logger.info(f"Cache HIT for geocode (sync): {cache_key}")
+        logger.info(f"Cache HIT for geocode (sync) at {distance_m}m: {lat}, {lon}")
         return ReverseGeoResponse(**cached)
     
-    # For synchronous calls, return a simplified response
-    # In production, you might want to use a local geocoding database
+    # No local coverage and nothing cached
     return ReverseGeoResponse(
         formatted_address=f"Location: {lat}, {lon}",
         city="Unknown",
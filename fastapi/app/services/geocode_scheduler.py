@@ -0,0 +1,329 @@
+"""
+Upstream geocoding scheduler.
+Serialises remote reverse-geocode calls through a rate limiter shared via
+Redis, with single-flight dedup of identical or nearby in-flight lookups,
+a short negative cache, and a priority lane for live requests over
+backfills.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.utils.redis_client import get_redis, KEY_PREFIX, generate_geo_key
+from app.utils.geo_utils import haversine_km
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PRIORITY_LIVE = 0
+PRIORITY_BACKFILL = 1
+
+# Pause applied to the whole scheduler after the upstream throttles us
+THROTTLE_PAUSE_S = 5.0
+
+RATE_LIMIT_KEY = f"{KEY_PREFIX}geo:upstream:tat"
+
+# GCRA reservation: returns how long the caller must wait for its slot
+_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local wait = tat - tolerance - now
+if wait < 0 then wait = 0 end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class UpstreamThrottled(Exception):
+    """Raised by the fetch function when the upstream answers 429."""
+
+
+class RateLimiter:
+    """
+    GCRA rate limiter that reserves slots rather than rejecting.
+
+    Uses a Redis key so API and Celery processes share one budget against
+    the upstream; falls back to a process-local schedule without Redis.
+    """
+
+    def __init__(self, rate_per_s: float, burst: int = 1, key: Optional[str] = RATE_LIMIT_KEY):
+        self.interval = 1.0 / rate_per_s
+        self.tolerance = (max(burst, 1) - 1) * self.interval
+        self.key = key
+        self._tat = 0.0
+        self._script = None
+
+    def _reserve_local(self, now: float) -> float:
+        tat = max(self._tat, now)
+        self._tat = tat + self.interval
+        return max(0.0, tat - self.tolerance - now)
+
+    def reserve(self) -> float:
+        """Reserve the next slot and return seconds to wait for it."""
+        now = time.time()
+        client = get_redis() if self.key else None
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(_GCRA_SCRIPT)
+                return float(self._script(keys=[self.key], args=[now, self.interval, self.tolerance]))
+            except Exception as e:
+                logger.warning(f"Shared rate limiter unavailable, using local: {e}")
+        return self._reserve_local(now)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class _Job:
+    __slots__ = ("lat", "lon", "key", "priority", "future", "started")
+
+    def __init__(self, lat: float, lon: float, priority: int, future: asyncio.Future):
+        self.lat = lat
+        self.lon = lon
+        self.key = generate_geo_key(lat, lon)
+        self.priority = priority
+        self.future = future
+        self.started = False
+
+
+class GeocodeScheduler:
+    """
+    Rate-limited, deduplicating queue in front of the remote geocoder.
+
+    Args:
+        fetch: Coroutine (lat, lon) -> result or None; raises UpstreamThrottled on 429
+        cached: Optional (lat, lon) -> result re-checked just before dispatch,
+            so queued jobs filled meanwhile (e.g. by another process) cost nothing
+        rate_per_s: Upstream request budget
+        burst: Requests allowed back-to-back
+        dedup_radius_m: In-flight lookups within this distance share one call
+        negative_ttl_s: How long failed lookups are answered without retrying
+        max_in_flight: Concurrent upstream requests
+        backfill_queue_size: Queued backfill jobs before backfill callers block
+    """
+
+    def __init__(self, fetch: Callable[[float, float], Awaitable[Optional[Any]]],
+                 cached: Callable[[float, float], Optional[Any]] = None,
+                 rate_per_s: float = None, burst: int = None,
+                 dedup_radius_m: float = None, negative_ttl_s: float = None,
+                 max_in_flight: int = None, backfill_queue_size: int = None,
+                 limiter: RateLimiter = None):
+        self.fetch = fetch
+        self.cached = cached
+        self.limiter = limiter or RateLimiter(
+            rate_per_s or settings.geocoder_rate_per_s,
+            burst or settings.geocoder_burst
+        )
+        self.dedup_radius_m = settings.geo_cache_radius_m if dedup_radius_m is None else dedup_radius_m
+        self.negative_ttl_s = settings.geocoder_negative_ttl_s if negative_ttl_s is None else negative_ttl_s
+        self.max_in_flight = max_in_flight or settings.geocoder_max_in_flight
+        self.backfill_queue_size = backfill_queue_size or settings.geocoder_backfill_queue_size
+        self.stats = {"upstream_calls": 0, "deduplicated": 0, "negative_hits": 0,
+                      "cache_hits_at_dispatch": 0, "throttled": 0, "failed": 0}
+        self._negative: Dict[str, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _reset(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._jobs: Dict[str, _Job] = {}
+        self._cells: Dict[tuple, set] = {}
+        self._wakeup = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._backfill_slots = asyncio.Semaphore(self.backfill_queue_size)
+        self._paused_until = 0.0
+        self._dispatcher = loop.create_task(self._dispatch_loop())
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher is None or self._dispatcher.done():
+            self._reset(loop)
+
+    async def stop(self):
+        """Stop dispatching; queued jobs resolve to None."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+            for job in self._jobs.values():
+                if not job.future.done():
+                    job.future.set_result(None)
+            self._jobs.clear()
+            self._cells.clear()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.started) if self._loop else 0
+
+    @staticmethod
+    def _cell(lat: float, lon: float) -> tuple:
+        # ~110 m cells; neighbours cover any dedup radius up to that
+        return (round(lat, 3), round(lon, 3))
+
+    def _find_nearby(self, lat: float, lon: float) -> Optional[_Job]:
+        job = self._jobs.get(generate_geo_key(lat, lon))
+        if job is not None or self.dedup_radius_m <= 0:
+            return job
+        point = {"lat": lat, "lng": lon}
+        radius_km = self.dedup_radius_m / 1000
+        row, col = self._cell(lat, lon)
+        for d_lat in (-0.001, 0, 0.001):
+            for d_lon in (-0.001, 0, 0.001):
+                for key in self._cells.get((round(row + d_lat, 3), round(col + d_lon, 3)), ()):
+                    other = self._jobs[key]
+                    if haversine_km(point, {"lat": other.lat, "lng": other.lon}) <= radius_km:
+                        return other
+        return None
+
+    def _is_negative(self, key: str) -> bool:
+        expires = self._negative.get(key)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._negative[key]
+            return False
+        return True
+
+    def _push(self, job: _Job):
+        heapq.heappush(self._heap, (job.priority, next(self._seq), job))
+        self._wakeup.set()
+
+    async def lookup(self, lat: float, lon: float, priority: int = PRIORITY_LIVE,
+                     timeout: float = None) -> Optional[Any]:
+        """
+        Geocode through the scheduler.
+
+        Args:
+            lat: Latitude
+            lon: Longitude
+            priority: PRIORITY_LIVE or PRIORITY_BACKFILL
+            timeout: Give up waiting after this many seconds; the upstream
+                call still completes and fills the cache
+
+        Returns:
+            Fetch result, or None on failure, timeout or a negative-cache hit
+        """
+        self._ensure_started()
+        key = generate_geo_key(lat, lon)
+        if self._is_negative(key):
+            self.stats["negative_hits"] += 1
+            return None
+
+        job = self._find_nearby(lat, lon)
+        if job is None and priority == PRIORITY_BACKFILL:
+            await self._backfill_slots.acquire()
+            # Another caller may have queued this point while we waited
+            job = self._find_nearby(lat, lon)
+            if job is not None:
+                self._backfill_slots.release()
+
+        if job is not None:
+            self.stats["deduplicated"] += 1
+            if priority < job.priority and not job.started:
+                # A live caller is now waiting on a queued backfill job
+                job.priority = priority
+                self._push(job)
+        else:
+            job = _Job(lat, lon, priority, self._loop.create_future())
+            if priority == PRIORITY_BACKFILL:
+                job.future.add_done_callback(lambda _: self._backfill_slots.release())
+            self._jobs[job.key] = job
+            self._cells.setdefault(self._cell(lat, lon), set()).add(job.key)
+            self._push(job)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Geocode lookup timed out in queue: {lat}, {lon}")
+            return None
+
+    async def _next_job(self) -> _Job:
+        while True:
+            while self._heap:
+                priority, _, job = heapq.heappop(self._heap)
+                # Skip stale heap entries left by priority bumps
+                if job.started or priority != job.priority or job.future.done():
+                    continue
+                return job
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    async def _dispatch_loop(self):
+        while True:
+            job = await self._next_job()
+            await self._in_flight.acquire()
+
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+            if self.cached is not None:
+                hit = self.cached(job.lat, job.lon)
+                if hit is not None:
+                    self.stats["cache_hits_at_dispatch"] += 1
+                    self._finish(job, hit)
+                    self._in_flight.release()
+                    continue
+
+            # A live job may have arrived while we waited; serve it first
+            if self._heap and self._heap[0][0] < job.priority:
+                self._push(job)
+                self._in_flight.release()
+                continue
+
+            job.started = True
+            await self.limiter.acquire()
+            asyncio.create_task(self._run(job))
+
+    async def _run(self, job: _Job):
+        result = None
+        throttled = False
+        try:
+            self.stats["upstream_calls"] += 1
+            result = await self.fetch(job.lat, job.lon)
+            if result is None:
+                self.stats["failed"] += 1
+        except UpstreamThrottled:
+            self.stats["throttled"] += 1
+            throttled = True
+            self._paused_until = time.monotonic() + THROTTLE_PAUSE_S
+            logger.warning(f"Geocoder throttled upstream; pausing {THROTTLE_PAUSE_S}s")
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Upstream geocode failed for {job.lat}, {job.lon}: {str(e)}")
+        finally:
+            if throttled:
+                # Not the point's fault; retry once the pause is over
+                job.started = False
+                self._push(job)
+            else:
+                if result is None:
+                    now = time.monotonic()
+                    if len(self._negative) > 10000:
+                        self._negative = {k: v for k, v in self._negative.items() if v > now}
+                    self._negative[job.key] = now + self.negative_ttl_s
+                self._finish(job, result)
+            self._in_flight.release()
+
+    def _finish(self, job: _Job, result: Optional[Any]):
+        if self._jobs.pop(job.key, None) is not None:
+            cell = self._cell(job.lat, job.lon)
+            self._cells[cell].discard(job.key)
+            if not self._cells[cell]:
+                del self._cells[cell]
+        if not job.future.done():
+            job.future.set_result(result)
@@ -0,0 +1,322 @@
+"""
+Geofences: service areas, airport zones and restricted areas.
+Polygons are read from a GeoJSON file and rasterized into a two-level
+grid. Coarse cells fully inside a fence answer membership directly;
+cells crossed by a fence boundary are split into fine cells, and only
+fine cells on the boundary fall back to an exact point-in-polygon test.
+The fence file is re-checked periodically and reloaded when it changes.
+
+Feature properties:
+    id: Fence identifier (defaults to the feature's position)
+    kind: "service_area", "airport", "restricted" or any custom kind
+    name: Optional display name
+"""
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+SERVICE_AREA = "service_area"
+RESTRICTED = "restricted"
+
+# Points x edges evaluated at once by the vectorized point-in-polygon test
+PIP_CHUNK_ELEMENTS = 4_000_000
+
+_EMPTY: Tuple[Tuple[int, ...], Tuple[int, ...]] = ((), ())
+
+
+class GeofenceError(ValueError):
+    """Raised when a fence file is malformed."""
+
+
+def _rings(geometry: Dict) -> List[np.ndarray]:
+    """Rings as (k, 2) [lng, lat] arrays; holes are handled by even-odd counting."""
+    if geometry.get("type") == "Polygon":
+        rings = geometry["coordinates"]
+    elif geometry.get("type") == "MultiPolygon":
+        rings = [ring for polygon in geometry["coordinates"] for ring in polygon]
+    else:
+        return []
+    rings = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in rings]
+    return [ring for ring in rings if len(ring) >= 3]
+
+
+def points_in_rings(lat: np.ndarray, lng: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+    """Even-odd ray casting of many points against all rings of one polygon."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    inside = np.zeros(len(lat), dtype=bool)
+    for ring in rings:
+        x, y = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x, -1), np.roll(y, -1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Horizontal edges never cross the ray; a zero slope keeps them NaN-free
+            slope = np.where(y2 != y, (x2 - x) / (y2 - y), 0.0)
+        step = max(1, PIP_CHUNK_ELEMENTS // len(x))
+        for start in range(0, len(lat), step):
+            py = lat[start:start + step, None]
+            px = lng[start:start + step, None]
+            crosses = (y > py) != (y2 > py)
+            x_at = x + (py - y) * slope
+            inside[start:start + step] ^= (np.count_nonzero(crosses & (px < x_at), axis=1) % 2).astype(bool)
+    return inside
+
+
+def _edge_cells(rings: List[np.ndarray], size: float) -> np.ndarray:
+    """
+    (rows, cols) of every cell a ring edge may touch, at cell size `size`.
+
+    Edges are sampled at half-cell steps and each sampled cell is dilated
+    by one cell, so every cell an edge passes through (even clipping a
+    corner) is included.
+    """
+    rows, cols = [], []
+    for ring in rings:
+        a = ring
+        b = np.roll(ring, -1, axis=0)
+        length = np.abs(b - a).max(axis=1) / size
+        samples = np.ceil(2 * length).astype(np.int64) + 1
+        edge = np.repeat(np.arange(len(a)), samples)
+        offsets = np.arange(samples.sum()) - np.repeat(np.cumsum(samples) - samples, samples)
+        t = (offsets / np.maximum(samples[edge] - 1, 1))[:, None]
+        points = a[edge] + (b[edge] - a[edge]) * t
+        rows.append(np.floor((points[:, 1] + 90.0) / size).astype(np.int64))
+        cols.append(np.floor((points[:, 0] + 180.0) / size).astype(np.int64))
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    cells = np.unique(np.stack([rows, cols], axis=1), axis=0)
+    neighbours = np.array([(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)])
+    dilated = (cells[:, None, :] + neighbours[None, :, :]).reshape(-1, 2)
+    return np.unique(dilated, axis=0)
+
+
+class GeofenceIndex:
+    """
+    Multi-resolution grid index over a set of fences.
+
+    Args:
+        features: GeoJSON features (Polygon or MultiPolygon geometries)
+        cell_deg: Coarse cell size in degrees
+        fine_factor: Fine cells per coarse cell along each axis
+    """
+
+    def __init__(self, features: List[Dict[str, Any]], cell_deg: float = None,
+                 fine_factor: int = None, source: str = "inline"):
+        self.cell_deg = cell_deg or settings.geofence_cell_deg
+        self.fine_factor = fine_factor or settings.geofence_fine_factor
+        self.fine_deg = self.cell_deg / self.fine_factor
+        self._cols = int(math.ceil(360.0 / self.cell_deg)) + 1
+        self._fine_cols = self._cols * self.fine_factor
+        self.source = source
+
+        self.ids: List[str] = []
+        self.kinds: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.rings: List[List[np.ndarray]] = []
+        for i, feature in enumerate(features):
+            rings = _rings(feature.get("geometry") or {})
+            if not rings:
+                continue
+            properties = feature.get("properties") or {}
+            self.ids.append(str(properties.get("id", i)))
+            self.kinds.append(str(properties.get("kind", SERVICE_AREA)))
+            self.names.append(properties.get("name"))
+            self.rings.append(rings)
+        if len(set(self.ids)) != len(self.ids):
+            raise GeofenceError("Duplicate fence ids")
+        self.has_service_areas = SERVICE_AREA in self.kinds
+
+        # Edges of each fence bucketed by the coarse rows they span, for exact tests
+        self._edges: List[Dict[int, Tuple[np.ndarray, ...]]] = [self._bucket_edges(r) for r in self.rings]
+
+        coarse: Dict[int, Tuple[List[int], List[int]]] = {}
+        fine: Dict[int, Tuple[List[int], List[int]]] = {}
+        for fence, rings in enumerate(self.rings):
+            self._rasterize(fence, rings, coarse, fine)
+        self._coarse = {key: (tuple(a), tuple(b)) for key, (a, b) in coarse.items()}
+        self._fine = {key: (tuple(a), tuple(b)) for key, (a, b) in fine.items()}
+
+    def _bucket_edges(self, rings: List[np.ndarray]) -> Dict[int, Tuple[np.ndarray, ...]]:
+        a = np.concatenate(rings)
+        b = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(b[:, 1] != a[:, 1], (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1]), 0.0)
+        row_lo = np.floor((np.minimum(a[:, 1], b[:, 1]) + 90.0) / self.cell_deg).astype(np.int64)
+        row_hi = np.floor((np.maximum(a[:, 1], b[:, 1]) + 90.0) / self.cell_deg).astype(np.int64)
+        spans = row_hi - row_lo + 1
+        edge = np.repeat(np.arange(len(a)), spans)
+        rows = row_lo[edge] + np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+        order = np.argsort(rows, kind="stable")
+        rows, edge = rows[order], edge[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        buckets = {}
+        for start, end in zip(starts, np.r_[starts[1:], len(rows)]):
+            e = edge[start:end]
+            buckets[int(rows[start])] = (a[e, 0], a[e, 1], b[e, 1], slope[e])
+        return buckets
+
+    def _contains(self, fence: int, lat: float, lng: float, row: int) -> bool:
+        """Exact even-odd test against the fence edges spanning the point's row."""
+        bucket = self._edges[fence].get(row)
+        if bucket is None:
+            return False
+        x, y, y2, slope = bucket
+        crosses = (y > lat) != (y2 > lat)
+        return bool(np.count_nonzero(crosses & (lng < x + (lat - y) * slope)) % 2)
+
+    def _rasterize(self, fence: int, rings: List[np.ndarray], coarse: Dict, fine: Dict):
+        size, factor = self.cell_deg, self.fine_factor
+        outer = np.concatenate(rings)
+        row0 = int(math.floor((outer[:, 1].min() + 90.0) / size))
+        row1 = int(math.floor((outer[:, 1].max() + 90.0) / size))
+        col0 = int(math.floor((outer[:, 0].min() + 180.0) / size))
+        col1 = int(math.floor((outer[:, 0].max() + 180.0) / size))
+
+        # Coarse cells: boundary cells, then interior cells by their centres
+        boundary = _edge_cells(rings, size)
+        boundary_keys = boundary[:, 0] * self._cols + boundary[:, 1]
+        rows, cols = np.meshgrid(np.arange(row0, row1 + 1), np.arange(col0, col1 + 1), indexing="ij")
+        rows, cols = rows.ravel(), cols.ravel()
+        keys = rows * self._cols + cols
+        interior = ~np.isin(keys, boundary_keys)
+        centre_lat = (rows[interior] + 0.5) * size - 90.0
+        centre_lng = (cols[interior] + 0.5) * size - 180.0
+        for key in keys[interior][points_in_rings(centre_lat, centre_lng, rings)].tolist():
+            coarse.setdefault(key, ([], []))[0].append(fence)
+        for key in boundary_keys.tolist():
+            coarse.setdefault(key, ([], []))[1].append(fence)
+
+        # Fine cells inside the coarse boundary cells
+        fine_boundary = _edge_cells(rings, self.fine_deg)
+        fine_boundary_keys = fine_boundary[:, 0] * self._fine_cols + fine_boundary[:, 1]
+        sub_r, sub_c = np.meshgrid(np.arange(factor), np.arange(factor), indexing="ij")
+        fine_rows = (boundary[:, 0, None] * factor + sub_r.ravel()).ravel()
+        fine_cols = (boundary[:, 1, None] * factor + sub_c.ravel()).ravel()
+        fine_keys = fine_rows * self._fine_cols + fine_cols
+        on_edge = np.isin(fine_keys, fine_boundary_keys)
+        centre_lat = (fine_rows[~on_edge] + 0.5) * self.fine_deg - 90.0
+        centre_lng = (fine_cols[~on_edge] + 0.5) * self.fine_deg - 180.0
+        for key in fine_keys[~on_edge][points_in_rings(centre_lat, centre_lng, rings)].tolist():
+            fine.setdefault(key, ([], []))[0].append(fence)
+        for key in fine_keys[on_edge].tolist():
+            fine.setdefault(key, ([], []))[1].append(fence)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _fences_at(self, lat: float, lng: float, row: int, col: int) -> List[int]:
+        inside, boundary = self._coarse.get(row * self._cols + col, _EMPTY)
+        if not boundary:
+            return list(inside)
+        hits = list(inside)
+        # Clamped to the coarse cell in case rounding puts the point across its edge
+        factor = self.fine_factor
+        fine_row = min(max(math.floor((lat + 90.0) / self.fine_deg), row * factor), row * factor + factor - 1)
+        fine_col = min(max(math.floor((lng + 180.0) / self.fine_deg), col * factor), col * factor + factor - 1)
+        fine_inside, fine_boundary = self._fine.get(fine_row * self._fine_cols + fine_col, _EMPTY)
+        hits.extend(fine_inside)
+        for fence in fine_boundary:
+            if self._contains(fence, lat, lng, row):
+                hits.append(fence)
+        return hits
+
+    def fences_at(self, lat: float, lng: float) -> List[int]:
+        """Indices of the fences containing a point."""
+        # Same cell arithmetic as the build (floor of a true division), so
+        # points on cell edges land in the cell they were indexed under
+        return self._fences_at(lat, lng, math.floor((lat + 90.0) / self.cell_deg),
+                               math.floor((lng + 180.0) / self.cell_deg))
+
+    def fences_at_many(self, lat: np.ndarray, lng: np.ndarray) -> List[List[int]]:
+        """Indices of the fences containing each point."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        rows = np.floor((lat + 90.0) / self.cell_deg).astype(np.int64).tolist()
+        cols = np.floor((lng + 180.0) / self.cell_deg).astype(np.int64).tolist()
+        return [self._fences_at(a, b, r, c) for a, b, r, c in zip(lat.tolist(), lng.tolist(), rows, cols)]
+
+    def describe(self, fences: List[int]) -> List[Dict[str, Optional[str]]]:
+        return [{"id": self.ids[f], "kind": self.kinds[f], "name": self.names[f]} for f in fences]
+
+    def unserviceable_reason(self, pickup: List[int], drop: List[int]) -> Optional[str]:
+        """
+        Why a trip cannot be served, or None if it can.
+
+        Pickups and drops must be inside a service area (when any are
+        defined) and outside every restricted area.
+        """
+        for label, fences in (("pickup", pickup), ("drop", drop)):
+            kinds = {self.kinds[f] for f in fences}
+            if RESTRICTED in kinds:
+                return f"{label} is in a restricted area"
+            if self.has_service_areas and SERVICE_AREA not in kinds:
+                return f"{label} is outside the service area"
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fences": len(self.ids),
+            "coarse_cells": len(self._coarse),
+            "fine_cells": len(self._fine),
+            "cell_deg": self.cell_deg,
+            "fine_deg": self.fine_deg,
+        }
+
+
+def load_geofences(path: str) -> GeofenceIndex:
+    """Read and index a GeoJSON FeatureCollection of fences."""
+    with open(path) as f:
+        collection = json.load(f)
+    try:
+        return GeofenceIndex(collection["features"], source=path)
+    except (KeyError, TypeError, IndexError) as e:
+        raise GeofenceError(f"Malformed fence file {path}: {e}")
+
+
+# Global fence index
+_geofences: Optional[GeofenceIndex] = None
+_geofences_version = None
+_last_geofences_check = None
+
+
+def get_geofences() -> Optional[GeofenceIndex]:
+    """
+    Get the fence index, or None if no fence file is configured.
+
+    The file is re-checked at most every `geofence_check_interval_s`
+    seconds and re-indexed when it changes. A file that fails to parse is
+    logged and the previous index keeps serving.
+    """
+    global _geofences, _geofences_version, _last_geofences_check
+
+    now = time.monotonic()
+    if _last_geofences_check is not None and now - _last_geofences_check < settings.geofence_check_interval_s:
+        return _geofences
+    _last_geofences_check = now
+
+    path = settings.geofence_path
+    try:
+        version = os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        version = None
+    if version == _geofences_version:
+        return _geofences
+
+    if version is None:
+        if _geofences is not None:
+            logger.warning(f"Geofence file {path} removed, geofencing disabled")
+        _geofences = None
+    else:
+        try:
+            start = time.perf_counter()
+            _geofences = load_geofences(path)
+            logger.info(f"Geofences loaded from {path} in {time.perf_counter() - start:.3f}s: {_geofences.stats()}")
+        except Exception as e:
+            logger.error(f"Failed to load geofences, keeping previous: {str(e)}")
+    _geofences_version = version
+    return _geofences
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Tuple
+from app.services.eta_service import get_model, is_model_loaded
+from app.utils.rmq import check_rabbitmq_connection
+from app.utils.redis_client import check_redis_connection
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _probe_model() -> bool:
+    get_model()
+    return is_model_loaded()
+
+
+# Probe name -> blocking check returning True when healthy
+PROBES: Dict[str, Callable[[], bool]] = {
+    "model": _probe_model,
+    "rabbitmq": lambda: check_rabbitmq_connection(settings.rabbitmq_url),
+    "redis": check_redis_connection,
+}
+
+
+class HealthMonitor:
+    """
+    Runs dependency probes in the background and caches the results.
+
+    Each probe runs in a worker thread with a timeout, so a slow broker
+    or cache never blocks the event loop or the /health request itself.
+    A probe that timed out keeps its thread until the check returns; no
+    new probe of that dependency starts until it does, so a hanging
+    dependency holds one thread rather than one per interval.
+    """
+
+    def __init__(self, interval_s: float = None, timeout_s: float = None):
+        self.interval_s = interval_s or settings.health_probe_interval_s
+        self.timeout_s = timeout_s or settings.health_probe_timeout_s
+        self.snapshot: Dict[str, Dict] = {}
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Probe name -> (running check, perf_counter when it started)
+        self._in_flight: Dict[str, Tuple[asyncio.Future, float]] = {}
+
+    async def _run_probe(self, name: str, probe: Callable[[], bool]) -> Dict:
+        running = self._in_flight.get(name)
+        if running is not None and not running[0].done():
+            stuck_s = time.perf_counter() - running[1]
+            return {
+                "ok": False,
+                "latency_ms": round(stuck_s * 1000, 2),
+                "error": f"previous probe still running after {stuck_s:.1f}s"
+            }
+
+        start = time.perf_counter()
+        check = asyncio.ensure_future(asyncio.to_thread(probe))
+        # Consume the outcome even if nobody is waiting for it any more
+        check.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[name] = (check, start)
+        error = None
+        try:
+            ok = await asyncio.wait_for(asyncio.shield(check), self.timeout_s)
+        except asyncio.TimeoutError:
+            ok, error = False, f"timed out after {self.timeout_s}s"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        return {
+            "ok": bool(ok),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "error": error
+        }
+
+    async def refresh(self):
+        """Run all probes concurrently and store the results."""
+        async with self._lock:
+            names = list(PROBES)
+            results = await asyncio.gather(*(self._run_probe(name, PROBES[name]) for name in names))
+            self.snapshot = dict(zip(names, results))
+            self.checked_at = time.time()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health probe cycle failed: {str(e)}")
+            await asyncio.sleep(self.interval_s)
+
+    async def start(self):
+        """Start background probing."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop background probing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def age_s(self) -> Optional[float]:
+        """Seconds since the last completed probe cycle."""
+        return None if self.checked_at is None else round(time.time() - self.checked_at, 3)
+
+    async def get_snapshot(self) -> Dict[str, Dict]:
+        """Latest probe results, probing once inline if none exist yet."""
+        if self.checked_at is None:
+            await self.refresh()
+        return self.snapshot
+
+    def is_ready(self) -> bool:
+        """
+        Ready once a fresh snapshot exists and every probe listed in
+        `health_required_probes` is passing.
+        """
+        age = self.age_s
+        if age is None or age > settings.health_max_age_s:
+            return False
+        required = [name.strip() for name in settings.health_required_probes.split(",") if name.strip()]
+        return all(self.snapshot.get(name, {}).get("ok") for name in required)
+
+
+# Global monitor instance
+_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Get the process-wide health monitor."""
+    global _monitor
+    if _monitor is None:
+        _monitor = HealthMonitor()
+    return _monitor
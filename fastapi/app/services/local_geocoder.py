@@ -0,0 +1,311 @@
+"""
+Offline reverse geocoder.
+Answers reverse-geocode lookups from a preprocessed gazetteer (OSM places
+or postcode points, plus optional boundary polygons) held in memory-mapped
+numpy arrays with a uniform lat/lng grid index.
+
+Build an index with:
+    python -m app.services.local_geocoder --points places.csv [--polygons boundaries.geojson] --out data/geocoder
+"""
+import argparse
+import json
+import math
+import os
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+META_FILE = "meta.json"
+PLACES_FILE = "places.json"
+PLACE_FIELDS = ["city", "locality", "state", "country", "postcode"]
+KM_PER_DEG = 111.195
+
+
+def _cell_rows_cols(lat, lng, cell_deg: float):
+    rows = np.floor((np.asarray(lat) + 90.0) / cell_deg).astype(np.int64)
+    cols = np.floor((np.asarray(lng) + 180.0) / cell_deg).astype(np.int64)
+    return rows, cols
+
+
+def _clean(value) -> Optional[str]:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _place_id(places: List[Dict], index: Dict[tuple, int], record: Dict) -> int:
+    place = tuple(_clean(record.get(field)) for field in PLACE_FIELDS)
+    if place not in index:
+        index[place] = len(places)
+        places.append(dict(zip(PLACE_FIELDS, place)))
+    return index[place]
+
+
+def _rings(geometry: Dict) -> List[List]:
+    if geometry["type"] == "Polygon":
+        return geometry["coordinates"]
+    if geometry["type"] == "MultiPolygon":
+        return [ring for polygon in geometry["coordinates"] for ring in polygon]
+    return []
+
+
+def build_index(points_path: str, output_dir: str, polygons_path: str = None,
+                cell_deg: float = 0.01) -> Dict:
+    """
+    Preprocess a gazetteer into a local geocoder index directory.
+
+    Args:
+        points_path: CSV with lat, lng (or lon) and any of city, locality,
+            state, country, postcode
+        output_dir: Directory to write the index to
+        polygons_path: Optional GeoJSON FeatureCollection of boundaries whose
+            properties use the same field names (e.g. city or state limits)
+        cell_deg: Grid cell size in degrees
+
+    Returns:
+        Index metadata
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    places: List[Dict] = []
+    place_index: Dict[tuple, int] = {}
+
+    df = pd.read_csv(points_path)
+    if "lng" not in df.columns and "lon" in df.columns:
+        df = df.rename(columns={"lon": "lng"})
+    df = df.dropna(subset=["lat", "lng"])
+    place_ids = np.array([_place_id(places, place_index, rec) for rec in df.to_dict("records")], dtype=np.int32)
+
+    lat = df["lat"].to_numpy(dtype=np.float64)
+    lng = df["lng"].to_numpy(dtype=np.float64)
+    rows, cols = _cell_rows_cols(lat, lng, cell_deg)
+    n_cols = int(math.ceil(360.0 / cell_deg)) + 1
+    keys = rows * n_cols + cols
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    cell_keys, cell_starts = np.unique(keys, return_index=True)
+
+    arrays = {
+        "point_lat": lat[order].astype(np.float32),
+        "point_lng": lng[order].astype(np.float32),
+        "point_place": place_ids[order],
+        "cell_keys": cell_keys,
+        "cell_starts": np.append(cell_starts, len(keys)).astype(np.int64),
+    }
+
+    # Polygons: flattened vertices, ring offsets per polygon, bounding boxes
+    vertices, ring_starts, poly_rings, bboxes, poly_places, areas = [], [0], [0], [], [], []
+    if polygons_path:
+        with open(polygons_path) as f:
+            features = json.load(f).get("features", [])
+        for feature in features:
+            rings = [np.asarray(ring, dtype=np.float64) for ring in _rings(feature.get("geometry") or {})]
+            rings = [ring for ring in rings if len(ring) >= 3]
+            if not rings:
+                continue
+            for ring in rings:
+                vertices.append(ring[:, :2])
+                ring_starts.append(ring_starts[-1] + len(ring))
+            poly_rings.append(poly_rings[-1] + len(rings))
+            outer = rings[0]
+            bboxes.append([outer[:, 1].min(), outer[:, 0].min(), outer[:, 1].max(), outer[:, 0].max()])
+            areas.append(0.5 * abs(np.dot(outer[:, 0], np.roll(outer[:, 1], 1))
+                                   - np.dot(outer[:, 1], np.roll(outer[:, 0], 1))))
+            poly_places.append(_place_id(places, place_index, feature.get("properties") or {}))
+
+    arrays.update({
+        # GeoJSON vertices are [lng, lat]
+        "poly_vertices": np.concatenate(vertices) if vertices else np.zeros((0, 2)),
+        "poly_ring_starts": np.asarray(ring_starts, dtype=np.int64),
+        "poly_rings": np.asarray(poly_rings, dtype=np.int64),
+        "poly_bbox": np.asarray(bboxes, dtype=np.float64).reshape(-1, 4),
+        "poly_area": np.asarray(areas, dtype=np.float64),
+        "poly_place": np.asarray(poly_places, dtype=np.int32),
+    })
+
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), array)
+    with open(os.path.join(output_dir, PLACES_FILE), "w") as f:
+        json.dump(places, f)
+
+    meta = {"cell_deg": cell_deg, "n_cols": n_cols, "points": int(len(lat)),
+            "polygons": len(poly_places), "places": len(places)}
+    with open(os.path.join(output_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+    logger.info(f"Built local geocoder index at {output_dir}: {meta}")
+    return meta
+
+
+def _point_in_rings(lat: float, lng: float, vertices: np.ndarray, ring_starts: np.ndarray) -> bool:
+    """Even-odd ray casting over all rings of a polygon (holes included)."""
+    inside = False
+    for i in range(len(ring_starts) - 1):
+        ring = vertices[ring_starts[i]:ring_starts[i + 1]]
+        x, y = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x, -1), np.roll(y, -1)
+        crosses = (y > lat) != (y2 > lat)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = x + (lat - y) * (x2 - x) / (y2 - y)
+        if np.count_nonzero(crosses & (lng < x_at)) % 2:
+            inside = not inside
+    return inside
+
+
+class LocalGeocoder:
+    """
+    Reverse geocoder over a memory-mapped index built by `build_index`.
+
+    The nearest gazetteer point within `max_km` supplies the address; any
+    boundary polygons containing the coordinate then override the fields
+    they define, largest first so the most specific boundary wins.
+    """
+
+    def __init__(self, index_dir: str, max_km: float = None):
+        self.index_dir = index_dir
+        self.max_km = max_km or settings.local_geocoder_max_km
+
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, PLACES_FILE)) as f:
+            self.places = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.cell_deg = self.meta["cell_deg"]
+        self.n_cols = self.meta["n_cols"]
+        self.point_lat = load("point_lat")
+        self.point_lng = load("point_lng")
+        self.point_place = load("point_place")
+        self.cell_keys = np.asarray(load("cell_keys"))
+        self.cell_starts = np.asarray(load("cell_starts"))
+        self.poly_vertices = load("poly_vertices")
+        self.poly_ring_starts = load("poly_ring_starts")
+        self.poly_rings = load("poly_rings")
+        self.poly_bbox = np.asarray(load("poly_bbox"))
+        self.poly_area = np.asarray(load("poly_area"))
+        self.poly_place = load("poly_place")
+        self._ring_cache: List[np.ndarray] = []
+
+    def _ring_offsets(self, ring: int) -> np.ndarray:
+        """Cell-key offsets of the square ring `ring` cells out from the centre."""
+        while len(self._ring_cache) <= ring:
+            r = len(self._ring_cache)
+            dr, dc = np.meshgrid(np.arange(-r, r + 1), np.arange(-r, r + 1), indexing="ij")
+            edge = np.maximum(np.abs(dr), np.abs(dc)) == r
+            self._ring_cache.append((dr[edge] * self.n_cols + dc[edge]).astype(np.int64))
+        return self._ring_cache[ring]
+
+    def _nearest_point(self, lat: float, lng: float) -> Optional[tuple[int, float]]:
+        row = int(math.floor((lat + 90.0) / self.cell_deg))
+        col = int(math.floor((lng + 180.0) / self.cell_deg))
+        cell_km = self.cell_deg * KM_PER_DEG * max(math.cos(math.radians(lat)), 0.01)
+        max_ring = int(math.ceil(self.max_km / cell_km)) + 1
+        cos_lat = math.cos(math.radians(lat))
+        best_idx, best_km = None, float("inf")
+
+        for ring in range(max_ring + 1):
+            # Anything in this ring is at least (ring - 1) cells away
+            if best_idx is not None and (ring - 1) * cell_km > best_km:
+                break
+            keys = (row * self.n_cols + col) + self._ring_offsets(ring)
+            pos = np.searchsorted(self.cell_keys, keys)
+            in_range = pos < len(self.cell_keys)
+            pos, keys = pos[in_range], keys[in_range]
+            pos = pos[self.cell_keys[pos] == keys]
+            if not len(pos):
+                continue
+            idx = np.concatenate([np.arange(self.cell_starts[p], self.cell_starts[p + 1]) for p in pos])
+
+            dlat = (self.point_lat[idx] - lat) * KM_PER_DEG
+            dlng = (self.point_lng[idx] - lng) * KM_PER_DEG * cos_lat
+            dist = np.hypot(dlat, dlng)
+            i = int(np.argmin(dist))
+            if dist[i] < best_km:
+                best_idx, best_km = int(idx[i]), float(dist[i])
+
+        if best_idx is None or best_km > self.max_km:
+            return None
+        return best_idx, best_km
+
+    def _containing_polygons(self, lat: float, lng: float) -> List[int]:
+        if not len(self.poly_bbox):
+            return []
+        bbox = self.poly_bbox
+        candidates = np.nonzero((bbox[:, 0] <= lat) & (lat <= bbox[:, 2])
+                                & (bbox[:, 1] <= lng) & (lng <= bbox[:, 3]))[0]
+        hits = []
+        for p in candidates:
+            rings = self.poly_ring_starts[self.poly_rings[p]:self.poly_rings[p + 1] + 1]
+            if _point_in_rings(lat, lng, self.poly_vertices, rings):
+                hits.append(int(p))
+        return sorted(hits, key=lambda p: -self.poly_area[p])
+
+    def lookup(self, lat: float, lng: float) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Reverse geocode a coordinate.
+
+        Args:
+            lat: Latitude
+            lng: Longitude
+
+        Returns:
+            Dict with city, locality, state, country, postcode and distance_km
+            (to the matched gazetteer point), or None if nothing is close enough
+        """
+        nearest = self._nearest_point(lat, lng)
+        polygons = self._containing_polygons(lat, lng)
+        if nearest is None and not polygons:
+            return None
+
+        result = {field: None for field in PLACE_FIELDS}
+        if nearest is not None:
+            result.update(self.places[int(self.point_place[nearest[0]])])
+        for p in polygons:
+            result.update({k: v for k, v in self.places[int(self.poly_place[p])].items() if v})
+        result["distance_km"] = round(nearest[1], 3) if nearest is not None else None
+        return result
+
+
+# Global geocoder instance
+_local_geocoder: Optional[LocalGeocoder] = None
+_local_geocoder_checked = False
+
+
+def get_local_geocoder() -> Optional[LocalGeocoder]:
+    """
+    Get the local geocoder, loading the index on first use.
+
+    Returns:
+        LocalGeocoder, or None if no index is configured or it failed to load
+    """
+    global _local_geocoder, _local_geocoder_checked
+    if _local_geocoder_checked:
+        return _local_geocoder
+    _local_geocoder_checked = True
+
+    index_dir = settings.local_geocoder_dir
+    if not index_dir or not os.path.exists(os.path.join(index_dir, META_FILE)):
+        logger.info("No local geocoder index found; reverse geocoding uses the remote API")
+        return None
+    try:
+        _local_geocoder = LocalGeocoder(index_dir)
+        logger.info(f"Local geocoder loaded from {index_dir}: {_local_geocoder.meta}")
+    except Exception as e:
+        logger.error(f"Failed to load local geocoder index: {str(e)}")
+    return _local_geocoder
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local reverse geocoder index")
+    parser.add_argument("--points", required=True, help="Gazetteer points CSV")
+    parser.add_argument("--polygons", help="Boundary polygons GeoJSON")
+    parser.add_argument("--out", default=settings.local_geocoder_dir, help="Output directory")
+    parser.add_argument("--cell-deg", type=float, default=0.01, help="Grid cell size in degrees")
+    args = parser.parse_args()
+    build_index(args.points, args.out, args.polygons, args.cell_deg)
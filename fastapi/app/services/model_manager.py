@@ -0,0 +1,255 @@
+"""
+Per-region ETA models.
+A registry file maps regions (city bounding boxes) to model files. Each
+request is routed to the model of the region containing its origin; models
+are loaded on first use (memory-mapped where the file allows it) and the
+least recently used ones are evicted once the loaded models exceed the
+memory budget. Model files are re-checked periodically and reloaded when
+they change, keeping the previous copy if a reload fails.
+
+Without a registry file, a single global region serves `model_path`.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Grid used to narrow region lookups to a few candidates
+LOOKUP_CELL_DEG = 1.0
+
+GLOBAL_REGION = "default"
+
+
+class ModelRegistryError(ValueError):
+    """Raised when a model registry is malformed."""
+
+
+class Region:
+    """A named area served by one model file."""
+
+    def __init__(self, name: str, path: str, bounds: Optional[List[float]] = None):
+        self.name = name
+        self.path = path
+        if bounds is not None:
+            if len(bounds) != 4 or not (bounds[0] < bounds[2] and bounds[1] < bounds[3]):
+                raise ModelRegistryError(f"Region {name}: bounds must be [min_lat, min_lng, max_lat, max_lng]")
+            bounds = [float(b) for b in bounds]
+        self.bounds = bounds
+
+    def contains(self, lat: float, lng: float) -> bool:
+        if self.bounds is None:
+            return True
+        min_lat, min_lng, max_lat, max_lng = self.bounds
+        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+
+def load_registry(path: str) -> Tuple[List[Region], Optional[str]]:
+    """
+    Read a registry file.
+
+    Format:
+        {"default": "bangalore",
+         "regions": [{"name": "bangalore", "path": "models/blr.pkl",
+                      "bounds": [min_lat, min_lng, max_lat, max_lng]}]}
+
+    Returns:
+        (regions, name of the region serving points outside every region)
+    """
+    with open(path) as f:
+        registry = json.load(f)
+    try:
+        regions = [Region(r["name"], r["path"], r.get("bounds")) for r in registry["regions"]]
+    except (KeyError, TypeError) as e:
+        raise ModelRegistryError(f"Malformed model registry {path}: {e}")
+    names = [r.name for r in regions]
+    if len(set(names)) != len(names):
+        raise ModelRegistryError(f"Duplicate region names in {path}")
+    default = registry.get("default")
+    if default is not None and default not in names:
+        raise ModelRegistryError(f"Default region {default} is not defined in {path}")
+    return regions, default
+
+
+class _LoadedModel:
+    def __init__(self, artifacts: Any, version: int, size_bytes: int):
+        self.artifacts = artifacts
+        self.version = version
+        self.size_bytes = size_bytes
+        self.checked_at = time.monotonic()
+
+
+class ModelManager:
+    """
+    Routes coordinates to region models and keeps an LRU cache of loaded
+    models under a byte budget (model file sizes).
+
+    Args:
+        regions: Regions in priority order (first match wins)
+        default: Region serving points outside every region (None: baseline)
+        max_bytes: Budget for loaded models; the most recently used model
+            is always kept even if it alone exceeds it
+    """
+
+    def __init__(self, regions: List[Region], default: Optional[str] = None,
+                 max_bytes: int = None):
+        self.regions = {r.name: r for r in regions}
+        self.default = default
+        self.max_bytes = max_bytes if max_bytes is not None else int(settings.model_cache_max_mb * 1024 * 1024)
+        self._loaded: "OrderedDict[str, _LoadedModel]" = OrderedDict()
+        self._failed_versions: Dict[str, Optional[int]] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            name: {"hits": 0, "loads": 0, "load_errors": 0, "load_s": 0.0, "evictions": 0}
+            for name in self.regions
+        }
+
+        # Bounded regions indexed by the grid cells they overlap
+        self._grid: Dict[Tuple[int, int], List[Region]] = {}
+        self._unbounded = [r for r in regions if r.bounds is None]
+        for region in regions:
+            if region.bounds is None:
+                continue
+            min_lat, min_lng, max_lat, max_lng = region.bounds
+            for row in range(math.floor(min_lat / LOOKUP_CELL_DEG), math.floor(max_lat / LOOKUP_CELL_DEG) + 1):
+                for col in range(math.floor(min_lng / LOOKUP_CELL_DEG), math.floor(max_lng / LOOKUP_CELL_DEG) + 1):
+                    self._grid.setdefault((row, col), []).append(region)
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(m.size_bytes for m in self._loaded.values())
+
+    def region_for(self, coord: Optional[Dict[str, float]]) -> Optional[str]:
+        """Name of the region serving `coord` (the default region if None or uncovered)."""
+        if coord is not None:
+            lat, lng = coord["lat"], coord["lng"]
+            cell = (math.floor(lat / LOOKUP_CELL_DEG), math.floor(lng / LOOKUP_CELL_DEG))
+            for region in self._grid.get(cell, ()):
+                if region.contains(lat, lng):
+                    return region.name
+            if self._unbounded:
+                return self._unbounded[0].name
+        return self.default
+
+    def model_for(self, coord: Optional[Dict[str, float]]) -> Optional[Any]:
+        """Model artifacts for `coord`, or None if no model can serve it."""
+        name = self.region_for(coord)
+        return self.get(name) if name is not None else None
+
+    def get(self, name: str) -> Optional[Any]:
+        """Model artifacts for a region, loading or reloading them if needed."""
+        with self._lock:
+            loaded = self._loaded.get(name)
+            if loaded is not None:
+                self._loaded.move_to_end(name)
+                self._stats[name]["hits"] += 1
+                if time.monotonic() - loaded.checked_at < settings.model_check_interval_s:
+                    return loaded.artifacts
+                loaded.checked_at = time.monotonic()
+                if _file_version(self.regions[name].path) in (loaded.version, None):
+                    return loaded.artifacts
+            return self._load(name)
+
+    def _load(self, name: str) -> Optional[Any]:
+        current = self._loaded.get(name)
+        if current is None and time.monotonic() < self._retry_at.get(name, 0.0):
+            return None
+        path = self.regions[name].path
+        version = _file_version(path)
+        if version is None or self._failed_versions.get(name) == version:
+            if current is None:
+                # Missing or broken file: re-check it once per interval, not per request
+                self._retry_at[name] = time.monotonic() + settings.model_check_interval_s
+                if version is None:
+                    logger.warning(f"Model file not found at {path}, using baseline prediction for region {name}")
+                return None
+            return current.artifacts
+
+        stats = self._stats[name]
+        start = time.perf_counter()
+        try:
+            from app.models.infer import load_model
+            artifacts = load_model(path, mmap_mode="r" if settings.model_mmap else None)
+        except Exception as e:
+            logger.error(f"Failed to load model for region {name}: {str(e)}")
+            stats["load_errors"] += 1
+            self._failed_versions[name] = version
+            self._retry_at[name] = time.monotonic() + settings.model_check_interval_s
+            return current.artifacts if current is not None else None
+
+        elapsed = time.perf_counter() - start
+        stats["loads"] += 1
+        stats["load_s"] += elapsed
+        self._failed_versions.pop(name, None)
+        self._loaded[name] = _LoadedModel(artifacts, version, os.path.getsize(path))
+        self._loaded.move_to_end(name)
+        logger.info(f"Model for region {name} loaded from {path} in {elapsed:.3f}s")
+        self._evict()
+        return artifacts
+
+    def _evict(self):
+        while len(self._loaded) > 1 and self.loaded_bytes > self.max_bytes:
+            name, _ = self._loaded.popitem(last=False)
+            self._stats[name]["evictions"] += 1
+            logger.info(f"Evicted model for region {name} (budget {self.max_bytes} bytes)")
+
+    def is_loaded(self, name: str = None) -> bool:
+        """Whether a region's model (the default region's if None) is loaded."""
+        name = name or self.default
+        return name in self._loaded
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-region hit/load counters plus cache occupancy."""
+        with self._lock:
+            return {
+                "loaded_bytes": self.loaded_bytes,
+                "max_bytes": self.max_bytes,
+                "models": {
+                    name: {
+                        **stats,
+                        "load_s": round(stats["load_s"], 4),
+                        "loaded": name in self._loaded,
+                        "size_bytes": self._loaded[name].size_bytes if name in self._loaded else None,
+                    }
+                    for name, stats in self._stats.items()
+                },
+            }
+
+
+def _file_version(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+# Global model manager
+_manager: Optional[ModelManager] = None
+
+
+def get_model_manager() -> ModelManager:
+    """
+    Get the process-wide model manager.
+
+    Reads `model_registry_path`; if it is unset, missing or invalid,
+    `model_path` serves every request as the single global region.
+    """
+    global _manager
+    if _manager is None:
+        path = settings.model_registry_path
+        regions, default = [Region(GLOBAL_REGION, settings.model_path)], GLOBAL_REGION
+        if path and os.path.exists(path):
+            try:
+                regions, default = load_registry(path)
+                logger.info(f"Model registry {path}: {len(regions)} regions, default {default}")
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to read model registry, serving {settings.model_path} globally: {str(e)}")
+        _manager = ModelManager(regions, default)
+    return _manager
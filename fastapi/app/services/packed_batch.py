@@ -0,0 +1,220 @@
+"""
+Packed binary batch protocol for backend-to-ML traffic.
+Many fare, ETA and geofence queries travel in one fixed-layout frame and
+are answered with one frame of packed results. The Node backend can then
+estimate a whole screen of rides in one round trip instead of sending one
+JSON request per estimate. Queries are answered by the same vectorized
+engines as the JSON batch endpoints. All fields are little-endian.
+
+Request: n consecutive 56-byte query records (QUERY_DTYPE):
+    op             uint32   OP_FARE | OP_ETA | OP_GEOFENCE
+    reserved       uint32
+    origin_lat     float64
+    origin_lng     float64
+    dest_lat       float64  ignored by geofence-only queries
+    dest_lng       float64
+    timestamp      float64  unix seconds, 0 = now
+    traffic_level  float64  0.5-3.0, 0 = normal (1.0)
+
+Response: n result records (result_dtype(V)) aligned with the queries,
+where V is the number of vehicle types in the pricing rules:
+    status         uint32   STATUS_OK, STATUS_UNSERVICEABLE or STATUS_INVALID
+    origin_fences  uint32   bit i set if the origin is inside fence i
+    dest_fences    uint32   same for the destination (OP_FARE only)
+    reserved       uint32
+    eta_seconds    float64  NaN unless OP_ETA
+    confidence     float64
+    distance_km    float64  NaN unless OP_FARE
+    duration_min   float64
+    fares          float64[V]  NaN unless OP_FARE and serviceable
+
+Vehicle type order and fence ids (bit order, first 32 fences) are sent in
+response headers. A query with both OP_FARE and OP_ETA uses the
+predicted ETA for per-minute charges.
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from app.services.eta_service import predict_eta_batch
+from app.services.fare_service import price_trips
+from app.services.geofence import get_geofences
+from app.services.pricing_engine import get_pricing_rules
+from app.utils.features import local_timezone
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+MEDIA_TYPE = "application/octet-stream"
+
+OP_FARE = 1
+OP_ETA = 2
+OP_GEOFENCE = 4
+OP_ALL = OP_FARE | OP_ETA | OP_GEOFENCE
+
+STATUS_OK = 0
+STATUS_UNSERVICEABLE = 1
+STATUS_INVALID = 2
+
+# Fences reported in the origin/destination bitmasks
+MAX_FENCE_BITS = 32
+
+# Year 3000; later timestamps are rejected as invalid
+MAX_TIMESTAMP = 32503680000.0
+
+QUERY_DTYPE = np.dtype([
+    ("op", "<u4"), ("reserved", "<u4"),
+    ("origin_lat", "<f8"), ("origin_lng", "<f8"),
+    ("dest_lat", "<f8"), ("dest_lng", "<f8"),
+    ("timestamp", "<f8"), ("traffic_level", "<f8"),
+])
+
+
+def result_dtype(n_vehicles: int) -> np.dtype:
+    """Result record layout for pricing rules with `n_vehicles` vehicle types."""
+    return np.dtype([
+        ("status", "<u4"), ("origin_fences", "<u4"), ("dest_fences", "<u4"), ("reserved", "<u4"),
+        ("eta_seconds", "<f8"), ("confidence", "<f8"),
+        ("distance_km", "<f8"), ("duration_min", "<f8"),
+        ("fares", "<f8", (n_vehicles,)),
+    ])
+
+
+def decode_queries(body: bytes) -> np.ndarray:
+    """
+    Decode a request frame into a QUERY_DTYPE record array.
+
+    Raises:
+        ValueError: If the body is not a whole number of query records
+    """
+    if len(body) % QUERY_DTYPE.itemsize:
+        raise ValueError(f"Packed batch length must be a multiple of {QUERY_DTYPE.itemsize} bytes per query")
+    return np.frombuffer(body, dtype=QUERY_DTYPE)
+
+
+def encode_queries(queries: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode queries into a request frame (reference client side).
+
+    Args:
+        queries: Dicts with `op`, `origin` and optional `destination`,
+            `timestamp` (unix seconds) and `traffic_level`
+    """
+    frame = np.zeros(len(queries), dtype=QUERY_DTYPE)
+    for i, query in enumerate(queries):
+        destination = query.get("destination") or query["origin"]
+        frame[i] = (
+            query["op"], 0,
+            query["origin"]["lat"], query["origin"]["lng"],
+            destination["lat"], destination["lng"],
+            query.get("timestamp") or 0.0, query.get("traffic_level") or 0.0,
+        )
+    return frame.tobytes()
+
+
+def decode_results(body: bytes, n_vehicles: int) -> np.ndarray:
+    """Decode a response frame (reference client side)."""
+    return np.frombuffer(body, dtype=result_dtype(n_vehicles))
+
+
+def _valid_coords(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore"):
+        return (np.abs(lat) <= 90) & (np.abs(lng) <= 180)
+
+
+def _fence_bits(hits: List[int]) -> int:
+    bits = 0
+    for fence in hits:
+        if fence < MAX_FENCE_BITS:
+            bits |= 1 << fence
+    return bits
+
+
+def _iso_timestamps(timestamps: np.ndarray) -> List[str]:
+    local = local_timezone()
+    now = time.time()
+    return [datetime.fromtimestamp(ts if ts > 0 else now, local).isoformat() for ts in timestamps.tolist()]
+
+
+def answer_queries(queries: np.ndarray) -> Tuple[np.ndarray, Dict[str, str]]:
+    """
+    Answer a decoded request frame.
+
+    Returns:
+        (result records aligned with the queries, metadata for response
+        headers: vehicle types, fence ids, rules version and currency)
+    """
+    # One snapshot for the whole frame, so a hot reload cannot change the
+    # record layout or fence bit order between sizing, pricing and headers
+    rules = get_pricing_rules()
+    fences = get_geofences()
+    results = np.zeros(len(queries), dtype=result_dtype(len(rules.vehicle_types)))
+    for field in ("eta_seconds", "confidence", "distance_km", "duration_min", "fares"):
+        results[field] = np.nan
+
+    op = queries["op"]
+    origin_lat, origin_lng = queries["origin_lat"], queries["origin_lng"]
+    dest_lat, dest_lng = queries["dest_lat"], queries["dest_lng"]
+    valid = (op != 0) & ((op & ~np.uint32(OP_ALL)) == 0) & _valid_coords(origin_lat, origin_lng)
+    trips = valid & ((op & (OP_FARE | OP_ETA)) != 0)
+    timestamp, traffic = queries["timestamp"], queries["traffic_level"]
+    with np.errstate(invalid="ignore"):
+        trip_fields_ok = (
+            _valid_coords(dest_lat, dest_lng)
+            & (timestamp >= 0) & (timestamp < MAX_TIMESTAMP)
+            & ((traffic == 0) | ((traffic >= 0.5) & (traffic <= 3.0)))
+        )
+    valid &= ~trips | trip_fields_ok
+    trips &= valid
+    results["status"][~valid] = STATUS_INVALID
+
+    # Fare and ETA queries share one payload per trip
+    trip_rows = np.flatnonzero(trips)
+    payloads = [
+        {"origin": {"lat": a, "lng": b}, "destination": {"lat": c, "lng": d},
+         "timestamp": ts, "traffic_level": level or None}
+        for a, b, c, d, ts, level in zip(
+            origin_lat[trip_rows].tolist(), origin_lng[trip_rows].tolist(),
+            dest_lat[trip_rows].tolist(), dest_lng[trip_rows].tolist(),
+            _iso_timestamps(timestamp[trip_rows]), traffic[trip_rows].tolist(),
+        )
+    ]
+    position = dict(zip(trip_rows.tolist(), range(len(trip_rows))))
+
+    eta_rows = np.flatnonzero(trips & ((op & OP_ETA) != 0))
+    if len(eta_rows):
+        predictions = predict_eta_batch([payloads[position[i]] for i in eta_rows.tolist()])
+        results["eta_seconds"][eta_rows] = [p["eta_seconds"] for p in predictions]
+        results["confidence"][eta_rows] = [p["confidence"] for p in predictions]
+        for i, prediction in zip(eta_rows.tolist(), predictions):
+            payloads[position[i]]["eta_seconds"] = prediction["eta_seconds"]
+
+    fare_rows = np.flatnonzero(trips & ((op & OP_FARE) != 0))
+    if len(fare_rows):
+        priced = price_trips([payloads[position[i]] for i in fare_rows.tolist()], (rules, fences))
+        serviceable = np.array([reason is None for reason in priced["reasons"]])
+        results["distance_km"][fare_rows] = priced["distances"]
+        results["duration_min"][fare_rows] = np.round(priced["durations"], 1)
+        results["fares"][fare_rows[serviceable]] = priced["fares"][serviceable]
+        results["status"][fare_rows[~serviceable]] = STATUS_UNSERVICEABLE
+        if fences is not None:
+            results["origin_fences"][fare_rows] = [_fence_bits(hits) for hits in priced["pickups"]]
+            results["dest_fences"][fare_rows] = [_fence_bits(hits) for hits in priced["drops"]]
+
+    geo_rows = np.flatnonzero(valid & ((op & OP_GEOFENCE) != 0))
+    if len(geo_rows) and fences is not None:
+        hits = fences.fences_at_many(origin_lat[geo_rows], origin_lng[geo_rows])
+        results["origin_fences"][geo_rows] = [_fence_bits(h) for h in hits]
+        unserviceable = [fences.unserviceable_reason(h, h) is not None for h in hits]
+        results["status"][geo_rows[np.array(unserviceable, dtype=bool)]] = STATUS_UNSERVICEABLE
+
+    logger.info(f"Packed batch: {len(queries)} queries ({len(eta_rows)} ETA, {len(fare_rows)} fare, "
+                f"{len(geo_rows)} geofence, {len(queries) - int(valid.sum())} invalid)")
+
+    metadata = {
+        "vehicle_types": ",".join(rules.vehicle_types),
+        "geofences": ",".join(fences.ids[:MAX_FENCE_BITS]) if fences is not None else "",
+        "rules_version": rules.version,
+        "currency": rules.currency,
+    }
+    return results, metadata
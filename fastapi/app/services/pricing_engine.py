@@ -0,0 +1,237 @@
+"""
+Declarative fare pricing.
+Rules (per-vehicle base, per-km and per-minute rates, minimum fares, surge
+caps and time-of-day bands) are read from a JSON file and compiled into
+per-vehicle arrays plus a minute-of-week multiplier table, so one numpy
+expression prices every vehicle type for one quote or a whole batch. The
+rules file is re-checked periodically and reloaded when it changes.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.utils.features import local_timezone
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Minute of week used when a timestamp cannot be parsed (Wednesday noon,
+# matching the defaults in extract_time_features)
+DEFAULT_MINUTE_OF_WEEK = 2 * MINUTES_PER_DAY + 12 * 60
+
+
+class PricingRulesError(ValueError):
+    """Raised when a rule set is malformed."""
+
+
+def _parse_clock(value: str) -> int:
+    hours, minutes = value.split(":")
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= MINUTES_PER_DAY:
+        raise PricingRulesError(f"Invalid time of day: {value}")
+    return total
+
+
+def _band_mask(band: Dict[str, Any]) -> np.ndarray:
+    """
+    Minutes of the week covered by a time band: [start, end) local time on
+    each of `days` (0 = Monday, default every day). Bands that wrap past
+    midnight continue into the following day.
+    """
+    start, end = _parse_clock(band["start"]), _parse_clock(band["end"])
+    mask = np.zeros((7, MINUTES_PER_DAY), dtype=bool)
+    for day in band.get("days", range(7)):
+        if not 0 <= day <= 6:
+            raise PricingRulesError(f"Invalid weekday {day} in band {band.get('name')}")
+        if start <= end:
+            mask[day, start:end] = True
+        else:
+            mask[day, start:] = True
+            mask[(day + 1) % 7, :end] = True
+    return mask.ravel()
+
+
+class CompiledRules:
+    """
+    A rule set compiled for vectorized evaluation.
+
+    Args:
+        rules: Parsed rules document
+        source: Where the rules came from (for logging)
+    """
+
+    def __init__(self, rules: Dict[str, Any], source: str = "inline"):
+        vehicles = rules.get("vehicles")
+        if not vehicles:
+            raise PricingRulesError("Rules define no vehicles")
+
+        self.version = str(rules.get("version", "unversioned"))
+        self.currency = rules.get("currency", settings.currency)
+        self.source = source
+        self.vehicle_types: List[str] = list(vehicles)
+        self._index = {name: i for i, name in enumerate(self.vehicle_types)}
+
+        try:
+            self.base = np.array([float(vehicles[v]["base"]) for v in self.vehicle_types])
+            self.per_km = np.array([float(vehicles[v]["per_km"]) for v in self.vehicle_types])
+            self.per_min = np.array([float(vehicles[v].get("per_min", 0.0)) for v in self.vehicle_types])
+            self.minimum = np.array([float(vehicles[v].get("minimum", 0.0)) for v in self.vehicle_types])
+            self.surge_cap = np.array([float(vehicles[v].get("surge_cap", rules.get("surge_cap", np.inf)))
+                                       for v in self.vehicle_types])
+        except (KeyError, TypeError, ValueError) as e:
+            raise PricingRulesError(f"Invalid vehicle rates: {e}")
+
+        # Overlapping bands compound
+        self.band_table = np.ones((MINUTES_PER_WEEK, len(self.vehicle_types)))
+        for band in rules.get("time_bands", []):
+            try:
+                columns = [self._index[v] for v in band.get("vehicles", self.vehicle_types)]
+                rows = np.flatnonzero(_band_mask(band))
+                self.band_table[np.ix_(rows, columns)] *= float(band["multiplier"])
+            except (KeyError, TypeError, ValueError) as e:
+                raise PricingRulesError(f"Invalid time band {band.get('name')}: {e}")
+
+        # Flat fees per geofence kind, charged once if the pickup or drop is in a fence of that kind
+        self.zone_fees: Dict[str, np.ndarray] = {}
+        for fee in rules.get("zone_fees", []):
+            try:
+                columns = [self._index[v] for v in fee.get("vehicles", self.vehicle_types)]
+                amounts = self.zone_fees.setdefault(str(fee["kind"]), np.zeros(len(self.vehicle_types)))
+                amounts[columns] += float(fee["amount"])
+            except (KeyError, TypeError, ValueError) as e:
+                raise PricingRulesError(f"Invalid zone fee {fee.get('kind')}: {e}")
+
+    def columns(self, vehicle_types: Optional[List[str]]) -> List[int]:
+        """Column indices for the requested vehicle types (all if None; unknown ones are skipped)."""
+        if not vehicle_types:
+            return list(range(len(self.vehicle_types)))
+        return [self._index[v] for v in vehicle_types if v in self._index]
+
+    def fee_matrix(self, zone_kinds: List[set]) -> np.ndarray:
+        """Zone fees of shape (n, vehicle types) for each trip's set of geofence kinds."""
+        fees = np.zeros((len(zone_kinds), len(self.vehicle_types)))
+        for i, kinds in enumerate(zone_kinds):
+            for kind in kinds:
+                if kind in self.zone_fees:
+                    fees[i] += self.zone_fees[kind]
+        return fees
+
+    def evaluate(self, distance_km: np.ndarray, duration_min: np.ndarray,
+                 minute_of_week: np.ndarray, surge: np.ndarray,
+                 fees: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Price every vehicle type for each trip.
+
+        fare = max(minimum, (base + per_km * km + per_min * min) * band * min(surge, cap)) + fees
+
+        Args:
+            distance_km: Trip distances, shape (n,)
+            duration_min: Trip durations in minutes, shape (n,)
+            minute_of_week: Local minute of week (0 = Monday 00:00), shape (n,)
+            surge: Demand multipliers, shape (n,)
+            fees: Optional zone fees, shape (n, vehicle types) (see fee_matrix)
+
+        Returns:
+            Fares of shape (n, vehicle types), rounded to 2 decimals
+        """
+        distance_km = np.asarray(distance_km, dtype=np.float64)[:, None]
+        duration_min = np.asarray(duration_min, dtype=np.float64)[:, None]
+        surge = np.minimum(np.asarray(surge, dtype=np.float64)[:, None], self.surge_cap)
+        bands = self.band_table[np.asarray(minute_of_week, dtype=np.int64) % MINUTES_PER_WEEK]
+
+        metered = (self.base + self.per_km * distance_km + self.per_min * duration_min) * bands * surge
+        fares = np.maximum(metered, self.minimum)
+        if fees is not None:
+            fares = fares + fees
+        return np.round(fares, 2)
+
+
+def minute_of_week(timestamp: Optional[str]) -> int:
+    """
+    Local minute of the week of an ISO-8601 timestamp (0 = Monday 00:00).
+    
+    Timestamps with an offset are converted to service local time first;
+    naive timestamps are taken to be local already.
+    """
+    if not timestamp:
+        return DEFAULT_MINUTE_OF_WEEK
+    try:
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return DEFAULT_MINUTE_OF_WEEK
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(local_timezone())
+    return dt.weekday() * MINUTES_PER_DAY + dt.hour * 60 + dt.minute
+
+
+def _default_rules() -> Dict[str, Any]:
+    """Single-vehicle rules from the flat fare settings, used when no rules file exists."""
+    return {
+        "version": "settings",
+        "currency": settings.currency,
+        "vehicles": {"standard": {"base": settings.base_fare, "per_km": settings.per_km_rate}},
+    }
+
+
+def load_rules(path: str) -> CompiledRules:
+    """Read and compile a rules file."""
+    with open(path) as f:
+        return CompiledRules(json.load(f), source=path)
+
+
+# Global rules cache
+_rules: Optional[CompiledRules] = None
+_rules_version = None
+_last_rules_check = None
+
+
+def _rules_file_version(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_pricing_rules() -> CompiledRules:
+    """
+    Get the compiled pricing rules.
+
+    The rules file is re-checked at most every `pricing_rules_check_interval_s`
+    seconds and recompiled when it changes. A file that fails to parse or
+    validate is logged and the previous rules keep serving.
+    """
+    global _rules, _rules_version, _last_rules_check
+
+    now = time.monotonic()
+    if _rules is not None and _last_rules_check is not None \
+            and now - _last_rules_check < settings.pricing_rules_check_interval_s:
+        return _rules
+    _last_rules_check = now
+
+    path = settings.pricing_rules_path
+    version = _rules_file_version(path)
+    if _rules is not None and version == _rules_version:
+        return _rules
+
+    if version is None:
+        if _rules is None or _rules_version is not None:
+            logger.warning(f"Pricing rules not found at {path}, using flat fare settings")
+            _rules = CompiledRules(_default_rules(), source="settings")
+    else:
+        try:
+            _rules = load_rules(path)
+            logger.info(f"Pricing rules {_rules.version} loaded from {path} "
+                        f"({len(_rules.vehicle_types)} vehicle types)")
+        except Exception as e:
+            logger.error(f"Failed to load pricing rules from {path}: {str(e)}")
+            if _rules is None:
+                _rules = CompiledRules(_default_rules(), source="settings")
+
+    _rules_version = version
+    return _rules
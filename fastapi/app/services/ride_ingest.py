@@ -0,0 +1,270 @@
+"""
+Ride-completion event ingestion.
+Consumes ride-completed events from RabbitMQ and appends them to the
+training segment store, ready to be read by the model trainer, and keeps
+the historical ETA feature store up to date.
+
+Run with:
+    python -m app.services.ride_ingest
+"""
+import asyncio
+import signal
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.utils.features import build_features_for_prediction, local_timezone
+from app.utils.geo_utils import haversine_km, is_valid_coordinate
+from app.utils.rmq_consumer import AsyncConsumer, Message
+from app.utils.segment_store import SegmentStore
+from app.services.eta_history import EtaHistory, load_snapshot, publish_snapshot
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Model features first (same names the trainer expects), then raw fields
+SEGMENT_COLUMNS = [
+    'distance_km', 'traffic_level', 'hour', 'day_of_week',
+    'is_weekend', 'is_rush_hour', 'origin_zone_lat', 'origin_zone_lng',
+    'dest_zone_lat', 'dest_zone_lng', 'eta_seconds',
+    'origin_lat', 'origin_lng', 'dest_lat', 'dest_lng',
+    'started_at', 'completed_at', 'avg_speed_kmh',
+]
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    """Parse an ISO or epoch (s/ms) timestamp as an aware datetime in service local time."""
+    if value is None:
+        return None
+    local = local_timezone()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000 if value > 1e11 else value, local)
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    # Naive timestamps are taken to already be local time
+    return parsed.astimezone(local) if parsed.tzinfo else parsed.replace(tzinfo=local)
+
+
+def parse_ride_completed(event: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """
+    Turn a ride-completed event into a training row.
+
+    Expected event fields:
+        origin (or pickup): {"lat", "lng"}
+        destination: {"lat", "lng"}
+        started_at: ISO-8601 timestamp or epoch (s/ms) when the trip started
+        completed_at: ISO-8601 timestamp or epoch (s/ms) when it ended
+        actual_duration_s: Optional; derived from the timestamps if missing
+        route_distance_km (or distance): Optional; haversine if missing
+        traffic_level: Optional traffic multiplier
+
+    Returns:
+        Row dictionary keyed by SEGMENT_COLUMNS, or None if the event is unusable
+    """
+    try:
+        origin = event.get("origin") or event.get("pickup")
+        destination = event["destination"]
+        origin = {"lat": float(origin["lat"]), "lng": float(origin["lng"])}
+        destination = {"lat": float(destination["lat"]), "lng": float(destination["lng"])}
+        if not (is_valid_coordinate(origin["lat"], origin["lng"])
+                and is_valid_coordinate(destination["lat"], destination["lng"])):
+            return None
+
+        started = _parse_time(event.get("started_at"))
+        completed = _parse_time(event.get("completed_at"))
+        duration = event.get("actual_duration_s")
+        if duration is None and started and completed:
+            duration = (completed - started).total_seconds()
+        if started is None or duration is None or float(duration) <= 0:
+            return None
+        duration = float(duration)
+
+        distance_km = event.get("route_distance_km") or event.get("distance")
+        distance_km = float(distance_km) if distance_km else haversine_km(origin, destination)
+        traffic_level = float(event.get("traffic_level") or 1.0)
+
+        features = build_features_for_prediction(
+            origin=origin,
+            destination=destination,
+            distance_km=distance_km,
+            timestamp=started.isoformat(),
+            traffic_level=traffic_level
+        )
+
+        return {
+            **{col: features[col] for col in SEGMENT_COLUMNS[:10]},
+            'eta_seconds': duration,
+            'origin_lat': origin['lat'],
+            'origin_lng': origin['lng'],
+            'dest_lat': destination['lat'],
+            'dest_lng': destination['lng'],
+            'started_at': started.timestamp(),
+            'completed_at': completed.timestamp() if completed else started.timestamp() + duration,
+            'avg_speed_kmh': distance_km / (duration / 3600),
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        logger.debug(f"Skipping malformed ride event: {e}")
+        return None
+
+
+class RideIngestor:
+    """
+    Buffers ride-completed events into the segment store.
+
+    Handler calls return only once the rows they carried have been written
+    to disk, so messages are acked after they are durable. Segments are
+    written when `segment_rows` rows are buffered, or after
+    `segment_max_age_s` for quiet periods; compaction later merges the
+    resulting short segments.
+
+    With a `history` table, every parsed trip also updates it and a
+    snapshot is published every `eta_history_snapshot_interval_s`.
+    """
+
+    def __init__(self, store: SegmentStore, max_age_s: float = None,
+                 compact_interval_s: float = None, history: Optional[EtaHistory] = None):
+        self.store = store
+        self.history = history
+        self.max_age_s = max_age_s or settings.segment_max_age_s
+        self.compact_interval_s = compact_interval_s or settings.segment_compact_interval_s
+        self.ingested = 0
+        self.skipped = 0
+        self._waiters: List[asyncio.Future] = []
+        self._first_buffered_at: Optional[float] = None
+        # Store writes run in a worker thread, one at a time
+        self._write_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+    async def handle(self, messages: List[Message]):
+        """AsyncConsumer batch handler."""
+        rows = []
+        for message in messages:
+            try:
+                row = parse_ride_completed(message.json())
+            except ValueError:
+                row = None
+            if row is None:
+                self.skipped += 1
+            else:
+                rows.append(row)
+
+        if not rows:
+            return
+        if self.history is not None:
+            self.history.record_rows(rows)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        async with self._write_lock:
+            self._waiters.append(waiter)
+            if self._first_buffered_at is None:
+                self._first_buffered_at = loop.time()
+
+            if await asyncio.to_thread(self.store.append, rows):
+                self._release_written()
+        self.ingested += len(rows)
+        await waiter
+
+    def _release_written(self):
+        """Resolve waiters whose rows are now on disk."""
+        if self.store.buffered_rows == 0:
+            waiters, self._waiters = self._waiters, []
+            self._first_buffered_at = None
+        else:
+            # The last waiter still has rows in the buffer
+            waiters, self._waiters = self._waiters[:-1], self._waiters[-1:]
+            self._first_buffered_at = asyncio.get_running_loop().time()
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def flush(self):
+        """Write any buffered rows and release their handlers."""
+        async with self._write_lock:
+            if await asyncio.to_thread(self.store.flush):
+                self._release_written()
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(min(1.0, self.max_age_s))
+            if self._first_buffered_at is not None and loop.time() - self._first_buffered_at >= self.max_age_s:
+                await self.flush()
+
+    async def _compact_loop(self):
+        while True:
+            await asyncio.sleep(self.compact_interval_s)
+            try:
+                await asyncio.to_thread(self.store.compact)
+            except Exception as e:
+                logger.error(f"Segment compaction failed: {str(e)}")
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(settings.eta_history_snapshot_interval_s)
+            await asyncio.to_thread(publish_snapshot, self.history)
+
+    def start_background(self):
+        """Start periodic flush, compaction and history snapshot tasks."""
+        self._tasks = [
+            asyncio.create_task(self._flush_loop()),
+            asyncio.create_task(self._compact_loop()),
+        ]
+        if self.history is not None:
+            self._tasks.append(asyncio.create_task(self._snapshot_loop()))
+
+    async def stop_background(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+        if self.history is not None:
+            publish_snapshot(self.history)
+
+
+async def run_ingest():
+    """Consume ride-completed events until SIGINT/SIGTERM."""
+    store = SegmentStore(settings.segment_dir, SEGMENT_COLUMNS, settings.segment_rows)
+    history = None
+    if settings.eta_history_enabled:
+        # Continue the rolling aggregates from the last published snapshot
+        history = load_snapshot() or EtaHistory()
+    ingestor = RideIngestor(store, history=history)
+
+    # Handlers hold their messages until the segment is written, so the
+    # prefetch window has to cover a full segment plus the next batches
+    batch_size = 500
+    prefetch = settings.segment_rows + 4 * batch_size
+    consumer = AsyncConsumer(settings.rabbitmq_url, prefetch_count=prefetch)
+    consumer.subscribe(
+        settings.ride_events_queue,
+        ingestor.handle,
+        batch_size=batch_size,
+        batch_timeout=0.2,
+        concurrency=prefetch // batch_size + 1,
+        requeue_on_error=True
+    )
+
+    async def shutdown():
+        # Keep flushing while the consumer drains: in-flight handlers are
+        # waiting for their rows to hit disk before they can be acked
+        stop_task = asyncio.create_task(consumer.stop())
+        while not stop_task.done():
+            await ingestor.flush()
+            await asyncio.sleep(0.1)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: asyncio.ensure_future(shutdown()))
+        except NotImplementedError:
+            pass
+
+    ingestor.start_background()
+    try:
+        await consumer.run()
+    finally:
+        await ingestor.stop_background()
+        logger.info(f"Ride ingest stopped: {ingestor.ingested} ingested, {ingestor.skipped} skipped")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_ingest())
@@ -0,0 +1,488 @@
+"""
+Offline road-network routing.
+Builds a compact CSR graph from an OSM extract with ALT landmark distances
+precomputed, and answers driving distance/time queries (A* with landmark
+lower bounds for one-to-one, Dijkstra for one-to-many) fully offline.
+
+Build a graph with:
+    python -m app.services.routing_engine --osm bangalore.osm --out data/routing
+
+`.osm.pbf` extracts can be converted first with `osmium cat in.osm.pbf -o out.osm`.
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.geo_utils import haversine_km
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+META_FILE = "meta.json"
+EARTH_RADIUS_M = 6371000.0
+
+# Drivable highway classes and their default speeds (km/h)
+DEFAULT_SPEEDS_KMH = {
+    "motorway": 80, "motorway_link": 50, "trunk": 60, "trunk_link": 40,
+    "primary": 45, "primary_link": 35, "secondary": 35, "secondary_link": 30,
+    "tertiary": 30, "tertiary_link": 25, "unclassified": 25, "residential": 20,
+    "living_street": 10, "service": 15, "road": 20,
+}
+
+# Snap grid cell size in degrees (~550 m)
+SNAP_CELL_DEG = 0.005
+
+
+def _parse_maxspeed(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        number = float(value.split()[0].split(";")[0])
+    except ValueError:
+        return None
+    return number * 1.609 if "mph" in value else number
+
+
+def parse_osm(osm_path: str) -> Tuple[Dict[int, Tuple[float, float]], List[Tuple[List[int], float, int]]]:
+    """
+    Read drivable ways from an OSM XML extract.
+
+    Returns:
+        (node id -> (lat, lon), [(way node ids, speed km/h, direction)]) where
+        direction is 0 for two-way, 1 for forward-only and -1 for reverse-only
+    """
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways = []
+    for _, elem in ET.iterparse(osm_path, events=("end",)):
+        if elem.tag == "node":
+            nodes[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+            elem.clear()
+        elif elem.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in elem.iter("tag")}
+            highway = tags.get("highway")
+            if highway in DEFAULT_SPEEDS_KMH and tags.get("access") not in ("no", "private"):
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                speed = _parse_maxspeed(tags.get("maxspeed")) or DEFAULT_SPEEDS_KMH[highway]
+                oneway = tags.get("oneway")
+                if oneway in ("yes", "1", "true") or tags.get("junction") == "roundabout" \
+                        or highway.startswith("motorway"):
+                    direction = 1
+                elif oneway == "-1":
+                    direction = -1
+                else:
+                    direction = 0
+                if oneway == "no":
+                    direction = 0
+                ways.append((refs, speed, direction))
+            elem.clear()
+    return nodes, ways
+
+
+def build_from_edges(lat: np.ndarray, lon: np.ndarray, src: np.ndarray, dst: np.ndarray,
+                     speed_kmh: np.ndarray, output_dir: str, n_landmarks: int = 16) -> Dict:
+    """
+    Build and save a routing graph from directed edges.
+
+    Edge lengths are great-circle distances between their endpoints. Only
+    the largest strongly connected component is kept so every snapped
+    point can reach every other.
+
+    Args:
+        lat, lon: Node coordinates
+        src, dst: Directed edge endpoints (node indices)
+        speed_kmh: Travel speed per edge
+        output_dir: Directory to write the graph to
+        n_landmarks: ALT landmarks to precompute
+
+    Returns:
+        Graph metadata
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components, dijkstra
+
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    speed_kmh = np.asarray(speed_kmh, dtype=np.float64)
+
+    keep = src != dst
+    src, dst, speed_kmh = src[keep], dst[keep], speed_kmh[keep]
+    length_m = _haversine_m(lat[src], lon[src], lat[dst], lon[dst])
+    # Floor at 1 ms so no edge is treated as absent by sparse routines
+    time_s = np.maximum(length_m / (speed_kmh / 3.6), 1e-3)
+
+    # Keep the largest strongly connected component
+    n = len(lat)
+    graph = csr_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+    _, labels = connected_components(graph, directed=True, connection="strong")
+    largest = np.bincount(labels).argmax()
+    node_mask = labels == largest
+    remap = np.full(n, -1, dtype=np.int64)
+    remap[node_mask] = np.arange(node_mask.sum())
+    edge_mask = node_mask[src] & node_mask[dst]
+    src, dst = remap[src[edge_mask]], remap[dst[edge_mask]]
+    length_m, time_s = length_m[edge_mask], time_s[edge_mask]
+    lat, lon = lat[node_mask], lon[node_mask]
+    n = len(lat)
+
+    # Parallel edges: keep the fastest (sparse constructors would sum them)
+    order = np.lexsort((time_s, dst, src))
+    src, dst, length_m, time_s = src[order], dst[order], length_m[order], time_s[order]
+    first = np.ones(len(src), dtype=bool)
+    first[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    src, dst, length_m, time_s = src[first], dst[first], length_m[first], time_s[first]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(indptr, src + 1, 1)
+    indptr = np.cumsum(indptr)
+
+    forward = csr_matrix((time_s, dst, indptr), shape=(n, n))
+    landmarks = _select_landmarks(forward, min(n_landmarks, n))
+    from_landmark = dijkstra(forward, directed=True, indices=landmarks).astype(np.float32)
+    to_landmark = dijkstra(forward.T.tocsr(), directed=True, indices=landmarks).astype(np.float32)
+
+    # Snap index: nodes bucketed into a lat/lon grid
+    n_cols = int(math.ceil(360.0 / SNAP_CELL_DEG)) + 1
+    cell = (np.floor((lat + 90.0) / SNAP_CELL_DEG).astype(np.int64) * n_cols
+            + np.floor((lon + 180.0) / SNAP_CELL_DEG).astype(np.int64))
+    snap_order = np.argsort(cell, kind="stable")
+    snap_keys, snap_starts = np.unique(cell[snap_order], return_index=True)
+
+    os.makedirs(output_dir, exist_ok=True)
+    arrays = {
+        "lat": lat.astype(np.float32), "lon": lon.astype(np.float32),
+        "indptr": indptr, "indices": dst.astype(np.int32),
+        "time_s": time_s.astype(np.float32), "length_m": length_m.astype(np.float32),
+        "landmarks": np.asarray(landmarks, dtype=np.int32),
+        "from_landmark": from_landmark, "to_landmark": to_landmark,
+        "snap_nodes": snap_order.astype(np.int32), "snap_keys": snap_keys,
+        "snap_starts": np.append(snap_starts, n).astype(np.int64),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), array)
+
+    meta = {"nodes": int(n), "edges": int(len(dst)), "landmarks": len(landmarks),
+            "snap_cell_deg": SNAP_CELL_DEG, "snap_cols": n_cols}
+    with open(os.path.join(output_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+    logger.info(f"Built routing graph at {output_dir}: {meta}")
+    return meta
+
+
+def build_graph(osm_path: str, output_dir: str, n_landmarks: int = 16) -> Dict:
+    """Build a routing graph directory from an OSM XML extract."""
+    nodes, ways = parse_osm(osm_path)
+    index: Dict[int, int] = {}
+    src, dst, speed = [], [], []
+    for refs, way_speed, direction in ways:
+        refs = [ref for ref in refs if ref in nodes]
+        for a, b in zip(refs, refs[1:]):
+            ia = index.setdefault(a, len(index))
+            ib = index.setdefault(b, len(index))
+            if direction >= 0:
+                src.append(ia), dst.append(ib), speed.append(way_speed)
+            if direction <= 0:
+                src.append(ib), dst.append(ia), speed.append(way_speed)
+
+    coords = np.zeros((len(index), 2))
+    for osm_id, i in index.items():
+        coords[i] = nodes[osm_id]
+    logger.info(f"Parsed {len(ways)} drivable ways, {len(index)} nodes from {osm_path}")
+    return build_from_edges(coords[:, 0], coords[:, 1], np.array(src), np.array(dst),
+                            np.array(speed, dtype=np.float64), output_dir, n_landmarks)
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def _select_landmarks(graph, k: int) -> List[int]:
+    """Farthest-point landmark selection on travel time."""
+    from scipy.sparse.csgraph import dijkstra
+
+    nearest = dijkstra(graph, directed=False, indices=0)
+    landmarks = [int(np.argmax(nearest))]
+    nearest = dijkstra(graph, directed=False, indices=landmarks[0])
+    while len(landmarks) < k:
+        candidate = int(np.argmax(nearest))
+        if nearest[candidate] == 0:
+            break
+        landmarks.append(candidate)
+        nearest = np.minimum(nearest, dijkstra(graph, directed=False, indices=candidate))
+    return landmarks
+
+
+class RoutingEngine:
+    """
+    Shortest-path queries over a graph built by `build_from_edges`.
+
+    Routes minimise travel time; distances are measured along that route.
+    Points are snapped to the nearest graph node and the straight-line snap
+    distances are added to the result.
+    """
+
+    # Landmarks used per query (the ones giving the best bound at the source)
+    ACTIVE_LANDMARKS = 4
+
+    def __init__(self, graph_dir: str):
+        from scipy.sparse import csr_matrix
+
+        self.graph_dir = graph_dir
+        with open(os.path.join(graph_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(graph_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.lat = load("lat")
+        self.lon = load("lon")
+        indptr, indices = np.asarray(load("indptr")), np.asarray(load("indices"))
+        time_s, length_m = np.asarray(load("time_s")), np.asarray(load("length_m"))
+        self.from_landmark = load("from_landmark")
+        self.to_landmark = load("to_landmark")
+        self.snap_nodes = load("snap_nodes")
+        self.snap_keys = np.asarray(load("snap_keys"))
+        self.snap_starts = np.asarray(load("snap_starts"))
+        self.n = self.meta["nodes"]
+
+        # Python lists make the A* inner loop several times faster than numpy scalar indexing
+        self._indptr = indptr.tolist()
+        self._indices = indices.tolist()
+        self._time = time_s.tolist()
+        self._length = length_m.tolist()
+        self._graph = csr_matrix((time_s.astype(np.float64), indices, indptr), shape=(self.n, self.n))
+
+    # ----- Snapping -----
+
+    def snap(self, lat: float, lon: float, max_km: float = None) -> Optional[Tuple[int, float]]:
+        """
+        Nearest graph node to a coordinate.
+
+        Returns:
+            (node, distance in metres), or None if nothing within `max_km`
+        """
+        max_km = max_km or settings.routing_snap_max_km
+        cell_deg, n_cols = self.meta["snap_cell_deg"], self.meta["snap_cols"]
+        row = int(math.floor((lat + 90.0) / cell_deg))
+        col = int(math.floor((lon + 180.0) / cell_deg))
+        cell_km = cell_deg * 111.195 * max(math.cos(math.radians(lat)), 0.01)
+        best, best_m = None, float("inf")
+
+        for ring in range(int(math.ceil(max_km / cell_km)) + 2):
+            if best is not None and (ring - 1) * cell_km * 1000 > best_m:
+                break
+            offsets = range(-ring, ring + 1)
+            keys = np.array([(row + dr) * n_cols + (col + dc) for dr in offsets for dc in offsets
+                             if max(abs(dr), abs(dc)) == ring], dtype=np.int64)
+            pos = np.searchsorted(self.snap_keys, keys)
+            in_range = pos < len(self.snap_keys)
+            pos, keys = pos[in_range], keys[in_range]
+            pos = pos[self.snap_keys[pos] == keys]
+            if not len(pos):
+                continue
+            nodes = np.concatenate([self.snap_nodes[self.snap_starts[p]:self.snap_starts[p + 1]] for p in pos])
+            dist = _haversine_m(lat, lon, self.lat[nodes], self.lon[nodes])
+            i = int(np.argmin(dist))
+            if dist[i] < best_m:
+                best, best_m = int(nodes[i]), float(dist[i])
+
+        if best is None or best_m > max_km * 1000:
+            return None
+        return best, best_m
+
+    # ----- One-to-one -----
+
+    def _shortest(self, source: int, target: int) -> Optional[Tuple[float, float]]:
+        """A* with ALT lower bounds. Returns (time_s, length_m)."""
+        if source == target:
+            return 0.0, 0.0
+
+        # Pick the landmarks with the best bound between source and target
+        f_t = np.asarray(self.from_landmark[:, target], dtype=np.float64)
+        t_t = np.asarray(self.to_landmark[:, target], dtype=np.float64)
+        f_s = np.asarray(self.from_landmark[:, source], dtype=np.float64)
+        t_s = np.asarray(self.to_landmark[:, source], dtype=np.float64)
+        bounds = np.maximum(f_t - f_s, t_s - t_t)
+        active = np.argsort(-bounds)[:self.ACTIVE_LANDMARKS]
+        from_rows = [self.from_landmark[l] for l in active]
+        to_rows = [self.to_landmark[l] for l in active]
+        pairs = [(from_rows[i], float(f_t[l]), to_rows[i], float(t_t[l])) for i, l in enumerate(active)]
+
+        h_cache: Dict[int, float] = {}
+
+        def heuristic(v: int) -> float:
+            h = h_cache.get(v)
+            if h is None:
+                h = 0.0
+                for from_row, f_target, to_row, t_target in pairs:
+                    bound = max(f_target - float(from_row[v]), float(to_row[v]) - t_target)
+                    if bound > h:
+                        h = bound
+                h_cache[v] = h
+            return h
+
+        indptr, indices, times, lengths = self._indptr, self._indices, self._time, self._length
+        best = {source: 0.0}
+        dist_m = {source: 0.0}
+        settled = set()
+        heap = [(heuristic(source), 0.0, source)]
+
+        while heap:
+            _, g, v = heapq.heappop(heap)
+            if v in settled:
+                continue
+            if v == target:
+                return g, dist_m[v]
+            settled.add(v)
+            for e in range(indptr[v], indptr[v + 1]):
+                w = indices[e]
+                if w in settled:
+                    continue
+                ng = g + times[e]
+                if ng < best.get(w, float("inf")):
+                    best[w] = ng
+                    dist_m[w] = dist_m[v] + lengths[e]
+                    heapq.heappush(heap, (ng + heuristic(w), ng, w))
+        return None
+
+    def route(self, origin: Dict[str, float], destination: Dict[str, float]) -> Optional[Dict[str, float]]:
+        """
+        Driving distance and time between two coordinates.
+
+        Args:
+            origin: {"lat", "lng"}
+            destination: {"lat", "lng"}
+
+        Returns:
+            {"distance_km", "duration_s"}, or None if either point is off the network
+        """
+        start = self.snap(origin["lat"], origin["lng"])
+        end = self.snap(destination["lat"], destination["lng"])
+        if start is None or end is None:
+            return None
+        found = self._shortest(start[0], end[0])
+        if found is None:
+            return None
+        time_s, length_m = found
+        return self._with_snap(time_s, length_m, start[1] + end[1])
+
+    @staticmethod
+    def _with_snap(time_s: float, length_m: float, snap_m: float) -> Dict[str, float]:
+        # Off-network legs at a slow access speed (~15 km/h)
+        return {
+            "distance_km": round((length_m + snap_m) / 1000, 3),
+            "duration_s": round(time_s + snap_m / 4.2, 1),
+        }
+
+    # ----- One-to-many -----
+
+    def route_many(self, origin: Dict[str, float],
+                   destinations: List[Dict[str, float]]) -> List[Optional[Dict[str, float]]]:
+        """
+        Driving distance and time from one origin to many destinations with
+        a single Dijkstra search.
+
+        Returns:
+            One result (or None if unreachable/off-network) per destination
+        """
+        from scipy.sparse.csgraph import dijkstra
+
+        start = self.snap(origin["lat"], origin["lng"])
+        ends = [self.snap(d["lat"], d["lng"]) for d in destinations]
+        if start is None:
+            return [None] * len(destinations)
+
+        times, predecessors = dijkstra(self._graph, directed=True, indices=start[0],
+                                       return_predecessors=True)
+        results = []
+        lengths: Dict[int, float] = {start[0]: 0.0}
+        for end in ends:
+            if end is None or not np.isfinite(times[end[0]]):
+                results.append(None)
+                continue
+            results.append(self._with_snap(float(times[end[0]]),
+                                           self._path_length(end[0], predecessors, lengths),
+                                           start[1] + end[1]))
+        return results
+
+    def _path_length(self, node: int, predecessors: np.ndarray, memo: Dict[int, float]) -> float:
+        """Length along the predecessor tree, memoised across destinations."""
+        path = []
+        while node not in memo:
+            path.append(node)
+            node = int(predecessors[node])
+        total = memo[node]
+        for v in reversed(path):
+            u = int(predecessors[v])
+            for e in range(self._indptr[u], self._indptr[u + 1]):
+                if self._indices[e] == v:
+                    total += self._length[e]
+                    break
+            memo[v] = total
+        return memo[path[0]] if path else total
+
+
+# Global engine instance
+_engine: Optional[RoutingEngine] = None
+_engine_checked = False
+
+
+def get_routing_engine() -> Optional[RoutingEngine]:
+    """
+    Get the routing engine, loading the graph on first use.
+
+    Returns:
+        RoutingEngine, or None if no graph is configured or it failed to load
+    """
+    global _engine, _engine_checked
+    if _engine_checked:
+        return _engine
+    _engine_checked = True
+
+    graph_dir = settings.routing_graph_dir
+    if not graph_dir or not os.path.exists(os.path.join(graph_dir, META_FILE)):
+        logger.info("No routing graph found; distances use haversine")
+        return None
+    try:
+        _engine = RoutingEngine(graph_dir)
+        logger.info(f"Routing graph loaded from {graph_dir}: {_engine.meta}")
+    except Exception as e:
+        logger.error(f"Failed to load routing graph: {str(e)}")
+    return _engine
+
+
+def trip_distance_km(origin: Dict[str, float], destination: Dict[str, float]) -> float:
+    """
+    Trip distance from the configured source.
+
+    With `DISTANCE_SOURCE=routing` and a loaded graph this is the driving
+    distance; otherwise (or if either point is off the network) the
+    straight-line haversine distance.
+    """
+    if settings.distance_source == "routing":
+        engine = get_routing_engine()
+        if engine is not None:
+            try:
+                routed = engine.route(origin, destination)
+                if routed is not None:
+                    return routed["distance_km"]
+            except Exception as e:
+                logger.error(f"Routing failed, using haversine: {str(e)}")
+    return haversine_km(origin, destination)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline routing graph")
+    parser.add_argument("--osm", required=True, help="OSM XML extract")
+    parser.add_argument("--out", default=settings.routing_graph_dir, help="Output directory")
+    parser.add_argument("--landmarks", type=int, default=16, help="ALT landmarks to precompute")
+    args = parser.parse_args()
+    build_graph(args.osm, args.out, args.landmarks)
@@ -0,0 +1,354 @@
+"""
+Zone-based surge pricing.
+Consumes ride-request and driver-availability events, keeps sliding-window
+demand counts per zone in a ring buffer of time buckets plus the set of
+available drivers per zone, and recomputes surge multipliers on a fixed
+tick. Multipliers are published to Redis as one snapshot so every API
+worker serves the same values; lookups are a dict hit on a cached copy.
+
+Zones are the 0.1 degree grid of `compute_zone_features`.
+
+Run with:
+    python -m app.services.surge_engine
+"""
+import asyncio
+import json
+import math
+import signal
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.features import compute_zone_features
+from app.utils.redis_client import get_redis, KEY_PREFIX
+from app.utils.rmq_consumer import AsyncConsumer, Message
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+SURGE_SNAPSHOT_KEY = f"{KEY_PREFIX}surge:snapshot"
+
+# Zone grid, as in compute_zone_features
+ZONE_DEG = 0.1
+
+# Driver statuses that count as available supply
+AVAILABLE_STATUSES = {"available", "online", "idle"}
+
+
+def _zone_keys(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Integer key per point for its grid zone."""
+    zone_lat = np.floor(np.asarray(lat, dtype=np.float64) / ZONE_DEG).astype(np.int64)
+    zone_lng = np.floor(np.asarray(lng, dtype=np.float64) / ZONE_DEG).astype(np.int64)
+    return zone_lat * 10000 + zone_lng
+
+
+def _zone_id(key: int) -> str:
+    zone_lat, zone_lng = divmod(int(key) + 5000, 10000)
+    return f"{zone_lat}_{zone_lng - 5000}"
+
+
+class SurgeEngine:
+    """
+    Sliding-window demand/supply counters and surge multipliers per zone.
+
+    Demand is ride requests over the last `window_s`, held in a ring of
+    `bucket_s` buckets (a (buckets, zones) int32 array) so expiring old
+    requests is zeroing one row. Supply is the number of drivers whose
+    last availability event (within `driver_ttl_s`) put them available in
+    the zone; stale drivers expire through a ring of per-bucket id sets.
+
+    Args:
+        window_s: Demand window
+        bucket_s: Ring buffer resolution
+        max_zones: Zones tracked (events in further zones are ignored)
+        driver_ttl_s: Drivers silent for this long stop counting as supply
+    """
+
+    def __init__(self, window_s: float = None, bucket_s: float = None,
+                 max_zones: int = None, driver_ttl_s: float = None):
+        self.window_s = window_s or settings.surge_window_s
+        self.bucket_s = bucket_s or settings.surge_bucket_s
+        self.max_zones = max_zones or settings.surge_max_zones
+        driver_ttl_s = driver_ttl_s or settings.surge_driver_ttl_s
+
+        self.n_buckets = max(1, int(math.ceil(self.window_s / self.bucket_s)))
+        self.demand = np.zeros((self.n_buckets, self.max_zones), dtype=np.int32)
+        self.supply = np.zeros(self.max_zones, dtype=np.int32)
+        self.multipliers = np.ones(self.max_zones, dtype=np.float64)
+
+        self._slots: Dict[int, int] = {}
+        self._zone_keys: List[int] = []
+        self._bucket: Optional[int] = None
+
+        self._driver_buckets = max(1, int(math.ceil(driver_ttl_s / self.bucket_s)))
+        self._drivers: Dict[str, Tuple[int, int]] = {}
+        self._driver_ring: List[set] = [set() for _ in range(self._driver_buckets)]
+
+        self.dropped = 0
+
+    # ----- Zones and time -----
+
+    def _slot(self, key: int) -> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            if len(self._zone_keys) >= self.max_zones:
+                return -1
+            slot = len(self._zone_keys)
+            self._slots[key] = slot
+            self._zone_keys.append(key)
+        return slot
+
+    def _advance(self, now: float) -> int:
+        """Move the ring to the bucket containing `now`, expiring old data."""
+        bucket = int(now // self.bucket_s)
+        if self._bucket is None:
+            self._bucket = bucket
+        while self._bucket < bucket:
+            self._bucket += 1
+            if bucket - self._bucket >= max(self.n_buckets, self._driver_buckets):
+                # Long idle gap: everything has expired
+                self.demand[:] = 0
+                self._expire_all_drivers()
+                self._bucket = bucket
+                break
+            self.demand[self._bucket % self.n_buckets] = 0
+            self._expire_drivers(self._bucket % self._driver_buckets)
+        return self._bucket
+
+    def _expire_drivers(self, ring_index: int):
+        expired = self._driver_ring[ring_index]
+        for driver_id in expired:
+            slot, _ = self._drivers.pop(driver_id)
+            self.supply[slot] -= 1
+        expired.clear()
+
+    def _expire_all_drivers(self):
+        self._drivers.clear()
+        self.supply[:] = 0
+        for ids in self._driver_ring:
+            ids.clear()
+
+    # ----- Events -----
+
+    def record_requests(self, lat: np.ndarray, lng: np.ndarray, now: float = None):
+        """Count ride requests at the given pickup coordinates."""
+        if not len(lat):
+            return
+        bucket = self._advance(time.time() if now is None else now)
+        keys, inverse = np.unique(_zone_keys(lat, lng), return_inverse=True)
+        slots = np.array([self._slot(key) for key in keys.tolist()], dtype=np.int64)[inverse]
+        valid = slots >= 0
+        self.dropped += int((~valid).sum())
+        np.add.at(self.demand[bucket % self.n_buckets], slots[valid], 1)
+
+    def record_driver(self, driver_id: str, lat: float, lng: float, available: bool, now: float = None):
+        """Apply a driver availability/location event."""
+        bucket = self._advance(time.time() if now is None else now)
+        previous = self._drivers.pop(driver_id, None)
+        if previous is not None:
+            self.supply[previous[0]] -= 1
+            self._driver_ring[previous[1] % self._driver_buckets].discard(driver_id)
+        if not available:
+            return
+
+        slot = self._slot(math.floor(lat / ZONE_DEG) * 10000 + math.floor(lng / ZONE_DEG))
+        if slot < 0:
+            self.dropped += 1
+            return
+        self.supply[slot] += 1
+        self._drivers[driver_id] = (slot, bucket)
+        self._driver_ring[bucket % self._driver_buckets].add(driver_id)
+
+    # ----- Multipliers -----
+
+    def tick(self, now: float = None) -> Dict[str, float]:
+        """
+        Recompute multipliers from the current window.
+
+        The target multiplier grows with requests per available driver
+        above `surge_threshold`, is held at 1.0 for zones with fewer than
+        `surge_min_demand` requests, is capped at `surge_max_multiplier`,
+        and is approached gradually (`surge_smoothing`) so it does not
+        flap between ticks. Values are rounded to 0.1 steps.
+
+        Returns:
+            Zone id -> multiplier for zones currently surging
+        """
+        self._advance(time.time() if now is None else now)
+        n = len(self._zone_keys)
+        demand = self.demand[:, :n].sum(axis=0, dtype=np.int64)
+        supply = self.supply[:n]
+
+        pressure = demand / (supply + 1.0)
+        target = 1.0 + settings.surge_sensitivity * np.maximum(pressure - settings.surge_threshold, 0.0)
+        target[demand < settings.surge_min_demand] = 1.0
+        target = np.minimum(target, settings.surge_max_multiplier)
+
+        current = self.multipliers[:n]
+        current += settings.surge_smoothing * (target - current)
+        settled = np.abs(current - target) < 0.05
+        current[settled] = target[settled]
+
+        rounded = np.round(current, 1)
+        surging = np.flatnonzero(rounded > 1.0)
+        return {_zone_id(self._zone_keys[i]): float(rounded[i]) for i in surging}
+
+    def stats(self) -> Dict[str, Any]:
+        n = len(self._zone_keys)
+        return {
+            "zones": n,
+            "requests_in_window": int(self.demand[:, :n].sum()),
+            "available_drivers": len(self._drivers),
+            "dropped": self.dropped,
+        }
+
+
+# ----- Publishing and lookup -----
+
+def publish_snapshot(multipliers: Dict[str, float], tick_s: float = None) -> bool:
+    """
+    Publish a multiplier snapshot to Redis.
+
+    The key expires after a few ticks, so if the engine stops, workers
+    fall back to no surge instead of serving stale multipliers.
+    """
+    tick_s = tick_s or settings.surge_tick_s
+    try:
+        client = get_redis()
+        if client is None:
+            return False
+        snapshot = {"updated_at": time.time(), "zones": multipliers}
+        client.setex(SURGE_SNAPSHOT_KEY, max(1, int(math.ceil(tick_s * 3))), json.dumps(snapshot))
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to publish surge snapshot: {e}")
+        return False
+
+
+# Cached snapshot for lookups
+_snapshot: Dict[str, float] = {}
+_snapshot_checked_at: Optional[float] = None
+
+
+def _refresh_snapshot():
+    global _snapshot, _snapshot_checked_at
+    _snapshot_checked_at = time.monotonic()
+    try:
+        client = get_redis()
+        data = client.get(SURGE_SNAPSHOT_KEY) if client is not None else None
+        _snapshot = json.loads(data)["zones"] if data else {}
+    except Exception as e:
+        logger.warning(f"Failed to read surge snapshot: {e}")
+        _snapshot = {}
+
+
+def get_surge_multiplier(coord: Dict[str, float]) -> float:
+    """
+    Current surge multiplier for the zone containing `coord`.
+
+    Reads a locally cached copy of the published snapshot, refreshed at
+    most every `surge_tick_s`. Returns 1.0 when surge is disabled, the zone
+    is not surging or no snapshot is available.
+    """
+    if not settings.surge_enabled:
+        return 1.0
+    if _snapshot_checked_at is None or time.monotonic() - _snapshot_checked_at >= settings.surge_tick_s:
+        _refresh_snapshot()
+    if not _snapshot:
+        return 1.0
+    return _snapshot.get(compute_zone_features(coord)["zone_id"], 1.0)
+
+
+# ----- Event consumer -----
+
+def _point(event: Dict[str, Any], *fields: str) -> Optional[Tuple[float, float]]:
+    for name in fields:
+        location = event.get(name)
+        if isinstance(location, dict) and "lat" in location:
+            return float(location["lat"]), float(location.get("lng", location.get("lon")))
+    if "lat" in event:
+        return float(event["lat"]), float(event.get("lng", event.get("lon")))
+    return None
+
+
+class SurgeConsumer:
+    """AsyncConsumer handlers feeding a SurgeEngine."""
+
+    def __init__(self, engine: SurgeEngine):
+        self.engine = engine
+        self.skipped = 0
+
+    async def handle_requests(self, messages: List[Message]):
+        """Ride-request events: {"pickup" | "origin": {"lat", "lng"}, ...}"""
+        points = []
+        for message in messages:
+            try:
+                point = _point(message.json(), "pickup", "origin")
+            except (ValueError, TypeError):
+                point = None
+            if point is None:
+                self.skipped += 1
+            else:
+                points.append(point)
+        if points:
+            coords = np.array(points)
+            self.engine.record_requests(coords[:, 0], coords[:, 1])
+
+    async def handle_drivers(self, messages: List[Message]):
+        """Driver events: {"driver_id", "location": {"lat", "lng"}, "status" | "available"}"""
+        for message in messages:
+            try:
+                event = message.json()
+                driver_id = str(event["driver_id"])
+                point = _point(event, "location", "currentLocation")
+                if "available" in event:
+                    available = bool(event["available"])
+                else:
+                    available = str(event.get("status", "")).lower() in AVAILABLE_STATUSES
+                if point is None:
+                    if available:
+                        raise ValueError("available driver without location")
+                    point = (0.0, 0.0)
+                self.engine.record_driver(driver_id, point[0], point[1], available)
+            except (KeyError, ValueError, TypeError):
+                self.skipped += 1
+
+
+async def run_surge():
+    """Consume demand/supply events and publish multipliers until SIGINT/SIGTERM."""
+    engine = SurgeEngine()
+    handlers = SurgeConsumer(engine)
+
+    consumer = AsyncConsumer(settings.rabbitmq_url)
+    consumer.subscribe(settings.surge_request_queue, handlers.handle_requests,
+                       batch_size=500, batch_timeout=0.05, concurrency=1, requeue_on_error=False)
+    consumer.subscribe(settings.surge_driver_queue, handlers.handle_drivers,
+                       batch_size=500, batch_timeout=0.05, concurrency=1, requeue_on_error=False)
+
+    async def tick_loop():
+        while True:
+            await asyncio.sleep(settings.surge_tick_s)
+            try:
+                surging = engine.tick()
+                publish_snapshot(surging)
+                logger.debug(f"Surge tick: {len(surging)} zones surging, {engine.stats()}")
+            except Exception as e:
+                logger.error(f"Surge tick failed: {str(e)}")
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: asyncio.ensure_future(consumer.stop()))
+        except NotImplementedError:
+            pass
+
+    ticker = asyncio.create_task(tick_loop())
+    try:
+        await consumer.run()
+    finally:
+        ticker.cancel()
+        logger.info(f"Surge engine stopped: {engine.stats()}, {handlers.skipped} skipped")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_surge())
@@ -1,6 +1,14 @@
-from celery import Celery
+from celery import Celery, states
+from celery.signals import task_postrun, worker_init, worker_process_init
+import gc
 import os
+import socket
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.utils.job_events import publish_job_done
+from app.utils.redis_client import get_redis, KEY_PREFIX
+
+logger = get_logger(__name__)
 
 # Create Celery app
 app = Celery(
@@ -22,7 +30,53 @@ app.conf.update(
     task_track_started=True,
     task_time_limit=3600,  # 1 hour max
     task_soft_time_limit=3000,  # 50 minutes soft limit
+    result_expires=3600,  # Keep results in the Redis backend for 1 hour
 )
 
 # Auto-discover tasks
 app.autodiscover_tasks(['app.tasks'])
+
+
+@task_postrun.connect
+def notify_task_done(task_id=None, state=None, **kwargs):
+    """Notify API processes waiting on this task that it has finished."""
+    if state in states.READY_STATES:
+        publish_job_done(task_id, state)
+
+
+@worker_init.connect
+def preload_model(**kwargs):
+    """
+    Load and warm the model in the parent worker process before the pool
+    forks, so prefork children share the loaded model copy-on-write.
+    """
+    if not settings.model_preload:
+        return
+    
+    from app.services.eta_service import warm_model
+    
+    elapsed = warm_model()
+    # Move loaded objects out of the GC's tracked generations so collections
+    # in the children don't touch (and copy) the shared pages
+    gc.freeze()
+    logger.info(f"Model preloaded in worker parent (pid {os.getpid()}) in {elapsed:.3f}s")
+
+
+@worker_process_init.connect
+def warm_worker_process(**kwargs):
+    """Warm the model in each pool process and report time-to-first-prediction."""
+    if not settings.model_preload:
+        return
+    
+    from app.services.eta_service import warm_model
+    
+    elapsed = warm_model()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker process {worker_id} ready, time to first prediction {elapsed:.3f}s")
+    
+    try:
+        client = get_redis()
+        if client:
+            client.hset(f"{KEY_PREFIX}workers:time_to_first_prediction", worker_id, round(elapsed, 4))
+    except Exception as e:
+        logger.warning(f"Failed to report worker warm-up time: {e}")
@@ -1,7 +1,14 @@
 from app.tasks.celery_app import app
 from app.models.trainer import train_model as train_model_func
+from app.utils.redis_client import get_redis, generate_eta_key, KEY_PREFIX
+from app.utils import result_store, single_flight
+from app.core.config import settings
 from app.core.logging import get_logger
+from celery import chord, group
+from celery.exceptions import Ignore
 import pandas as pd
+import asyncio
+import time
 import os
 
 logger = get_logger(__name__)
@@ -102,57 +109,257 @@ def preprocess_data_task(self, raw_data_path: str, output_path: str):
         }
 
 
+class ProgressThrottle:
+    """
+    Rate-limits task progress updates.
+    
+    Each update is a write to the result backend, so updates are only
+    emitted once every `every_rows` rows or `interval_s` seconds,
+    whichever comes first.
+    """
+    
+    def __init__(self, task, total: int, every_rows: int = None, interval_s: float = None):
+        self.task = task
+        self.total = total
+        self.every_rows = every_rows or settings.bulk_progress_every_rows
+        self.interval_s = interval_s if interval_s is not None else settings.bulk_progress_interval_s
+        self._last_rows = 0
+        self._last_time = time.monotonic()
+    
+    def update(self, processed: int) -> bool:
+        """Report progress if a threshold has been crossed. Returns True if reported."""
+        now = time.monotonic()
+        if (processed - self._last_rows < self.every_rows
+                and now - self._last_time < self.interval_s):
+            return False
+        
+        self.task.update_state(
+            state='PROGRESS',
+            meta={
+                'status': f'Processing {processed}/{self.total}',
+                'processed': processed,
+                'total': self.total
+            }
+        )
+        self._last_rows = processed
+        self._last_time = now
+        return True
+
+
+def _chunk_requests(requests_data: list, chunk_size: int) -> list:
+    """Split requests into (offset, chunk) pairs."""
+    return [
+        (offset, requests_data[offset:offset + chunk_size])
+        for offset in range(0, len(requests_data), chunk_size)
+    ]
+
+
+def _score_chunk(chunk: list, offset: int) -> list:
+    """Score a chunk of ETA requests through the vectorized batch path."""
+    from app.services.eta_service import predict_eta_batch
+    
+    predictions = predict_eta_batch(chunk)
+    return [
+        {
+            'request_id': request.get('id', offset + idx),
+            'eta_seconds': prediction['eta_seconds'],
+            'confidence': prediction['confidence']
+        }
+        for idx, (request, prediction) in enumerate(zip(chunk, predictions))
+    ]
+
+
+def _chords_supported() -> bool:
+    """Check whether the configured result backend can run chords."""
+    try:
+        app.backend.ensure_chords_allowed()
+        return True
+    except NotImplementedError:
+        return False
+
+
 @app.task(name="tasks.bulk_eta_prediction", bind=True)
 def bulk_eta_prediction_task(self, requests_data: list):
     """
     Celery task for bulk ETA predictions.
     
+    Input is split into chunks of `bulk_eta_chunk_size`. When the result
+    backend supports chords, the chunks are fanned out to the worker pool
+    and merged by `merge_bulk_eta_results`; otherwise they are scored
+    sequentially in this task.
+    
+    Each scored chunk is appended to the job's result store as soon as it
+    is ready and can be paged through /tasks/{task_id}/results. Results are
+    only returned inline when the store is unavailable.
+    
     Args:
         requests_data: List of request dictionaries
     
     Returns:
-        Dictionary with prediction results
+        Dictionary with prediction summary (and results if not stored)
     """
+    job_id = self.request.id
     try:
-        logger.info(f"Starting bulk ETA prediction for {len(requests_data)} requests")
+        total = len(requests_data)
+        logger.info(f"Starting bulk ETA prediction for {total} requests")
         
-        from app.services.eta_service import predict_eta
+        chunks = _chunk_requests(requests_data, settings.bulk_eta_chunk_size)
         
-        results = []
-        for idx, request in enumerate(requests_data):
-            self.update_state(
-                state='PROGRESS',
-                meta={'status': f'Processing {idx+1}/{len(requests_data)}'}
+        if len(chunks) > 1 and not self.request.called_directly and _chords_supported():
+            logger.info(f"Fanning out bulk prediction into {len(chunks)} chunks")
+            header = group(
+                bulk_eta_chunk_task.s(chunk, offset, job_id, total)
+                for offset, chunk in chunks
             )
-            
-            result = predict_eta(request)
-            results.append({
-                'request_id': request.get('id', idx),
-                'eta_seconds': result.eta_seconds,
-                'confidence': result.confidence
-            })
+            callback = merge_bulk_eta_results.s(job_id=job_id).on_error(bulk_eta_failed.s(job_id=job_id))
+            return self.replace(chord(header, callback))
         
-        logger.info(f"Bulk prediction completed: {len(results)} results")
+        progress = ProgressThrottle(self, total)
+        chunk_results = []
+        processed = 0
+        for offset, chunk in chunks:
+            results = _score_chunk(chunk, offset)
+            stored = result_store.append_results(job_id, results)
+            chunk_results.append({'count': len(results), 'stored': stored, 'results': [] if stored else results})
+            processed += len(results)
+            progress.update(processed)
         
-        return {
-            'status': 'completed',
-            'results': results,
-            'total_processed': len(results)
-        }
+        return _bulk_summary(job_id, chunk_results)
         
+    except Ignore:
+        raise
     except Exception as e:
         logger.error(f"Bulk prediction failed: {str(e)}")
+        result_store.mark_complete(job_id, 0, status="failed")
         return {
             'status': 'failed',
             'error': str(e)
         }
 
 
-@app.task(name="tasks.async_eta_prediction")
-def async_eta_prediction_task(request_data: dict):
+@app.task(name="tasks.bulk_eta_chunk", bind=True)
+def bulk_eta_chunk_task(self, chunk: list, offset: int, job_id: str = None, total: int = None):
+    """
+    Celery task scoring one chunk of a fanned-out bulk ETA job.
+    
+    Results are appended to the parent job's result store. Progress is
+    accumulated in Redis under the parent job and reported on the parent
+    task whenever a `bulk_progress_every_rows` boundary is crossed.
+    
+    Args:
+        chunk: List of request dictionaries
+        offset: Index of the first request within the parent job
+        job_id: Parent bulk task ID
+        total: Total number of requests in the parent job
+    
+    Returns:
+        Dictionary with the row count, whether the rows were stored, the
+        rows if they were not, and the error if the chunk could not be scored
+    """
+    try:
+        results = _score_chunk(chunk, offset)
+    except Exception as e:
+        # Reported to the chord callback instead of failing the whole chord
+        logger.error(f"Bulk chunk at offset {offset} of {job_id} failed: {str(e)}")
+        return {'count': 0, 'stored': False, 'results': [], 'error': f"Chunk at offset {offset}: {str(e)}"}
+    stored = result_store.append_results(job_id, results)
+    
+    if job_id:
+        try:
+            processed = len(results)
+            client = get_redis()
+            if client:
+                counter_key = f"{KEY_PREFIX}bulk:{job_id}:processed"
+                processed = client.incrby(counter_key, len(results))
+                client.expire(counter_key, app.conf.task_time_limit)
+            
+            every = settings.bulk_progress_every_rows
+            if processed // every > (processed - len(results)) // every or processed == total:
+                self.update_state(
+                    task_id=job_id,
+                    state='PROGRESS',
+                    meta={
+                        'status': f'Processing {processed}/{total}',
+                        'processed': processed,
+                        'total': total
+                    }
+                )
+        except Exception as e:
+            logger.warning(f"Bulk progress report failed for {job_id}: {e}")
+    
+    return {'count': len(results), 'stored': stored, 'results': [] if stored else results}
+
+
+@app.task(name="tasks.merge_bulk_eta")
+def merge_bulk_eta_results(chunk_results: list, job_id: str = None):
+    """
+    Celery chord callback merging chunk results of a bulk ETA job.
+    
+    Args:
+        chunk_results: List of per-chunk result dictionaries, in chunk order
+        job_id: Parent bulk task ID
+    
+    Returns:
+        Dictionary with prediction summary (and results if not stored)
+    """
+    return _bulk_summary(job_id, chunk_results)
+
+
+@app.task(name="tasks.bulk_eta_failed")
+def bulk_eta_failed(request, exc, traceback, job_id: str = None):
+    """
+    Celery chord error callback for a fanned-out bulk ETA job.
+    
+    Marks the job's result store as failed so readers stop waiting for it.
+    """
+    logger.error(f"Bulk prediction {job_id} failed: {exc}")
+    result_store.mark_complete(job_id, 0, status="failed")
+
+
+def _bulk_summary(job_id: str, chunk_results: list) -> dict:
+    """
+    Finalize a bulk job and build its result payload.
+    
+    Results are either all in the result store (summary links to them) or
+    all inline. If only some chunks could be stored, or a chunk failed to
+    score, the job is marked failed rather than returning a partial set.
+    """
+    total = sum(chunk['count'] for chunk in chunk_results)
+    errors = [chunk['error'] for chunk in chunk_results if chunk.get('error')]
+    stored = [chunk.get('stored', False) for chunk in chunk_results if chunk['count']]
+    
+    if errors or (any(stored) and not all(stored)):
+        error = "; ".join(errors) if errors else "Result store became unavailable part way through the job"
+        logger.error(f"Bulk prediction {job_id} failed: {error}")
+        result_store.mark_complete(job_id, total, status="failed")
+        return {
+            'status': 'failed',
+            'error': error,
+            'total_processed': total
+        }
+    
+    logger.info(f"Bulk prediction completed: {total} results")
+    summary = {
+        'status': 'completed',
+        'total_processed': total
+    }
+    
+    if stored and all(stored) and result_store.mark_complete(job_id, total):
+        summary['results_url'] = f"/tasks/{job_id}/results"
+    else:
+        summary['results'] = [item for chunk in chunk_results for item in chunk['results']]
+    
+    return summary
+
+
+@app.task(name="tasks.async_eta_prediction", bind=True)
+def async_eta_prediction_task(self, request_data: dict):
     """
     Celery task for async single ETA prediction.
     
+    On failure the single-flight claim taken by the API is released so
+    that a retry can enqueue a fresh job.
+    
     Args:
         request_data: Request dictionary
     
@@ -172,6 +379,100 @@ def async_eta_prediction_task(request_data: dict):
         
     except Exception as e:
         logger.error(f"Async ETA prediction failed: {str(e)}")
+        try:
+            cache_key = generate_eta_key(
+                request_data["origin"], request_data["destination"], request_data.get("traffic_level") or 1.0
+            )
+            single_flight.release(cache_key, self.request.id)
+        except Exception:
+            pass
+        return {
+            'status': 'failed',
+            'error': str(e)
+        }
+
+
+# Column pairs holding ride endpoints, in order of preference
+_ENDPOINT_COLUMNS = [
+    ('origin_lat', 'origin_lng'), ('dest_lat', 'dest_lng'),
+    ('origin_zone_lat', 'origin_zone_lng'), ('dest_zone_lat', 'dest_zone_lng'),
+]
+
+
+def _ride_endpoints(dataset_path: str) -> list:
+    """Extract (lat, lon) ride endpoints from a CSV or segment directory."""
+    from app.models.trainer import ETAModelTrainer
+    
+    df = ETAModelTrainer().load_data(dataset_path)
+    pairs = [(lat, lng) for lat, lng in _ENDPOINT_COLUMNS if lat in df.columns and lng in df.columns]
+    # Raw coordinates supersede the zone columns when both exist
+    if any(lat in ('origin_lat', 'dest_lat') for lat, _ in pairs):
+        pairs = [(lat, lng) for lat, lng in pairs if not lat.endswith('zone_lat')]
+    
+    points = []
+    for lat_col, lng_col in pairs:
+        coords = df[[lat_col, lng_col]].dropna()
+        points.extend(zip(coords[lat_col].astype(float), coords[lng_col].astype(float)))
+    return points
+
+
+@app.task(name="tasks.geocode_backfill", bind=True)
+def geocode_backfill_task(self, dataset_path: str = None, points: list = None):
+    """
+    Geocode historical ride endpoints into the cache.
+    
+    Endpoints are deduplicated by cache cell and resolved in chunks through
+    the batch geocoder on the backfill lane, so live lookups keep priority
+    and the upstream rate limit is shared with the API.
+    
+    Args:
+        dataset_path: CSV or segment directory with ride endpoint columns
+        points: Explicit points as {"lat", "lon"} dicts or [lat, lon] pairs
+    
+    Returns:
+        Dictionary with resolution counts
+    """
+    from app.services.geo_service import reverse_geocode_batch, get_geocode_scheduler, PRIORITY_BACKFILL
+    from app.utils.http_client import get_http_client
+    from app.utils.redis_client import generate_geo_key
+    
+    try:
+        coords = _ride_endpoints(dataset_path) if dataset_path else []
+        for point in points or []:
+            coords.append((point['lat'], point['lon']) if isinstance(point, dict) else tuple(point))
+        
+        unique = list({generate_geo_key(lat, lon): (lat, lon) for lat, lon in coords}.values())
+        logger.info(f"Geocode backfill: {len(coords)} endpoints, {len(unique)} unique cells")
+        
+        totals = {'local': 0, 'cache': 0, 'upstream': 0, 'unresolved': 0}
+        progress = ProgressThrottle(self, len(unique))
+        chunk_size = settings.geocode_backfill_chunk_size
+        
+        async def run():
+            try:
+                for offset in range(0, len(unique), chunk_size):
+                    _, counts = await reverse_geocode_batch(
+                        unique[offset:offset + chunk_size], priority=PRIORITY_BACKFILL
+                    )
+                    for key in totals:
+                        totals[key] += counts[key]
+                    progress.update(min(offset + chunk_size, len(unique)))
+            finally:
+                await get_geocode_scheduler().stop()
+                await get_http_client().close()
+        
+        asyncio.run(run())
+        logger.info(f"Geocode backfill completed: {totals}")
+        
+        return {
+            'status': 'completed',
+            'total_points': len(coords),
+            'unique_cells': len(unique),
+            **totals
+        }
+        
+    except Exception as e:
+        logger.error(f"Geocode backfill failed: {str(e)}")
         return {
             'status': 'failed',
             'error': str(e)
@@ -0,0 +1,42 @@
+"""
+Fast-path JSON serialization for the hot fare/ETA endpoints.
+Responses are encoded once with orjson. Cached responses are stored as
+their encoded body and returned verbatim on a hit, skipping response
+model validation, jsonable_encoder and a decode/re-encode round trip.
+"""
+from typing import Any, Dict, Type
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+# numpy scalars/arrays and non-string dict keys are encoded like json.dumps would
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a value to compact JSON bytes."""
+    return orjson.dumps(value, option=OPTIONS)
+
+
+def loads(data) -> Any:
+    """Decode JSON from bytes or str."""
+    return orjson.loads(data)
+
+
+class RawJSONResponse(Response):
+    """
+    JSON response whose content is an already-encoded body (bytes or str),
+    sent as is.
+    """
+    media_type = "application/json"
+
+
+def json_body_openapi(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    `openapi_extra` documenting `model` as the JSON body of a route that
+    reads and validates the raw body itself. Nested models are referenced
+    from the shared components, where other routes register them.
+    """
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
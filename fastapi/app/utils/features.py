@@ -1,12 +1,23 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any
 import math
+from app.core.config import settings
+
+
+def local_timezone() -> timezone:
+    """Fixed-offset timezone the service's time-of-day logic runs in."""
+    return timezone(timedelta(minutes=settings.local_utc_offset_min))
 
 
 def extract_time_features(timestamp_str: str) -> Dict[str, Any]:
     """
     Extract time-based features from ISO-8601 timestamp.
     
+    Timestamps with an offset are converted to service local time first,
+    so a "Z" timestamp gets the same hour and weekday as the equivalent
+    local one (as ride ingest records them). Naive timestamps are taken
+    to be local already.
+    
     Args:
         timestamp_str: ISO-8601 formatted timestamp string
     
@@ -16,6 +27,8 @@ def extract_time_features(timestamp_str: str) -> Dict[str, Any]:
     try:
         # Parse ISO-8601 timestamp
         dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(local_timezone())
         
         return {
             'hour': dt.hour,
@@ -0,0 +1,280 @@
+"""
+Spatially indexed geocode cache.
+Results are stored under their rounded-coordinate key as before and also
+registered in a Redis GEO set, so a miss on the exact key can reuse a
+result cached for a nearby point within `geo_cache_radius_m`. Redis misses
+read through to the durable geo store, which every write also reaches.
+"""
+import bisect
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.redis_client import (
+    get_redis, cache_get, cache_get_many, generate_geo_key, KEY_PREFIX, TTL_GEO
+)
+from app.utils.geo_store import get_geo_store
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+GEO_INDEX_KEY = f"{KEY_PREFIX}geo:index"
+
+# Upper bounds (metres) of the near-hit distance histogram
+HIT_DISTANCE_BUCKETS_M = [5, 10, 25, 50, 75, 100, 150, 250]
+
+# Nearby candidates checked per lookup (skips entries whose value expired)
+NEAR_CANDIDATES = 3
+
+
+class GeoCacheStats:
+    """Hit/miss counters and a histogram of near-hit distances."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self.buckets = [0] * (len(HIT_DISTANCE_BUCKETS_M) + 1)
+        self.distance_sum_m = 0.0
+
+    def record(self, distance_m: Optional[float], from_store: bool = False):
+        with self._lock:
+            if from_store:
+                self.store_hits += 1
+            if distance_m is None:
+                self.misses += 1
+            elif distance_m == 0:
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+                self.distance_sum_m += distance_m
+                self.buckets[bisect.bisect_left(HIT_DISTANCE_BUCKETS_M, distance_m)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            labels = [f"le_{b}m" for b in HIT_DISTANCE_BUCKETS_M] + ["inf"]
+            return {
+                "radius_m": settings.geo_cache_radius_m,
+                "lookups": lookups,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "store_hits": self.store_hits,
+                "hit_rate": round((self.exact_hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+                "near_hit_mean_m": round(self.distance_sum_m / self.near_hits, 2) if self.near_hits else None,
+                "near_hit_distance_m": dict(zip(labels, self.buckets)),
+            }
+
+
+stats = GeoCacheStats()
+
+
+def _pick_nearby(nearby: List, values: List) -> Tuple[Optional[Dict], Optional[float], List[str]]:
+    """
+    Choose the closest reusable entry from GEOSEARCH candidates.
+
+    Returns:
+        (value, distance in metres, members whose value has expired)
+    """
+    expired = []
+    for (member, distance), value in zip(nearby, values):
+        if value is None:
+            expired.append(member)
+            continue
+        cached = json.loads(value)
+        # Only reuse results that resolved to a locality
+        if cached and cached.get("locality"):
+            return cached, float(distance), expired
+    return None, None, expired
+
+
+def geo_cache_get(lat: float, lon: float, radius_m: float = None,
+                  record: bool = True) -> Tuple[Optional[Dict], Optional[float]]:
+    """
+    Look up a cached geocode for a coordinate or a nearby one.
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        radius_m: Reuse radius; defaults to `geo_cache_radius_m`
+        record: Count this lookup in the hit/miss statistics
+
+    Returns:
+        (cached value, distance in metres to the cached point), or (None, None)
+    """
+    radius_m = settings.geo_cache_radius_m if radius_m is None else radius_m
+
+    cached = cache_get(generate_geo_key(lat, lon))
+    if cached:
+        if record:
+            stats.record(0)
+        return cached, 0.0
+
+    if radius_m > 0:
+        try:
+            client = get_redis()
+            if client:
+                nearby = client.geosearch(
+                    GEO_INDEX_KEY, longitude=lon, latitude=lat, radius=radius_m, unit="m",
+                    sort="ASC", count=NEAR_CANDIDATES, withdist=True
+                )
+                if nearby:
+                    values = client.mget([f"{KEY_PREFIX}{member}" for member, _ in nearby])
+                    cached, distance, expired = _pick_nearby(nearby, values)
+                    if expired:
+                        client.zrem(GEO_INDEX_KEY, *expired)
+                    if cached is not None:
+                        if record:
+                            stats.record(distance)
+                        logger.debug(f"Geo cache NEAR HIT at {distance}m")
+                        return cached, distance
+        except Exception as e:
+            logger.error(f"Geo cache search error: {e}")
+
+    cached, distance = _store_lookup([(lat, lon)], radius_m)[0]
+    if record:
+        stats.record(distance, from_store=cached is not None)
+    return cached, distance
+
+
+def geo_cache_set(lat: float, lon: float, value: Dict, ttl: int = TTL_GEO) -> bool:
+    """
+    Cache a geocode result and register it in the spatial index.
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        value: Result to cache
+        ttl: Time to live in seconds
+
+    Returns:
+        True if successful
+    """
+    return geo_cache_set_many([(lat, lon, value)], ttl)
+
+
+def geo_cache_get_many(points: List[Tuple[float, float]], radius_m: float = None,
+                       record: bool = True) -> List[Tuple[Optional[Dict], Optional[float]]]:
+    """
+    Batch version of `geo_cache_get`.
+
+    One MGET for the exact keys, one pipelined GEOSEARCH round for the
+    misses and one MGET for their candidates, regardless of batch size.
+
+    Args:
+        points: (lat, lon) pairs
+        radius_m: Reuse radius; defaults to `geo_cache_radius_m`
+        record: Count these lookups in the hit/miss statistics
+
+    Returns:
+        (cached value, distance in metres) per point, (None, None) on a miss
+    """
+    radius_m = settings.geo_cache_radius_m if radius_m is None else radius_m
+    exact = cache_get_many([generate_geo_key(lat, lon) for lat, lon in points])
+    results: List[Tuple[Optional[Dict], Optional[float]]] = [
+        (value, 0.0) if value else (None, None) for value in exact
+    ]
+    misses = [i for i, value in enumerate(exact) if not value]
+
+    if misses and radius_m > 0:
+        try:
+            client = get_redis()
+            if client:
+                pipe = client.pipeline(transaction=False)
+                for i in misses:
+                    lat, lon = points[i]
+                    pipe.geosearch(
+                        GEO_INDEX_KEY, longitude=lon, latitude=lat, radius=radius_m, unit="m",
+                        sort="ASC", count=NEAR_CANDIDATES, withdist=True
+                    )
+                searches = pipe.execute()
+                members = list({member for nearby in searches for member, _ in nearby})
+                values = dict(zip(members, client.mget([f"{KEY_PREFIX}{m}" for m in members]))) if members else {}
+
+                expired = set()
+                for i, nearby in zip(misses, searches):
+                    cached, distance, dead = _pick_nearby(nearby, [values[m] for m, _ in nearby])
+                    expired.update(dead)
+                    if cached is not None:
+                        results[i] = (cached, distance)
+                if expired:
+                    client.zrem(GEO_INDEX_KEY, *expired)
+        except Exception as e:
+            logger.error(f"Geo cache batch search error: {e}")
+
+    from_store = [i for i, (value, _) in enumerate(results) if value is None]
+    if from_store:
+        for i, found in zip(from_store, _store_lookup([points[i] for i in from_store], radius_m)):
+            results[i] = found
+    from_store = set(from_store)
+
+    if record:
+        for i, (value, distance) in enumerate(results):
+            stats.record(distance, from_store=i in from_store and value is not None)
+    return results
+
+
+def geo_cache_set_many(items: List[Tuple[float, float, Dict]], ttl: int = TTL_GEO) -> bool:
+    """
+    Cache several geocode results and index them in one pipeline.
+
+    Results are also queued for the durable geo store.
+
+    Args:
+        items: (lat, lon, value) triples
+        ttl: Time to live in seconds
+
+    Returns:
+        True if successful
+    """
+    if not items:
+        return True
+    store = get_geo_store()
+    if store is not None:
+        store.put_many(items)
+    return _redis_set_many(items, ttl)
+
+
+def _redis_set_many(items: List[Tuple[float, float, Dict]], ttl: int = TTL_GEO) -> bool:
+    try:
+        client = get_redis()
+        if client:
+            pipe = client.pipeline(transaction=False)
+            for lat, lon, value in items:
+                key = generate_geo_key(lat, lon)
+                pipe.setex(f"{KEY_PREFIX}{key}", ttl, json.dumps(value))
+                pipe.geoadd(GEO_INDEX_KEY, [lon, lat, key])
+            # Entries outlive their values at most this long; dangling ones are pruned on lookup
+            pipe.expire(GEO_INDEX_KEY, ttl)
+            pipe.execute()
+            return True
+    except Exception as e:
+        logger.error(f"Geo cache set error: {e}")
+    return False
+
+
+def _store_lookup(points: List[Tuple[float, float]], radius_m: float) -> List[Tuple[Optional[Dict], Optional[float]]]:
+    """Read Redis misses through to the durable store, re-warming Redis with hits."""
+    store = get_geo_store()
+    if store is None:
+        return [(None, None)] * len(points)
+
+    results, warm = [], []
+    for lat, lon in points:
+        try:
+            value, distance = store.lookup(lat, lon, radius_m)
+        except Exception as e:
+            logger.error(f"Geo store read error: {e}")
+            value, distance = None, None
+        results.append((value, distance))
+        if value is not None and distance == 0:
+            warm.append((lat, lon, value))
+    if warm:
+        _redis_set_many(warm)
+    return results
@@ -0,0 +1,242 @@
+"""
+Durable geocode store.
+SQLite table of geocode results keyed by cache cell, sitting behind Redis
+as a read-through L3 so results survive Redis expiry and flushes. Writes
+are queued and flushed in batches by a background thread (write-behind).
+
+Compact with:
+    python -m app.utils.geo_store compact [--max-age-days N]
+"""
+import argparse
+import atexit
+import json
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from app.utils.redis_client import generate_geo_key
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    cell TEXT PRIMARY KEY,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS geocodes_lat_lon ON geocodes (lat, lon);
+"""
+
+_UPSERT = """
+INSERT INTO geocodes (cell, lat, lon, value, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(cell) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+"""
+
+M_PER_DEG = 111195.0
+
+
+class GeoStore:
+    """
+    SQLite-backed geocode store with write-behind.
+
+    Safe to share between threads; several processes on one host may use
+    the same file (WAL mode, busy timeout).
+    """
+
+    def __init__(self, path: str, flush_interval_s: float = None, batch_size: int = None):
+        self.path = path
+        self.flush_interval_s = flush_interval_s or settings.geo_store_flush_interval_s
+        self.batch_size = batch_size or settings.geo_store_batch_size
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = threading.Event()
+        self._flushed = threading.Condition()
+        self._pending = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name="geo-store-writer", daemon=True)
+        self._writer.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ----- Reads -----
+
+    def get(self, lat: float, lon: float) -> Optional[Dict]:
+        """Exact cell lookup."""
+        row = self._conn().execute(
+            "SELECT value FROM geocodes WHERE cell = ?", (generate_geo_key(lat, lon),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_near(self, lat: float, lon: float, radius_m: float) -> Tuple[Optional[Dict], Optional[float]]:
+        """
+        Closest stored result within `radius_m` that resolved to a locality.
+
+        Returns:
+            (value, distance in metres), or (None, None)
+        """
+        d_lat = radius_m / M_PER_DEG
+        d_lon = radius_m / (M_PER_DEG * max(math.cos(math.radians(lat)), 0.01))
+        rows = self._conn().execute(
+            "SELECT lat, lon, value FROM geocodes WHERE lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?",
+            (lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon)
+        ).fetchall()
+
+        cos_lat = math.cos(math.radians(lat))
+        best, best_m = None, None
+        for row_lat, row_lon, value in rows:
+            distance = math.hypot((row_lat - lat) * M_PER_DEG, (row_lon - lon) * M_PER_DEG * cos_lat)
+            if distance <= radius_m and (best_m is None or distance < best_m):
+                cached = json.loads(value)
+                if cached.get("locality"):
+                    best, best_m = cached, distance
+        return best, best_m
+
+    def lookup(self, lat: float, lon: float, radius_m: float) -> Tuple[Optional[Dict], Optional[float]]:
+        """Exact cell, then nearest within `radius_m`."""
+        value = self.get(lat, lon)
+        if value is not None:
+            return value, 0.0
+        if radius_m > 0:
+            return self.get_near(lat, lon, radius_m)
+        return None, None
+
+    # ----- Writes -----
+
+    def put_many(self, items: List[Tuple[float, float, Dict]]):
+        """Queue results for the background writer."""
+        with self._flushed:
+            self._pending += len(items)
+        for lat, lon, value in items:
+            self._queue.put((generate_geo_key(lat, lon), lat, lon, json.dumps(value), time.time()))
+
+    def put(self, lat: float, lon: float, value: Dict):
+        self.put_many([(lat, lon, value)])
+
+    def _write_loop(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval_s)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                conn = self._conn()
+                conn.execute("BEGIN")
+                conn.executemany(_UPSERT, batch)
+                conn.execute("COMMIT")
+            except Exception as e:
+                logger.error(f"Geo store write failed ({len(batch)} rows dropped): {e}")
+                try:
+                    self._conn().execute("ROLLBACK")
+                except Exception:
+                    pass
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until queued writes are committed."""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending <= 0, timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Flush queued writes and stop the writer thread."""
+        self._closed.set()
+        self._writer.join(timeout)
+
+    # ----- Maintenance -----
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def compact(self, max_age_days: float = None) -> int:
+        """
+        Drop results older than `max_age_days`, then checkpoint the WAL and
+        rebuild the file to reclaim space.
+
+        Returns:
+            Number of rows removed
+        """
+        max_age_days = settings.geo_store_max_age_days if max_age_days is None else max_age_days
+        conn = self._conn()
+        removed = 0
+        if max_age_days and max_age_days > 0:
+            cutoff = time.time() - max_age_days * 86400
+            removed = conn.execute("DELETE FROM geocodes WHERE updated_at < ?", (cutoff,)).rowcount
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        logger.info(f"Geo store compacted: {removed} rows removed, {self.count()} remaining")
+        return removed
+
+
+# Global store instance
+_geo_store: Optional[GeoStore] = None
+_geo_store_checked = False
+_geo_store_lock = threading.Lock()
+
+
+def get_geo_store() -> Optional[GeoStore]:
+    """
+    Get the durable geocode store, opening it on first use.
+
+    Returns:
+        GeoStore, or None if disabled or it failed to open
+    """
+    global _geo_store, _geo_store_checked
+    if _geo_store_checked:
+        return _geo_store
+    with _geo_store_lock:
+        if not _geo_store_checked:
+            if settings.geo_store_path:
+                try:
+                    _geo_store = GeoStore(settings.geo_store_path)
+                    atexit.register(_geo_store.close)
+                except Exception as e:
+                    logger.error(f"Failed to open geo store at {settings.geo_store_path}: {e}")
+            _geo_store_checked = True
+    return _geo_store
+
+
+def close_geo_store():
+    """Flush and close the global store (called at shutdown)."""
+    if _geo_store is not None:
+        _geo_store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geocode store maintenance")
+    parser.add_argument("command", choices=["compact", "count"])
+    parser.add_argument("--path", default=settings.geo_store_path, help="SQLite file")
+    parser.add_argument("--max-age-days", type=float, default=None, help="Drop results older than this")
+    args = parser.parse_args()
+
+    store = GeoStore(args.path)
+    if args.command == "compact":
+        store.compact(args.max_age_days)
+    print(f"{store.count()} geocodes in {args.path}")
+    store.close()
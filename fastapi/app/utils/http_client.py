@@ -0,0 +1,157 @@
+"""
+Shared outbound HTTP client.
+One aiohttp session per process with a bounded keep-alive connection pool,
+DNS caching, per-request timeouts and a retry budget.
+"""
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional
+import aiohttp
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Upstream statuses worth retrying
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of recent traffic.
+
+    Every request deposits `ratio` tokens and every retry withdraws one, so
+    a failing upstream sees at most ~`ratio` extra load instead of
+    `max_retries` times the load. `min_per_s` tokens are always available
+    so low-traffic callers can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_s: float = 1.0, cap: float = 100.0):
+        self.ratio = ratio
+        self.min_per_s = min_per_s
+        self.cap = cap
+        self._tokens = cap
+        self._refilled_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.cap, self._tokens + (now - self._refilled_at) * self.min_per_s)
+        self._refilled_at = now
+
+    def deposit(self):
+        self._refill()
+        self._tokens = min(self.cap, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        self._refill()
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+
+class HttpClient:
+    """
+    App-lifetime HTTP client.
+
+    Call `start()` from the startup hook and `close()` at shutdown. If used
+    before `start()` (tests, Celery tasks running their own event loop) the
+    session is created lazily for the current loop.
+    """
+
+    def __init__(self, pool_size: int = None, pool_size_per_host: int = None,
+                 timeout_s: float = None, connect_timeout_s: float = None,
+                 keepalive_s: float = None, max_retries: int = None,
+                 retry_budget: RetryBudget = None):
+        self.pool_size = pool_size or settings.http_pool_size
+        self.pool_size_per_host = pool_size_per_host or settings.http_pool_size_per_host
+        self.timeout_s = timeout_s or settings.http_timeout_s
+        self.connect_timeout_s = connect_timeout_s or settings.http_connect_timeout_s
+        self.keepalive_s = keepalive_s or settings.http_keepalive_s
+        self.max_retries = settings.http_max_retries if max_retries is None else max_retries
+        self.retry_budget = retry_budget or RetryBudget(ratio=settings.http_retry_budget_ratio)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Create the session for the running event loop if needed."""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is loop:
+            return self._session
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size_per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=self.keepalive_s
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout_s, connect=self.connect_timeout_s),
+            headers={"User-Agent": "RapidRide/1.0"}
+        )
+        self._loop = loop
+        return self._session
+
+    async def close(self):
+        """Close the session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    async def get_json(self, url: str, params: Dict[str, Any] = None,
+                       headers: Dict[str, str] = None,
+                       max_retries: int = None) -> tuple[int, Optional[Any]]:
+        """
+        GET a JSON resource, retrying transient failures within the budget.
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            headers: Extra request headers
+            max_retries: Override the client's retry count for this call
+
+        Returns:
+            (status, parsed JSON or None). Status is 0 if no response was received.
+
+        Raises:
+            aiohttp.ClientError or asyncio.TimeoutError once retries are exhausted
+        """
+        session = await self.start()
+        self.retry_budget.deposit()
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+
+        while True:
+            try:
+                async with session.get(url, params=params, headers=headers) as response:
+                    if response.status not in RETRYABLE_STATUSES:
+                        data = await response.json(content_type=None) if response.status == 200 else None
+                        return response.status, data
+                    status, error = response.status, None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, error = 0, e
+
+            if attempt >= max_retries or not self.retry_budget.try_withdraw():
+                if error is not None:
+                    raise error
+                return status, None
+
+            attempt += 1
+            delay = min(1.0, 0.05 * 2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"Retrying GET {url} (attempt {attempt}) after {status or error!r}")
+            await asyncio.sleep(delay)
+
+
+# Global client instance
+_http_client: Optional[HttpClient] = None
+
+
+def get_http_client() -> HttpClient:
+    """Get the process-wide HTTP client."""
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient()
+    return _http_client
@@ -0,0 +1,159 @@
+"""
+Job completion notifications for RapidRide FastAPI services.
+Workers publish on a Redis channel when a task finishes; each API process
+keeps one subscription and wakes up any request waiting on that task.
+"""
+import asyncio
+import json
+from typing import Callable, Dict, Optional, Set
+import redis.asyncio as aioredis
+from app.utils.redis_client import get_redis, KEY_PREFIX
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Channel carrying {"task_id": ..., "state": ...} for every finished task
+JOB_DONE_CHANNEL = f"{KEY_PREFIX}jobs:done"
+
+
+def publish_job_done(task_id: str, state: str) -> bool:
+    """
+    Publish a job completion notification (worker side).
+
+    Args:
+        task_id: Celery task ID
+        state: Final task state
+
+    Returns:
+        True if published, False if Redis is unavailable
+    """
+    try:
+        client = get_redis()
+        if client:
+            client.publish(JOB_DONE_CHANNEL, json.dumps({"task_id": task_id, "state": state}))
+            return True
+    except Exception as e:
+        logger.warning(f"Failed to publish completion for {task_id}: {e}")
+    return False
+
+
+class JobNotifier:
+    """
+    Fans job completion notifications out to waiting requests.
+
+    A single pub/sub connection per process listens on JOB_DONE_CHANNEL and
+    resolves the futures registered by `wait_for`. While the subscription is
+    down, waiters fall back to polling at `job_poll_interval_s`.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+
+    async def start(self):
+        """Start the background listener."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background listener and release waiters."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+        for futures in self._waiters.values():
+            for future in futures:
+                future.cancel()
+        self._waiters.clear()
+
+    async def _run(self):
+        """Listen for completions, reconnecting with backoff on failure."""
+        backoff = 1.0
+        while True:
+            client = None
+            try:
+                client = aioredis.from_url(settings.redis_url, decode_responses=True)
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(JOB_DONE_CHANNEL)
+                    self.connected = True
+                    backoff = 1.0
+                    logger.info(f"Job notifier subscribed to {JOB_DONE_CHANNEL}")
+                    async for message in pubsub.listen():
+                        if message.get("type") == "message":
+                            self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Job notifier disconnected: {e}")
+            finally:
+                self.connected = False
+                if client is not None:
+                    await client.aclose()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _dispatch(self, data: str):
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        for future in self._waiters.pop(event.get("task_id"), ()):
+            if not future.done():
+                future.set_result(event.get("state"))
+
+    async def wait_for(self, job_id: str, timeout: float, is_ready: Callable[[], bool]) -> bool:
+        """
+        Wait until a job finishes or the timeout elapses.
+
+        Args:
+            job_id: Celery task ID
+            timeout: Maximum time to wait in seconds
+            is_ready: Callable checking the result backend for completion;
+                it blocks, so it is run in a worker thread
+
+        Returns:
+            True if the job finished, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Register before checking so a completion between the check and the
+        # wait is not missed
+        self._waiters.setdefault(job_id, set()).add(future)
+        deadline = loop.time() + timeout
+        try:
+            while not await asyncio.to_thread(is_ready):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                step = remaining if self.connected else min(remaining, settings.job_poll_interval_s)
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), step)
+                    return True
+                except asyncio.TimeoutError:
+                    continue
+            return True
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+            future.cancel()
+
+
+# Global notifier instance
+_notifier: Optional[JobNotifier] = None
+
+
+def get_job_notifier() -> JobNotifier:
+    """Get the process-wide job notifier."""
+    global _notifier
+    if _notifier is None:
+        _notifier = JobNotifier()
+    return _notifier
@@ -4,7 +4,7 @@ Provides caching functionality with connection pooling and health checks.
 """
 import redis
 import json
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List
 from app.core.config import settings
 from app.core.logging import get_logger
 
@@ -107,6 +107,100 @@ def cache_set(key: str, value: Any, ttl: int = TTL_FARE) -> bool:
     return False
 
 
+def cache_get_raw(key: str) -> Optional[str]:
+    """
+    Get a cached value as its stored JSON text, without decoding it.
+    
+    Used to return cached responses verbatim.
+    
+    Args:
+        key: Cache key (without prefix)
+    
+    Returns:
+        Stored JSON text or None if not found/error
+    """
+    try:
+        client = get_redis()
+        if client:
+            return client.get(f"{KEY_PREFIX}{key}") or None
+    except Exception as e:
+        logger.warning(f"Cache get error: {e}")
+    return None
+
+
+def cache_set_raw(key: str, data: bytes, ttl: int = TTL_FARE) -> bool:
+    """
+    Set an already-encoded JSON value in cache with TTL.
+    
+    Entries stay readable through cache_get and cache_get_many.
+    
+    Args:
+        key: Cache key (without prefix)
+        data: Encoded JSON value
+        ttl: Time-to-live in seconds
+    
+    Returns:
+        True if cached successfully, False otherwise
+    """
+    try:
+        client = get_redis()
+        if client:
+            client.setex(f"{KEY_PREFIX}{key}", ttl, data)
+            return True
+    except Exception as e:
+        logger.warning(f"Cache set error: {e}")
+    return False
+
+
+def cache_get_many(keys: List[str]) -> List[Optional[Any]]:
+    """
+    Get multiple values from cache in a single round trip.
+    
+    Args:
+        keys: Cache keys (without prefix)
+    
+    Returns:
+        List of cached values aligned with keys (None where missing/error)
+    """
+    if not keys:
+        return []
+    try:
+        client = get_redis()
+        if client:
+            values = client.mget([f"{KEY_PREFIX}{key}" for key in keys])
+            return [json.loads(value) if value else None for value in values]
+    except Exception as e:
+        logger.warning(f"Cache multi-get error: {e}")
+    return [None] * len(keys)
+
+
+def cache_set_many(items: Dict[str, Any], ttl: int = TTL_FARE) -> bool:
+    """
+    Set multiple values in cache with a shared TTL using a pipeline.
+    
+    Args:
+        items: Mapping of cache key (without prefix) to value
+        ttl: Time-to-live in seconds
+    
+    Returns:
+        True if cached successfully, False otherwise
+    """
+    if not items:
+        return True
+    try:
+        client = get_redis()
+        if client:
+            pipe = client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(f"{KEY_PREFIX}{key}", ttl, json.dumps(value))
+            pipe.execute()
+            logger.debug(f"Cache SET (pipelined): {len(items)} keys (TTL: {ttl}s)")
+            return True
+    except Exception as e:
+        logger.warning(f"Cache multi-set error: {e}")
+    return False
+
+
 def cache_delete(key: str) -> bool:
     """Delete a key from cache."""
     try:
@@ -120,9 +214,10 @@ def cache_delete(key: str) -> bool:
     return False
 
 
-def generate_fare_key(origin: dict, destination: dict, traffic: float) -> str:
-    """Generate cache key for fare calculations."""
-    return f"fare:{origin['lat']:.4f}:{origin['lng']:.4f}:{destination['lat']:.4f}:{destination['lng']:.4f}:{traffic:.1f}"
+def generate_fare_key(origin: dict, destination: dict, traffic: float, surge: float = 1.0) -> str:
+    """Generate cache key for fare calculations (traffic and surge kept apart so their products don't collide)."""
+    return (f"fare:{origin['lat']:.4f}:{origin['lng']:.4f}:{destination['lat']:.4f}:{destination['lng']:.4f}"
+            f":{traffic:.1f}:{surge:.1f}")
 
 
 def generate_eta_key(origin: dict, destination: dict, traffic: float) -> str:
@@ -0,0 +1,133 @@
+"""
+Chunked result storage for long-running bulk jobs.
+Results are appended to a Redis stream per job so callers can page through
+them with cursors while the job is still running.
+"""
+import json
+from typing import Optional, List, Dict, Any
+from app.utils.redis_client import get_redis, KEY_PREFIX
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _results_key(job_id: str) -> str:
+    return f"{KEY_PREFIX}jobs:{job_id}:results"
+
+
+def _meta_key(job_id: str) -> str:
+    return f"{KEY_PREFIX}jobs:{job_id}:meta"
+
+
+def _next_id(stream_id: str) -> str:
+    """Smallest stream ID strictly greater than stream_id."""
+    ms, _, seq = stream_id.partition("-")
+    return f"{ms}-{int(seq or 0) + 1}"
+
+
+def append_results(job_id: str, results: List[Dict[str, Any]]) -> bool:
+    """
+    Append a chunk of results to the job's result stream.
+
+    Args:
+        job_id: Job (task) ID
+        results: Result rows to append
+
+    Returns:
+        True if stored, False if the store is unavailable
+    """
+    if not job_id:
+        return False
+    try:
+        client = get_redis()
+        if client:
+            key = _results_key(job_id)
+            pipe = client.pipeline(transaction=False)
+            for row in results:
+                pipe.xadd(key, {"r": json.dumps(row)})
+            pipe.hset(_meta_key(job_id), "status", "running")
+            pipe.hincrby(_meta_key(job_id), "stored", len(results))
+            pipe.expire(key, settings.bulk_result_ttl)
+            pipe.expire(_meta_key(job_id), settings.bulk_result_ttl)
+            pipe.execute()
+            return True
+    except Exception as e:
+        logger.warning(f"Result store append failed for {job_id}: {e}")
+    return False
+
+
+def mark_complete(job_id: str, total: int, status: str = "completed") -> bool:
+    """
+    Mark a job's result stream as complete.
+
+    Args:
+        job_id: Job (task) ID
+        total: Total number of result rows written
+        status: Final job status
+
+    Returns:
+        True if recorded, False if the store is unavailable
+    """
+    if not job_id:
+        return False
+    try:
+        client = get_redis()
+        if client:
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(_meta_key(job_id), mapping={"status": status, "total": total})
+            pipe.expire(_meta_key(job_id), settings.bulk_result_ttl)
+            pipe.execute()
+            return True
+    except Exception as e:
+        logger.warning(f"Result store finalize failed for {job_id}: {e}")
+    return False
+
+
+def get_job_meta(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get stored metadata for a job.
+
+    Returns:
+        Dictionary with status, stored and (once complete) total, or None
+    """
+    try:
+        client = get_redis()
+        if client:
+            meta = client.hgetall(_meta_key(job_id))
+            if meta:
+                return {
+                    "status": meta.get("status"),
+                    "stored": int(meta.get("stored", 0)),
+                    "total": int(meta["total"]) if "total" in meta else None
+                }
+    except Exception as e:
+        logger.warning(f"Result store meta lookup failed for {job_id}: {e}")
+    return None
+
+
+def read_results(job_id: str, cursor: Optional[str] = None, limit: int = 1000) -> Dict[str, Any]:
+    """
+    Read a page of results after a cursor.
+
+    Args:
+        job_id: Job (task) ID
+        cursor: Cursor returned by a previous page (None to start from the beginning)
+        limit: Maximum rows to return
+
+    Returns:
+        Dictionary with items, next_cursor (unchanged when no new rows are
+        available yet) and job metadata
+    """
+    client = get_redis()
+    if client is None:
+        raise RuntimeError("Result store unavailable")
+
+    start = _next_id(cursor) if cursor else "-"
+    entries = client.xrange(_results_key(job_id), min=start, max="+", count=limit)
+
+    return {
+        "items": [json.loads(fields["r"]) for _, fields in entries],
+        "next_cursor": entries[-1][0] if entries else cursor,
+        "meta": get_job_meta(job_id)
+    }
@@ -0,0 +1,431 @@
+"""
+Asyncio RabbitMQ consumer framework for RapidRide FastAPI services.
+Runs on pika's asyncio adapter with configurable prefetch, concurrent and
+batched handler execution, coalesced acks and graceful drain on shutdown.
+"""
+import asyncio
+import collections
+import json
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+from app.utils.rmq import _resolve_url
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class Message:
+    """A delivered message handed to consumer handlers"""
+    queue: str
+    body: bytes
+    delivery_tag: int
+    redelivered: bool
+    properties: Any = None
+    received_at: float = field(default_factory=time.monotonic)
+
+    def json(self) -> Any:
+        """Decode the body as JSON."""
+        return json.loads(self.body)
+
+
+# Handlers receive a batch of up to `batch_size` messages
+BatchHandler = Callable[[List[Message]], Awaitable[None]]
+
+
+class _AckTracker:
+    """
+    Coalesces acknowledgements for one channel.
+
+    Completed deliveries are acked with a single multiple-ack covering the
+    longest fully-completed prefix of outstanding delivery tags. Tags that
+    finish out of order wait for the prefix, unless more than `max_blocked`
+    pile up, in which case they are acked individually to avoid stalling
+    the prefetch window.
+    """
+
+    def __init__(self, channel, max_blocked: int):
+        self.channel = channel
+        self.max_blocked = max_blocked
+        self.ack_frames = 0
+        self._outstanding: "collections.OrderedDict[int, None]" = collections.OrderedDict()
+        self._done = set()
+
+    def delivered(self, tag: int):
+        self._outstanding[tag] = None
+
+    @property
+    def outstanding(self) -> int:
+        return len(self._outstanding)
+
+    def ack(self, tags: List[int]):
+        self._done.update(tags)
+
+        last = None
+        while self._outstanding:
+            tag = next(iter(self._outstanding))
+            if tag not in self._done:
+                break
+            self._outstanding.popitem(last=False)
+            self._done.discard(tag)
+            last = tag
+        if last is not None:
+            self.channel.basic_ack(delivery_tag=last, multiple=True)
+            self.ack_frames += 1
+
+        if len(self._done) > self.max_blocked:
+            for tag in sorted(self._done):
+                self.channel.basic_ack(delivery_tag=tag, multiple=False)
+                self._outstanding.pop(tag, None)
+                self.ack_frames += 1
+            self._done.clear()
+
+    def nack(self, tags: List[int], requeue: bool = True):
+        for tag in tags:
+            self.channel.basic_nack(delivery_tag=tag, multiple=False, requeue=requeue)
+            self._outstanding.pop(tag, None)
+        # Nacked tags may have been holding back the ack prefix
+        self.ack([])
+
+
+class _Subscription:
+    """Per-queue consumer state and metrics"""
+
+    def __init__(self, queue: str, handler: BatchHandler, batch_size: int,
+                 batch_timeout: float, concurrency: int, prefetch_count: int, requeue_on_error: bool,
+                 exchange: Optional[str] = None):
+        self.queue = queue
+        self.exchange = exchange
+        self.handler = handler
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.prefetch_count = prefetch_count
+        self.requeue_on_error = requeue_on_error
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        self.channel = None
+        self.tracker: Optional[_AckTracker] = None
+        self.consumer_tag: Optional[str] = None
+        self.buffer: "collections.deque[Message]" = collections.deque()
+        self.buffer_event = asyncio.Event()
+        self.in_flight: set = set()
+        self.batcher: Optional[asyncio.Task] = None
+
+        self.delivered = 0
+        self.acked = 0
+        self.failed = 0
+        self.batches = 0
+        self.queue_depth: Optional[int] = None
+        self.last_handler_latency_s: Optional[float] = None
+
+    def metrics(self) -> Dict[str, Any]:
+        oldest = self.buffer[0].received_at if self.buffer else None
+        return {
+            "delivered": self.delivered,
+            "acked": self.acked,
+            "failed": self.failed,
+            "batches": self.batches,
+            "ack_frames": self.tracker.ack_frames if self.tracker else 0,
+            "buffered": len(self.buffer),
+            "in_flight_batches": len(self.in_flight),
+            "unacked": self.tracker.outstanding if self.tracker else 0,
+            "queue_depth": self.queue_depth,
+            "lag_messages": (self.queue_depth or 0) + len(self.buffer),
+            "oldest_buffered_age_s": round(time.monotonic() - oldest, 3) if oldest else 0.0,
+            "last_handler_latency_s": self.last_handler_latency_s,
+        }
+
+
+class AsyncConsumer:
+    """
+    High-throughput asyncio RabbitMQ consumer.
+
+    Each subscribed queue gets its own channel and prefetch window.
+    Deliveries are buffered and passed to the queue's handler in batches
+    of up to `batch_size` messages (or whatever arrived within
+    `batch_timeout`), with up to `concurrency` batches running at once.
+    A batch is acked when its handler returns and nacked if it raises.
+
+    Usage:
+        consumer = AsyncConsumer()
+        consumer.subscribe("ride_events", handle_batch, batch_size=100)
+        await consumer.run()
+    """
+
+    def __init__(self, rabbitmq_url: str = None, prefetch_count: int = None,
+                 metrics_interval_s: float = 10.0):
+        self.url = _resolve_url(rabbitmq_url)
+        self.prefetch_count = prefetch_count or settings.rabbitmq_prefetch_count
+        self.metrics_interval_s = metrics_interval_s
+        self._subscriptions: Dict[str, _Subscription] = {}
+        self._connection: Optional[AsyncioConnection] = None
+        self._closed: Optional[asyncio.Future] = None
+        self._stopping = False
+        self._stopped = asyncio.Event()
+
+    def subscribe(self, queue: str, handler: BatchHandler, batch_size: int = 1,
+                  batch_timeout: float = 0.05, concurrency: int = None,
+                  prefetch_count: int = None, requeue_on_error: bool = True,
+                  exchange: str = None):
+        """
+        Register a batch handler for a queue. Must be called before run().
+
+        Args:
+            queue: Queue name (declared durable, unless `exchange` is given)
+            handler: Coroutine receiving a list of Message objects
+            batch_size: Maximum messages per handler call
+            batch_timeout: Maximum seconds to wait to fill a batch
+            concurrency: Maximum concurrent handler calls for this queue
+            prefetch_count: Unacked message window for this queue
+            requeue_on_error: Requeue messages whose handler raised
+            exchange: Fanout exchange to bind `queue` to. The queue is then
+                exclusive and auto-deleted, so every process subscribing with
+                its own queue name receives every message
+        """
+        prefetch = prefetch_count or self.prefetch_count
+        self._subscriptions[queue] = _Subscription(
+            queue=queue,
+            handler=handler,
+            batch_size=max(1, batch_size),
+            batch_timeout=batch_timeout,
+            concurrency=concurrency or settings.rabbitmq_consumer_concurrency,
+            prefetch_count=max(prefetch, batch_size),
+            requeue_on_error=requeue_on_error,
+            exchange=exchange,
+        )
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-queue consumption and lag metrics."""
+        return {queue: sub.metrics() for queue, sub in self._subscriptions.items()}
+
+    # ----- Lifecycle -----
+
+    async def run(self, install_signal_handlers: bool = False):
+        """
+        Consume until stop() is called, reconnecting on connection loss.
+
+        Args:
+            install_signal_handlers: Stop gracefully on SIGINT/SIGTERM
+        """
+        loop = asyncio.get_running_loop()
+        if install_signal_handlers:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, lambda: asyncio.ensure_future(self.stop()))
+                except NotImplementedError:
+                    pass
+
+        metrics_task = asyncio.create_task(self._poll_queue_depths())
+        backoff = 0.5
+        try:
+            while not self._stopping:
+                try:
+                    await self._connect()
+                    backoff = 0.5
+                    logger.info(f"Consumer started on queues: {', '.join(self._subscriptions)}")
+                    await self._closed
+                except Exception as e:
+                    logger.warning(f"Consumer connection error: {str(e)}")
+                if self._stopping:
+                    break
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+        finally:
+            metrics_task.cancel()
+            self._stopped.set()
+
+    async def stop(self, drain_timeout: float = 30.0):
+        """
+        Stop consuming gracefully.
+
+        Cancels consumers so no new messages arrive, hands buffered messages
+        to their handlers, waits up to drain_timeout for in-flight batches to
+        finish and be acked, then closes the connection. Anything still
+        unacked is redelivered by the broker.
+        """
+        if self._stopping:
+            return
+        self._stopping = True
+        logger.info("Consumer stopping, draining in-flight messages")
+
+        for sub in self._subscriptions.values():
+            if sub.channel is not None and sub.channel.is_open and sub.consumer_tag:
+                sub.channel.basic_cancel(sub.consumer_tag)
+            sub.buffer_event.set()
+
+        # Batchers exit once their buffers are empty; wait for them first so
+        # the final batches they dispatch are included in the drain
+        deadline = time.monotonic() + drain_timeout
+        not_done = set()
+        batchers = [sub.batcher for sub in self._subscriptions.values() if sub.batcher]
+        if batchers:
+            _, not_done = await asyncio.wait(batchers, timeout=drain_timeout)
+        in_flight = [task for sub in self._subscriptions.values() for task in sub.in_flight]
+        if in_flight:
+            _, pending = await asyncio.wait(in_flight, timeout=max(0, deadline - time.monotonic()))
+            not_done |= pending
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            logger.warning(f"Consumer drain timed out with {len(not_done)} tasks pending")
+
+        if self._connection is not None and not (self._connection.is_closing or self._connection.is_closed):
+            self._connection.close()
+        if self._closed is not None and not self._closed.done():
+            self._closed.set_result(None)
+
+    # ----- Connection setup -----
+
+    async def _connect(self):
+        loop = asyncio.get_running_loop()
+        opened = loop.create_future()
+        self._closed = loop.create_future()
+
+        def on_open(connection):
+            if not opened.done():
+                opened.set_result(connection)
+
+        def on_open_error(connection, error):
+            if not opened.done():
+                opened.set_exception(pika.exceptions.AMQPConnectionError(str(error)))
+
+        def on_close(connection, reason):
+            if not self._stopping:
+                logger.warning(f"Consumer connection closed: {str(reason)}")
+            if not self._closed.done():
+                self._closed.set_result(reason)
+
+        self._connection = AsyncioConnection(
+            pika.URLParameters(self.url),
+            on_open_callback=on_open,
+            on_open_error_callback=on_open_error,
+            on_close_callback=on_close,
+            custom_ioloop=loop,
+        )
+        await opened
+
+        for sub in self._subscriptions.values():
+            await self._start_subscription(sub)
+
+    async def _start_subscription(self, sub: _Subscription):
+        channel = await self._call(self._connection.channel, "on_open_callback")
+        await self._call(channel.basic_qos, prefetch_count=sub.prefetch_count)
+        if sub.exchange:
+            await self._call(channel.exchange_declare, exchange=sub.exchange,
+                             exchange_type="fanout", durable=True)
+            await self._call(channel.queue_declare, queue=sub.queue, exclusive=True, auto_delete=True)
+            await self._call(channel.queue_bind, queue=sub.queue, exchange=sub.exchange)
+        else:
+            await self._call(channel.queue_declare, queue=sub.queue, durable=True)
+
+        sub.channel = channel
+        # Tags from a previous channel are meaningless now; the broker
+        # redelivers anything that was not acked
+        sub.tracker = _AckTracker(channel, max_blocked=max(1, sub.prefetch_count // 2))
+        sub.buffer.clear()
+        sub.consumer_tag = channel.basic_consume(
+            queue=sub.queue,
+            on_message_callback=lambda ch, method, props, body, s=sub: self._on_message(s, method, props, body),
+        )
+        if sub.batcher is None or sub.batcher.done():
+            sub.batcher = asyncio.create_task(self._batch_loop(sub))
+
+    @staticmethod
+    async def _call(fn, callback_name: str = "callback", **kwargs):
+        """Await a pika callback-style method."""
+        future = asyncio.get_running_loop().create_future()
+        kwargs[callback_name] = lambda result: future.done() or future.set_result(result)
+        fn(**kwargs)
+        return await future
+
+    # ----- Delivery and dispatch -----
+
+    def _on_message(self, sub: _Subscription, method, properties, body):
+        sub.tracker.delivered(method.delivery_tag)
+        sub.buffer.append(Message(
+            queue=sub.queue,
+            body=body,
+            delivery_tag=method.delivery_tag,
+            redelivered=method.redelivered,
+            properties=properties,
+        ))
+        sub.delivered += 1
+        if len(sub.buffer) >= sub.batch_size or len(sub.buffer) == 1:
+            sub.buffer_event.set()
+
+    async def _batch_loop(self, sub: _Subscription):
+        while True:
+            if not sub.buffer:
+                if self._stopping:
+                    return
+                sub.buffer_event.clear()
+                await sub.buffer_event.wait()
+                continue
+
+            # Give the batch a chance to fill up
+            if len(sub.buffer) < sub.batch_size and not self._stopping:
+                deadline = sub.buffer[0].received_at + sub.batch_timeout
+                while len(sub.buffer) < sub.batch_size and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    sub.buffer_event.clear()
+                    try:
+                        await asyncio.wait_for(sub.buffer_event.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+            await sub.semaphore.acquire()
+            batch = [sub.buffer.popleft() for _ in range(min(sub.batch_size, len(sub.buffer)))]
+            if not batch:
+                sub.semaphore.release()
+                continue
+            task = asyncio.create_task(self._run_handler(sub, sub.tracker, batch))
+            sub.in_flight.add(task)
+            task.add_done_callback(sub.in_flight.discard)
+
+    async def _run_handler(self, sub: _Subscription, tracker: _AckTracker, batch: List[Message]):
+        tags = [message.delivery_tag for message in batch]
+        start = time.perf_counter()
+        try:
+            await sub.handler(batch)
+            ok = True
+        except Exception as e:
+            logger.error(f"Handler for queue '{sub.queue}' failed on {len(batch)} messages: {str(e)}")
+            ok = False
+        finally:
+            sub.semaphore.release()
+
+        sub.batches += 1
+        sub.last_handler_latency_s = round(time.perf_counter() - start, 4)
+
+        # Acks are only valid on the channel the messages arrived on
+        if tracker is not sub.tracker or not tracker.channel.is_open:
+            return
+        if ok:
+            tracker.ack(tags)
+            sub.acked += len(tags)
+        else:
+            tracker.nack(tags, requeue=sub.requeue_on_error)
+            sub.failed += len(tags)
+
+    async def _poll_queue_depths(self):
+        """Periodically sample broker-side queue depth for lag metrics."""
+        while True:
+            await asyncio.sleep(self.metrics_interval_s)
+            for sub in self._subscriptions.values():
+                channel = sub.channel
+                if channel is None or not channel.is_open:
+                    continue
+                try:
+                    frame = await asyncio.wait_for(
+                        self._call(channel.queue_declare, queue=sub.queue, passive=True), 5
+                    )
+                    sub.queue_depth = frame.method.message_count
+                except Exception as e:
+                    logger.debug(f"Queue depth probe failed for '{sub.queue}': {e}")
@@ -0,0 +1,224 @@
+"""
+Append-only columnar segment store for training data.
+Rows are buffered in memory and written as fixed-size .npz segments (one
+array per column) listed in an atomically-replaced manifest. Small
+segments produced by time-based flushes are merged by compaction.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = "MANIFEST.json"
+
+# Unreferenced segment files are only deleted after this grace period so
+# readers that loaded the previous manifest can finish
+DELETE_GRACE_S = 300.0
+
+
+class SegmentStore:
+    """
+    Append-only dataset of fixed-size columnar segments.
+
+    Not safe for multiple writer processes; run one ingest writer per
+    directory. Readers only need the manifest and may run anywhere.
+    """
+
+    def __init__(self, root: str, columns: List[str], segment_rows: int = 10000):
+        self.root = root
+        self.columns = list(columns)
+        self.segment_rows = segment_rows
+        self._buffer: Dict[str, list] = {col: [] for col in self.columns}
+        self._buffered = 0
+        self._seq = 0
+        # Guards manifest read-modify-write between flushes and compaction
+        self._manifest_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    # ----- Manifest -----
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def read_manifest(self) -> List[Dict]:
+        """List live segments as {"file", "rows"} entries in write order."""
+        return read_manifest(self.root)
+
+    def _write_manifest(self, segments: List[Dict]):
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"segments": segments, "columns": self.columns}, f)
+        os.replace(tmp, self._manifest_path())
+
+    # ----- Writing -----
+
+    @property
+    def buffered_rows(self) -> int:
+        return self._buffered
+
+    def append(self, rows: List[Dict[str, float]]) -> int:
+        """
+        Buffer rows, writing full segments as they fill up.
+
+        Returns:
+            Number of segments written
+        """
+        for row in rows:
+            for col in self.columns:
+                self._buffer[col].append(row.get(col, np.nan))
+        self._buffered += len(rows)
+
+        written = 0
+        while self._buffered >= self.segment_rows:
+            self._write_segment(self._take(self.segment_rows))
+            written += 1
+        return written
+
+    def flush(self) -> bool:
+        """Write whatever is buffered as a (possibly short) segment."""
+        if not self._buffered:
+            return False
+        self._write_segment(self._take(self._buffered))
+        return True
+
+    def _take(self, n: int) -> Dict[str, np.ndarray]:
+        arrays = {}
+        for col in self.columns:
+            arrays[col] = np.asarray(self._buffer[col][:n], dtype=np.float64)
+            del self._buffer[col][:n]
+        self._buffered -= n
+        return arrays
+
+    def _segment_name(self) -> str:
+        self._seq += 1
+        return f"seg-{time.time_ns()}-{os.getpid()}-{self._seq:06d}.npz"
+
+    def _save(self, arrays: Dict[str, np.ndarray]) -> str:
+        name = self._segment_name()
+        tmp = os.path.join(self.root, name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.root, name))
+        return name
+
+    def _write_segment(self, arrays: Dict[str, np.ndarray]):
+        rows = len(next(iter(arrays.values())))
+        name = self._save(arrays)
+        with self._manifest_lock:
+            segments = self.read_manifest()
+            segments.append({"file": name, "rows": rows})
+            self._write_manifest(segments)
+        logger.info(f"Wrote segment {name} ({rows} rows)")
+
+    # ----- Compaction -----
+
+    def compact(self) -> int:
+        """
+        Merge runs of undersized segments into full-size segments.
+
+        Safe to run in a background thread while the writer appends.
+
+        Returns:
+            Number of input segments merged away
+        """
+        segments = self.read_manifest()
+        small = [s for s in segments if s["rows"] < self.segment_rows]
+        merged_away = 0
+
+        if len(small) >= 2:
+            groups, current, current_rows = [], [], 0
+            for seg in small:
+                current.append(seg)
+                current_rows += seg["rows"]
+                if current_rows >= self.segment_rows:
+                    groups.append(current)
+                    current, current_rows = [], 0
+            if len(current) >= 2:
+                groups.append(current)
+
+            for group in groups:
+                parts = [_load_segment(os.path.join(self.root, seg["file"])) for seg in group]
+                arrays = {col: np.concatenate([p[col] for p in parts]) for col in self.columns}
+                name = self._save(arrays)
+                inputs = {seg["file"] for seg in group}
+
+                with self._manifest_lock:
+                    current_segments = self.read_manifest()
+                    # Keep the merged segment where its first input was
+                    rebuilt, inserted = [], False
+                    for seg in current_segments:
+                        if seg["file"] in inputs:
+                            if not inserted:
+                                rebuilt.append({"file": name, "rows": len(arrays[self.columns[0]])})
+                                inserted = True
+                            continue
+                        rebuilt.append(seg)
+                    self._write_manifest(rebuilt)
+
+                merged_away += len(group)
+                logger.info(f"Compacted {len(group)} segments into {name}")
+
+        self._delete_unreferenced()
+        return merged_away
+
+    def _delete_unreferenced(self):
+        live = {seg["file"] for seg in self.read_manifest()}
+        now = time.time()
+        for name in os.listdir(self.root):
+            if not name.startswith("seg-") or name in live:
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) > DELETE_GRACE_S:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def _load_segment(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def read_manifest(root: str) -> List[Dict]:
+    """List live segments of a segment directory."""
+    try:
+        with open(os.path.join(root, MANIFEST_FILE)) as f:
+            return json.load(f)["segments"]
+    except FileNotFoundError:
+        return []
+
+
+def is_segment_dir(path: str) -> bool:
+    """Check whether a path is a segment store directory."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+def load_segments(root: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load all live segments of a segment directory into a DataFrame.
+
+    Args:
+        root: Segment directory
+        columns: Optional subset of columns to load
+
+    Returns:
+        DataFrame with one row per ingested record, in write order
+    """
+    parts = []
+    for seg in read_manifest(root):
+        with np.load(os.path.join(root, seg["file"])) as data:
+            keys = columns or data.files
+            parts.append({key: data[key] for key in keys})
+
+    if not parts:
+        return pd.DataFrame(columns=columns or [])
+    return pd.DataFrame({key: np.concatenate([p[key] for p in parts]) for key in parts[0]})
@@ -0,0 +1,71 @@
+"""
+Cross-process single-flight registry backed by Redis.
+Lets identical work be claimed by one job at a time; duplicates attach to
+the owner's job ID instead of starting new work.
+"""
+from typing import Optional
+from app.utils.redis_client import get_redis, KEY_PREFIX
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Delete the claim only if it is still owned by the caller
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _inflight_key(key: str) -> str:
+    return f"{KEY_PREFIX}inflight:{key}"
+
+
+def claim(key: str, owner_id: str, ttl: int) -> Optional[str]:
+    """
+    Claim a unit of work.
+
+    Args:
+        key: Work key (e.g. the result cache key)
+        owner_id: ID of the job that will do the work
+        ttl: Claim lifetime in seconds
+
+    Returns:
+        None if the claim was acquired (or Redis is unavailable), otherwise
+        the ID of the job that already owns it
+    """
+    try:
+        client = get_redis()
+        if client:
+            full_key = _inflight_key(key)
+            if client.set(full_key, owner_id, nx=True, ex=ttl):
+                return None
+            existing = client.get(full_key)
+            if existing:
+                return existing
+            # Claim expired between SET and GET; try once more
+            return None if client.set(full_key, owner_id, nx=True, ex=ttl) else client.get(full_key)
+    except Exception as e:
+        logger.warning(f"Single-flight claim error: {e}")
+    return None
+
+
+def release(key: str, owner_id: str) -> bool:
+    """
+    Release a claim held by owner_id.
+
+    Args:
+        key: Work key
+        owner_id: ID of the job that holds the claim
+
+    Returns:
+        True if the claim was released
+    """
+    try:
+        client = get_redis()
+        if client:
+            return bool(client.eval(_RELEASE_SCRIPT, 1, _inflight_key(key), owner_id))
+    except Exception as e:
+        logger.warning(f"Single-flight release error: {e}")
+    return False
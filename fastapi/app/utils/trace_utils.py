@@ -0,0 +1,178 @@
+"""
+GPS trace processing for metered fares.
+Vectorized over numpy arrays of (timestamp, lat, lng) so traces of tens of
+thousands of points are handled in milliseconds.
+"""
+from typing import Tuple
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+# Douglas-Peucker runs within windows of this many points, which bounds the
+# recursion depth on long traces at the cost of a few extra kept points
+SIMPLIFY_CHUNK = 64
+
+
+def haversine_m(lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    """Element-wise great-circle distance in metres between two sets of points."""
+    lat1, lng1, lat2, lng2 = np.radians(lat1), np.radians(lng1), np.radians(lat2), np.radians(lng2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def segment_lengths_m(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """
+    Haversine length of each consecutive segment of a trace.
+
+    Args:
+        lat: Latitudes in degrees
+        lng: Longitudes in degrees
+
+    Returns:
+        Array of n-1 distances in metres
+    """
+    return haversine_m(lat[:-1], lng[:-1], lat[1:], lng[1:])
+
+
+def clean_trace(t: np.ndarray, lat: np.ndarray, lng: np.ndarray,
+                max_speed_kmh: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Drop invalid and jittered fixes.
+
+    Points are ordered by time, duplicate timestamps and out-of-range
+    coordinates are removed, and isolated spikes (a fix reached and left at
+    an impossible speed) are dropped. Spike removal runs a few passes so
+    short bursts of bad fixes are removed too.
+
+    Args:
+        t: Unix timestamps in seconds
+        lat: Latitudes
+        lng: Longitudes
+        max_speed_kmh: Fastest plausible speed between fixes
+
+    Returns:
+        Cleaned (t, lat, lng)
+    """
+    valid = np.isfinite(t) & np.isfinite(lat) & np.isfinite(lng) \
+        & (np.abs(lat) <= 90) & (np.abs(lng) <= 180)
+    t, lat, lng = t[valid], lat[valid], lng[valid]
+
+    order = np.argsort(t, kind="stable")
+    t, lat, lng = t[order], lat[order], lng[order]
+    if len(t) > 1:
+        keep = np.ones(len(t), dtype=bool)
+        keep[1:] = np.diff(t) > 0
+        t, lat, lng = t[keep], lat[keep], lng[keep]
+
+    max_speed = max_speed_kmh / 3.6
+    for _ in range(3):
+        if len(t) < 3:
+            break
+        too_fast = segment_lengths_m(lat, lng) / np.diff(t) > max_speed
+        spike = np.zeros(len(t), dtype=bool)
+        spike[1:-1] = too_fast[:-1] & too_fast[1:]
+        # An impossible first or last jump is the endpoint's fault
+        spike[0] = too_fast[0] and not too_fast[1]
+        spike[-1] = too_fast[-1] and not too_fast[-2]
+        if not spike.any():
+            break
+        t, lat, lng = t[~spike], lat[~spike], lng[~spike]
+
+    return t, lat, lng
+
+
+def simplify(lat: np.ndarray, lng: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification.
+
+    Every `SIMPLIFY_CHUNK`-th point is kept as a seed, then the recursion
+    runs level by level: each round measures every unresolved point against
+    its current segment at once and splits all segments whose farthest point
+    exceeds the tolerance, so the Python loop runs once per recursion level
+    rather than once per kept point. Distances are measured on a local
+    equirectangular projection, accurate to well under a metre at city scale.
+
+    Args:
+        lat: Latitudes
+        lng: Longitudes
+        tolerance_m: Maximum deviation of dropped points from the simplified line
+
+    Returns:
+        Boolean mask of points to keep (endpoints always kept)
+    """
+    n = len(lat)
+    keep = np.zeros(n, dtype=bool)
+    if n < 3 or tolerance_m <= 0:
+        keep[:] = True
+        return keep
+    keep[::SIMPLIFY_CHUNK] = True
+    keep[-1] = True
+
+    m_per_deg = np.pi * EARTH_RADIUS_M / 180
+    y = (lat - lat[0]) * m_per_deg
+    x = (lng - lng[0]) * m_per_deg * np.cos(np.radians(lat.mean()))
+    settled = keep.copy()
+
+    while True:
+        active = np.flatnonzero(~settled)
+        if not len(active):
+            break
+        # Every unresolved point lies in segment j, between kept[j - 1] and kept[j]
+        kept = np.flatnonzero(keep)
+        segment = np.cumsum(keep)[active]
+        seg_x, seg_y = x[kept], y[kept]
+        seg_dx, seg_dy = np.diff(seg_x), np.diff(seg_y)
+        seg_norm = np.hypot(seg_dx, seg_dy)
+        closed = seg_norm == 0
+        seg_norm[closed] = 1.0
+
+        previous = segment - 1
+        px, py = x[active] - seg_x[previous], y[active] - seg_y[previous]
+        deviation = np.abs(px * (seg_dy / seg_norm)[previous] - py * (seg_dx / seg_norm)[previous])
+        if closed.any():
+            # Segment starts and ends at the same spot: distance from that spot
+            loop = closed[previous]
+            deviation[loop] = np.hypot(px[loop], py[loop])
+
+        first_of_segment = np.flatnonzero(np.r_[True, segment[1:] != segment[:-1]])
+        segment_max = np.maximum.reduceat(deviation, first_of_segment)
+        point_max = np.repeat(segment_max, np.diff(np.r_[first_of_segment, len(active)]))
+
+        # Split each segment at its farthest point (the first on ties);
+        # points in segments within tolerance are final
+        farthest = np.flatnonzero((deviation == point_max) & (point_max > tolerance_m))
+        if len(farthest):
+            farthest = farthest[np.r_[True, np.diff(segment[farthest]) != 0]]
+        settled[active[point_max <= tolerance_m]] = True
+        keep[active[farthest]] = True
+        settled[active[farthest]] = True
+    return keep
+
+
+def waiting_time_s(t: np.ndarray, lat: np.ndarray, lng: np.ndarray,
+                   speed_threshold_kmh: float, window_s: float = 20.0) -> float:
+    """
+    Total time spent moving slower than `speed_threshold_kmh`.
+
+    Each segment's speed is taken from the displacement over the following
+    `window_s` seconds rather than between consecutive fixes, so a few
+    metres of jitter while stationary does not read as movement.
+
+    Args:
+        t: Unix timestamps in seconds (strictly increasing)
+        lat: Latitudes
+        lng: Longitudes
+        speed_threshold_kmh: Speed below which the vehicle counts as waiting
+        window_s: Speed averaging window
+
+    Returns:
+        Waiting time in seconds
+    """
+    if len(t) < 2:
+        return 0.0
+    start = np.arange(len(t) - 1)
+    end = np.maximum(np.searchsorted(t, t[:-1] + window_s), start + 1)
+    end = np.minimum(end, len(t) - 1)
+    speed = haversine_m(lat[start], lng[start], lat[end], lng[end]) / (t[end] - t[start])
+    dt = np.diff(t)
+    return float(dt[speed < speed_threshold_kmh / 3.6].sum())
@@ -0,0 +1,85 @@
+"""
+Benchmark the driver index: location update throughput through the feed
+handler (JSON decode included) and k-nearest / radius query latency with
+a city-sized fleet online.
+
+Usage:
+    python benchmarks/bench_driver_index.py [n_drivers] [n_updates] [n_queries]
+"""
+
+import sys
+import os
+import time
+import json
+import asyncio
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from app.services.driver_index import DriverIndex, DriverLocationFeed
+from app.utils.rmq_consumer import Message
+
+BATCH = 500
+
+
+def _messages(bodies):
+    return [Message(queue="bench", body=json.dumps(body).encode(), delivery_tag=i, redelivered=False)
+            for i, body in enumerate(bodies)]
+
+
+def _percentiles(samples):
+    samples = np.array(samples) * 1e6
+    return f"p50 {np.percentile(samples, 50):.0f} us, p99 {np.percentile(samples, 99):.0f} us"
+
+
+async def main(n_drivers: int, n_updates: int, n_queries: int):
+    rng = np.random.default_rng(0)
+    now = time.time()
+    index = DriverIndex()
+    feed = DriverLocationFeed(index)
+
+    lat = 12.7 + rng.random(n_drivers) * 0.6
+    lng = 77.3 + rng.random(n_drivers) * 0.6
+    vehicles = rng.choice(["bike", "auto", "car", "suv"], n_drivers)
+    start = time.perf_counter()
+    for i in range(n_drivers):
+        index.update(f"d{i}", lat[i], lng[i], vehicles[i], ts=now)
+    print(f"load:     {n_drivers:,} drivers in {time.perf_counter() - start:.2f} s")
+
+    ids = rng.integers(n_drivers, size=n_updates)
+    moved_lat = lat[ids] + rng.normal(0, 0.001, n_updates)
+    moved_lng = lng[ids] + rng.normal(0, 0.001, n_updates)
+    updates = _messages(
+        {"driver_id": f"d{d}", "location": {"lat": a, "lng": b}, "status": "online", "timestamp": now}
+        for d, a, b in zip(ids, moved_lat, moved_lng)
+    )
+    start = time.perf_counter()
+    for i in range(0, n_updates, BATCH):
+        await feed.handle(updates[i:i + BATCH])
+    elapsed = time.perf_counter() - start
+    print(f"updates:  {n_updates / elapsed:,.0f} events/s")
+
+    q_lat = 12.75 + rng.random(n_queries) * 0.5
+    q_lng = 77.35 + rng.random(n_queries) * 0.5
+    for label, query in (
+        ("knn k=10", lambda a, b: index.nearest(a, b, k=10)),
+        ("knn car", lambda a, b: index.nearest(a, b, k=5, vehicle_type="car")),
+        ("1 km", lambda a, b: index.within(a, b, radius_km=1.0)),
+    ):
+        samples = []
+        for a, b in zip(q_lat, q_lng):
+            start = time.perf_counter()
+            query(a, b)
+            samples.append(time.perf_counter() - start)
+        print(f"{label:9} {_percentiles(samples)}")
+
+    start = time.perf_counter()
+    index.expire(now=now + 1)
+    print(f"sweep:    {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    n_drivers = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_updates = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    n_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    asyncio.run(main(n_drivers, n_updates, n_queries))
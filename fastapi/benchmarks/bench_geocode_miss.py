@@ -0,0 +1,87 @@
+"""
+Benchmark the reverse-geocode cache-miss path against a local stub geocoder:
+a new aiohttp session per request (the old reverse_geocode behaviour) vs
+the shared pooled HttpClient.
+
+Usage:
+    python benchmarks/bench_geocode_miss.py [n_requests] [concurrency]
+"""
+
+import sys
+import os
+import time
+import asyncio
+import statistics
+import aiohttp
+from aiohttp import web
+
+sys.path.append(os.getcwd())
+
+from app.utils.http_client import HttpClient
+
+STUB_LATENCY_S = 0.002
+
+
+async def _stub_reverse(request):
+    await asyncio.sleep(STUB_LATENCY_S)
+    return web.json_response({
+        "display_name": f"Stub, {request.query['lat']}, {request.query['lon']}",
+        "address": {"city": "Bengaluru", "state": "Karnataka", "country": "India", "postcode": "560001"}
+    })
+
+
+async def start_stub():
+    app = web.Application()
+    app.router.add_get("/reverse", _stub_reverse)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/reverse"
+
+
+def _params(i):
+    return {"lat": 12.9 + i * 1e-4, "lon": 77.5, "format": "json", "addressdetails": 1}
+
+
+async def fetch_per_session(url, i):
+    """Old behaviour: open and tear down a session for every miss."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, params=_params(i)) as response:
+            return await response.json()
+
+
+async def run(label, fetch, n, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:>12}: {n / elapsed:,.0f} req/s, p50 {statistics.median(latencies):.2f}ms, p99 {p99:.2f}ms")
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    runner, url = await start_stub()
+    client = HttpClient(pool_size=concurrency, pool_size_per_host=concurrency)
+    try:
+        await run("per-session", lambda i: fetch_per_session(url, i), n, concurrency)
+        await run("shared pool", lambda i: client.get_json(url, params=_params(i)), n, concurrency)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""
+Benchmark geofence lookups against a city-sized service area polygon:
+index build time, single-point and batch lookup latency through the grid
+index, and the naive point-in-polygon test for comparison.
+
+Usage:
+    python benchmarks/bench_geofence.py [n_vertices] [n_points]
+"""
+
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from app.services.geofence import GeofenceIndex, points_in_rings
+
+
+def _city(n_vertices: int, rng) -> list:
+    # Wobbly ring of ~30 km radius around Bangalore
+    angles = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+    radius = 0.3 + 0.03 * np.sin(angles * 7) + 0.005 * rng.standard_normal(n_vertices)
+    ring = np.column_stack([77.59 + radius * np.cos(angles), 12.97 + radius * np.sin(angles)])
+    return {"type": "Feature", "properties": {"id": "city", "kind": "service_area"},
+            "geometry": {"type": "Polygon", "coordinates": [ring.tolist()]}}
+
+
+def _airport() -> dict:
+    box = [[77.675, 13.18], [77.725, 13.18], [77.725, 13.225], [77.675, 13.225], [77.675, 13.18]]
+    return {"type": "Feature", "properties": {"id": "airport", "kind": "airport"},
+            "geometry": {"type": "Polygon", "coordinates": [box]}}
+
+
+def main(n_vertices: int, n_points: int):
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    index = GeofenceIndex([_city(n_vertices, rng), _airport()])
+    print(f"build:    {time.perf_counter() - start:.2f} s {index.stats()}")
+
+    lat = 12.6 + rng.random(n_points) * 0.7
+    lng = 77.2 + rng.random(n_points) * 0.7
+
+    start = time.perf_counter()
+    results = index.fences_at_many(lat, lng)
+    print(f"batch:    {(time.perf_counter() - start) / n_points * 1e6:.1f} us/point")
+
+    n_single = min(n_points, 10000)
+    start = time.perf_counter()
+    for a, b in zip(lat[:n_single].tolist(), lng[:n_single].tolist()):
+        index.fences_at(a, b)
+    print(f"single:   {(time.perf_counter() - start) / n_single * 1e6:.1f} us/point")
+
+    start = time.perf_counter()
+    for a, b in zip(lat[:1000], lng[:1000]):
+        points_in_rings(np.array([a]), np.array([b]), index.rings[0])
+    print(f"naive:    {(time.perf_counter() - start) / 1000 * 1e6:.1f} us/point")
+
+    expected = points_in_rings(lat, lng, index.rings[0])
+    agree = np.array_equal(expected, np.array([0 in hits for hits in results]))
+    print(f"agrees with brute force: {agree}")
+
+
+if __name__ == "__main__":
+    n_vertices = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    n_points = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    main(n_vertices, n_points)
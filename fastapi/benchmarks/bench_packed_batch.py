@@ -0,0 +1,91 @@
+"""
+Benchmark the packed binary batch endpoint against the JSON endpoints the
+Node backend uses today, over HTTP against a running server: bytes on the
+wire (request + response bodies) and wall time per fare+ETA estimate.
+
+Compared:
+    json:        one /fare/calc and one /predict/eta request per trip
+    json batch:  /fare/quote/batch, then /predict/eta per trip
+    packed:      one /batch/packed frame with OP_FARE | OP_ETA per trip
+
+Usage:
+    uvicorn app.main:app --port 8001 &
+    python benchmarks/bench_packed_batch.py [base_url] [n_trips]
+"""
+
+import sys
+import os
+import time
+import json
+import numpy as np
+import requests
+
+sys.path.append(os.getcwd())
+
+from app.services.packed_batch import MEDIA_TYPE, OP_ETA, OP_FARE, encode_queries, decode_results
+
+
+def _trips(n: int):
+    rng = np.random.default_rng(0)
+    points = np.column_stack([12.85 + rng.random((n, 2)) * 0.25, 77.5 + rng.random((n, 2)) * 0.25])
+    return [
+        {"origin": {"lat": round(a, 6), "lng": round(c, 6)}, "destination": {"lat": round(b, 6), "lng": round(d, 6)},
+         "traffic_level": 1.2}
+        for a, b, c, d in points.tolist()
+    ]
+
+
+def _report(label: str, n: int, elapsed: float, sent: int, received: int, requests_made: int):
+    print(f"{label:11} {elapsed / n * 1e3:8.3f} ms/trip  {(sent + received) / n:7.1f} body bytes/trip "
+          f"({sent:,} sent, {received:,} received, {requests_made:,} requests)")
+
+
+def main(base_url: str, n: int):
+    session = requests.Session()
+    trips = _trips(n)
+    timestamp = time.time()
+    iso = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(timestamp))
+
+    # Per-trip JSON, as the backend sends today
+    sent = received = 0
+    start = time.perf_counter()
+    for trip in trips:
+        body = json.dumps({**trip, "timestamp": iso}).encode()
+        for path in ("/fare/calc", "/predict/eta"):
+            response = session.post(base_url + path, data=body, headers={"Content-Type": "application/json"})
+            response.raise_for_status()
+            sent += len(body)
+            received += len(response.content)
+    _report("json", n, time.perf_counter() - start, sent, received, 2 * n)
+
+    # JSON batch quotes plus per-trip ETAs (there is no JSON batch ETA route)
+    sent = received = 0
+    start = time.perf_counter()
+    for i in range(0, n, 1000):
+        chunk = json.dumps({"quotes": [{**trip, "timestamp": iso} for trip in trips[i:i + 1000]]}).encode()
+        response = session.post(base_url + "/fare/quote/batch", data=chunk, headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+        sent += len(chunk)
+        received += len(response.content)
+    for trip in trips:
+        body = json.dumps({**trip, "timestamp": iso}).encode()
+        response = session.post(base_url + "/predict/eta", data=body, headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+        sent += len(body)
+        received += len(response.content)
+    _report("json batch", n, time.perf_counter() - start, sent, received, (n + 999) // 1000 + n)
+
+    # One packed frame
+    start = time.perf_counter()
+    frame = encode_queries([{**trip, "op": OP_FARE | OP_ETA, "timestamp": timestamp} for trip in trips])
+    response = session.post(base_url + "/batch/packed", data=frame, headers={"Content-Type": MEDIA_TYPE})
+    response.raise_for_status()
+    results = decode_results(response.content, len(response.headers["X-Vehicle-Types"].split(",")))
+    _report("packed", n, time.perf_counter() - start, len(frame), len(response.content), 1)
+    print(f"packed results: {len(results)}, invalid: {int((results['status'] == 2).sum())}")
+
+
+if __name__ == "__main__":
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8001"
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    main(base_url.rstrip("/"), n)
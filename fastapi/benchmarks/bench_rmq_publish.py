@@ -0,0 +1,60 @@
+"""
+Benchmark RabbitMQ publish throughput: one connection per message (the old
+publish_event behaviour) vs the pooled, confirm-batched RabbitPublisher.
+Requires a local broker (see docker/docker-compose.yml).
+
+Usage:
+    python benchmarks/bench_rmq_publish.py [n_messages]
+"""
+
+import sys
+import os
+import time
+import json
+import pika
+
+sys.path.append(os.getcwd())
+
+from app.utils.rmq import RabbitPublisher, _resolve_url
+
+QUEUE = "rapidride.bench"
+
+
+def publish_per_connection(n):
+    """Old behaviour: connect, declare, publish, close for every message."""
+    url = _resolve_url()
+    for i in range(n):
+        connection = pika.BlockingConnection(pika.URLParameters(url))
+        channel = connection.channel()
+        channel.queue_declare(queue=QUEUE, durable=True)
+        channel.basic_publish(exchange='', routing_key=QUEUE, body=json.dumps({"i": i}))
+        connection.close()
+
+
+def publish_pooled(n):
+    publisher = RabbitPublisher()
+    try:
+        # Warm up the connection so we measure steady state
+        publisher.publish(QUEUE, {"warmup": True})
+        start = time.perf_counter()
+        confirmed = publisher.publish_many(QUEUE, [{"i": i} for i in range(n)], timeout=60)
+        return confirmed, time.perf_counter() - start
+    finally:
+        publisher.close()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    legacy_n = min(n, 200)
+    start = time.perf_counter()
+    publish_per_connection(legacy_n)
+    legacy_s = time.perf_counter() - start
+    print(f"per-connection: {legacy_n} msgs in {legacy_s:.2f}s -> {legacy_n / legacy_s:,.0f} msgs/s")
+
+    confirmed, pooled_s = publish_pooled(n)
+    print(f"pooled+confirms: {confirmed}/{n} confirmed in {pooled_s:.2f}s -> {confirmed / pooled_s:,.0f} msgs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark per-request CPU for cache hits on /fare/calc and /predict/eta:
+the pre-encoded fast path against the previous handling (request model
+parameter, request.dict(), cached dict decoded and rebuilt into a response
+model, response_model re-validation and stdlib JSON encoding).
+
+Requests are driven straight through the ASGI app, with an in-process
+dict standing in for Redis and INFO logging off, so the numbers are
+framework and serialization cost only.
+
+Usage:
+    python benchmarks/bench_serialization.py [n_requests]
+"""
+
+import sys
+import os
+import time
+import json
+import asyncio
+import logging
+import warnings
+
+sys.path.append(os.getcwd())
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from app.api import fare, eta
+from app.schemas.request import FareRequest, ETARequest
+from app.schemas.response import FareResponse, ETAResponse
+from app.services.fare_service import compute_fare
+from app.services.eta_service import predict_eta
+from app.utils import redis_client
+
+PAYLOAD = {
+    "origin": {"lat": 12.9716, "lng": 77.5946},
+    "destination": {"lat": 12.9352, "lng": 77.6245},
+    "timestamp": "2025-11-28T10:21:00+05:30",
+    "traffic_level": 1.2,
+}
+
+
+class _MemoryRedis:
+    """Dict-backed stand-in for the Redis calls on the cache path."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value = self.data.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+
+def _app() -> FastAPI:
+    legacy = APIRouter(prefix="/legacy", default_response_class=JSONResponse)
+
+    @legacy.post("/fare", response_model=FareResponse)
+    async def legacy_fare(request: FareRequest):
+        return compute_fare(request.dict())
+
+    @legacy.post("/eta", response_model=ETAResponse)
+    async def legacy_eta(request: ETARequest):
+        return predict_eta(request.dict())
+
+    app = FastAPI()
+    app.include_router(fare.router)
+    app.include_router(eta.router)
+    app.include_router(legacy)
+    return app
+
+
+async def _call(app, path: str, body: bytes) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "server": ("bench", 80), "client": ("bench", 1234),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    chunks = []
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+async def main(n_requests: int):
+    logging.disable(logging.INFO)
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    app = _app()
+    body = json.dumps(PAYLOAD).encode()
+
+    for label, legacy_path, fast_path in (
+        ("fare", "/legacy/fare", "/fare/calc"),
+        ("eta", "/legacy/eta", "/predict/eta"),
+    ):
+        timings = {}
+        for path in (legacy_path, fast_path):
+            # First call fills an empty cache, the rest are hits
+            redis_client._redis_client = _MemoryRedis()
+            response = await _call(app, path, body)
+            start = time.process_time()
+            for _ in range(n_requests):
+                await _call(app, path, body)
+            timings[path] = (time.process_time() - start) / n_requests * 1e6
+            print(f"{label:4} {path:14} {timings[path]:6.1f} us CPU/request  {response.decode()}")
+        print(f"{label:4} cache-hit CPU saved: {1 - timings[fast_path] / timings[legacy_path]:.0%}")
+
+
+if __name__ == "__main__":
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    asyncio.run(main(n_requests))
@@ -0,0 +1,66 @@
+"""
+Benchmark surge engine event throughput: ride requests and driver
+availability events through the consumer handlers (JSON decode included),
+plus the cost of a multiplier tick.
+
+Usage:
+    python benchmarks/bench_surge.py [n_events] [n_drivers]
+"""
+
+import sys
+import os
+import time
+import json
+import asyncio
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from app.services.surge_engine import SurgeConsumer, SurgeEngine
+from app.utils.rmq_consumer import Message
+
+BATCH = 500
+
+
+def _messages(bodies):
+    return [Message(queue="bench", body=json.dumps(body).encode(), delivery_tag=i, redelivered=False)
+            for i, body in enumerate(bodies)]
+
+
+async def main(n_events: int, n_drivers: int):
+    rng = np.random.default_rng(0)
+    lat = 12.7 + rng.random(n_events) * 0.6
+    lng = 77.3 + rng.random(n_events) * 0.6
+    requests = _messages({"pickup": {"lat": a, "lng": b}} for a, b in zip(lat, lng))
+    drivers = _messages(
+        {"driver_id": f"d{rng.integers(n_drivers)}", "location": {"lat": a, "lng": b},
+         "status": "online" if rng.random() < 0.9 else "busy"}
+        for a, b in zip(lat[::-1], lng[::-1])
+    )
+
+    engine = SurgeEngine()
+    handlers = SurgeConsumer(engine)
+
+    start = time.perf_counter()
+    for i in range(0, n_events, BATCH):
+        await handlers.handle_requests(requests[i:i + BATCH])
+    elapsed = time.perf_counter() - start
+    print(f"ride requests:  {n_events / elapsed:,.0f} events/s")
+
+    start = time.perf_counter()
+    for i in range(0, n_events, BATCH):
+        await handlers.handle_drivers(drivers[i:i + BATCH])
+    elapsed = time.perf_counter() - start
+    print(f"driver events:  {n_events / elapsed:,.0f} events/s")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        surging = engine.tick()
+    print(f"tick:           {(time.perf_counter() - start) * 10:.3f} ms "
+          f"({engine.stats()['zones']} zones, {len(surging)} surging)")
+
+
+if __name__ == "__main__":
+    n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    n_drivers = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    asyncio.run(main(n_events, n_drivers))
@@ -21,3 +21,11 @@ def sample_eta_request():
         "timestamp": "2025-11-28T10:21:00+05:30",
         "traffic_level": 1.0
     }
+
+
+@pytest.fixture(autouse=True)
+def no_geo_store(monkeypatch):
+    """Keep tests from writing to the on-disk geocode store"""
+    from app.utils import geo_store
+    monkeypatch.setattr(geo_store, "_geo_store", None)
+    monkeypatch.setattr(geo_store, "_geo_store_checked", True)
@@ -0,0 +1,74 @@
+import pytest
+from app.services.eta_service import predict_eta, predict_eta_batch
+from app.tasks.tasks import ProgressThrottle, bulk_eta_prediction_task, _chunk_requests
+
+
+def _make_requests(n):
+    return [
+        {
+            "id": f"req_{i}",
+            "origin": {"lat": 12.90 + i * 0.001, "lng": 77.55 + i * 0.001},
+            "destination": {"lat": 12.95 - i * 0.001, "lng": 77.62},
+            "timestamp": "2025-11-28T10:21:00+05:30",
+            "traffic_level": 1.0 + (i % 3) * 0.5
+        }
+        for i in range(n)
+    ]
+
+
+class _FakeTask:
+    def __init__(self):
+        self.updates = []
+
+    def update_state(self, state=None, meta=None, **kwargs):
+        self.updates.append((state, meta))
+
+
+def test_batch_matches_single_prediction():
+    """Vectorized batch path should agree with per-request predictions"""
+    requests = _make_requests(10)
+
+    batch = predict_eta_batch(requests)
+    single = [predict_eta(r).model_dump() for r in requests]
+
+    assert batch == single
+
+
+def test_batch_empty():
+    """Empty batch returns empty result"""
+    assert predict_eta_batch([]) == []
+
+
+def test_chunk_requests_offsets():
+    """Chunks cover the input in order with correct offsets"""
+    chunks = _chunk_requests(list(range(25)), 10)
+
+    assert [offset for offset, _ in chunks] == [0, 10, 20]
+    assert [len(chunk) for _, chunk in chunks] == [10, 10, 5]
+
+
+def test_bulk_task_preserves_order(monkeypatch):
+    """Bulk task returns one result per request in input order"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "bulk_eta_chunk_size", 7)
+    monkeypatch.setattr(settings, "bulk_progress_every_rows", 1000)
+    monkeypatch.setattr(settings, "bulk_progress_interval_s", 3600)
+
+    requests = _make_requests(30)
+    result = bulk_eta_prediction_task.run(requests)
+
+    assert result["status"] == "completed"
+    assert result["total_processed"] == 30
+    assert [r["request_id"] for r in result["results"]] == [r["id"] for r in requests]
+
+
+def test_progress_throttle_by_rows():
+    """Progress is only reported when the row threshold is crossed"""
+    task = _FakeTask()
+    progress = ProgressThrottle(task, total=100, every_rows=40, interval_s=3600)
+
+    reported = [progress.update(n) for n in range(10, 101, 10)]
+
+    assert reported.count(True) == 2
+    assert task.updates[0][1]["processed"] == 40
+    assert task.updates[1][1]["processed"] == 80
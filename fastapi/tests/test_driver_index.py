@@ -0,0 +1,96 @@
+import asyncio
+import json
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import driver_index
+from app.services.driver_index import DriverIndex, DriverLocationFeed, nearest_by_eta
+from app.utils.rmq_consumer import Message
+from app.utils.trace_utils import haversine_m
+
+client = TestClient(app)
+
+KORAMANGALA = {"lat": 12.9352, "lng": 77.6245}
+
+
+def _populate(index, n, now, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = 12.85 + rng.random(n) * 0.2
+    lng = 77.55 + rng.random(n) * 0.2
+    vehicles = rng.choice(["bike", "auto", "car"], n)
+    for i in range(n):
+        index.update(f"d{i}", lat[i], lng[i], vehicles[i], ts=now)
+    return lat, lng, vehicles
+
+
+def test_nearest_matches_brute_force():
+    """k-nearest and radius queries agree with a scan over every driver"""
+    index = DriverIndex(capacity=64, cell_deg=0.005, ttl_s=60)
+    lat, lng, vehicles = _populate(index, 2000, now=1000)
+    assert len(index) == 2000
+
+    dist = haversine_m(KORAMANGALA["lat"], KORAMANGALA["lng"], lat, lng) / 1000
+    expected = [f"d{i}" for i in np.argsort(dist, kind="stable")[:10]]
+    found = index.nearest(KORAMANGALA["lat"], KORAMANGALA["lng"], k=10, max_km=20, now=1000)
+    assert [d["driver_id"] for d in found] == expected
+
+    cars = np.flatnonzero(vehicles == "car")
+    expected_cars = [f"d{i}" for i in cars[np.argsort(dist[cars], kind="stable")[:5]]]
+    found = index.nearest(KORAMANGALA["lat"], KORAMANGALA["lng"], k=5, max_km=20, vehicle_type="car", now=1000)
+    assert [d["driver_id"] for d in found] == expected_cars
+
+    within = index.within(KORAMANGALA["lat"], KORAMANGALA["lng"], radius_km=1.5, now=1000)
+    assert {d["driver_id"] for d in within} == {f"d{i}" for i in np.flatnonzero(dist <= 1.5)}
+
+
+def test_moves_removals_and_expiry():
+    """Drivers follow their latest position, go offline and drop out when silent"""
+    index = DriverIndex(capacity=4, cell_deg=0.005, ttl_s=30)
+    index.update("a", 13.05, 77.59, ts=100)
+    index.update("b", KORAMANGALA["lat"], KORAMANGALA["lng"], ts=100)
+    index.update("a", KORAMANGALA["lat"] + 0.001, KORAMANGALA["lng"], ts=120)
+
+    nearest = index.nearest(KORAMANGALA["lat"], KORAMANGALA["lng"], k=5, max_km=2, now=125)
+    assert [d["driver_id"] for d in nearest] == ["b", "a"]
+
+    # "b" is stale at 135; queries skip it before the sweep removes it
+    assert [d["driver_id"] for d in index.nearest(KORAMANGALA["lat"], KORAMANGALA["lng"], max_km=2, now=135)] == ["a"]
+    assert index.expire(now=135) == 1
+    assert len(index) == 1
+
+    feed = DriverLocationFeed(index)
+    message = lambda body: Message(queue="q", body=json.dumps(body).encode(), delivery_tag=1, redelivered=False)
+    asyncio.run(feed.handle([
+        message({"driver_id": "a", "status": "busy"}),
+        message({"driver_id": "c", "location": KORAMANGALA, "vehicle_type": "bike", "timestamp": 140000}),
+        message({"driver_id": "d", "location": {"lat": 95, "lng": 0}}),
+    ]))
+    assert feed.applied == 2 and feed.skipped == 1
+    assert [d["driver_id"] for d in index.nearest(KORAMANGALA["lat"], KORAMANGALA["lng"], now=140)] == ["c"]
+
+
+def test_nearest_by_eta(monkeypatch):
+    """Candidates are re-ranked by predicted pickup ETA in one batch call"""
+    index = DriverIndex(capacity=8, cell_deg=0.005, ttl_s=3600)
+    index.update("close", KORAMANGALA["lat"] + 0.002, KORAMANGALA["lng"])
+    index.update("mid", KORAMANGALA["lat"] + 0.004, KORAMANGALA["lng"])
+    index.update("far", KORAMANGALA["lat"] + 0.008, KORAMANGALA["lng"])
+    calls = []
+
+    def fake_batch(payloads):
+        calls.append(payloads)
+        # "close" is across a one-way; "far" has a clear road
+        return [{"eta_seconds": {0.002: 600, 0.004: 300, 0.008: 120}[round(p["origin"]["lat"] - KORAMANGALA["lat"], 3)],
+                 "confidence": 0.8} for p in payloads]
+
+    monkeypatch.setattr("app.services.eta_service.predict_eta_batch", fake_batch)
+    ranked = nearest_by_eta(index, KORAMANGALA["lat"], KORAMANGALA["lng"], k=2)
+    assert [d["driver_id"] for d in ranked] == ["far", "mid"]
+    assert len(calls) == 1 and len(calls[0]) == 3
+    assert calls[0][0]["destination"] == KORAMANGALA
+
+    monkeypatch.setattr(driver_index, "_driver_index", index)
+    response = client.get("/drivers/nearest", params={**KORAMANGALA, "k": 1, "by": "eta"})
+    assert response.status_code == 200
+    assert response.json()["drivers"][0]["driver_id"] == "far"
+    assert response.json()["online"] == 3
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import pytest
+from app.services import eta_history, eta_service
+from app.services.eta_history import EtaHistory, lookup_historical_eta, publish_snapshot
+from app.services.ride_ingest import RideIngestor, SEGMENT_COLUMNS, parse_ride_completed
+from app.utils.rmq_consumer import Message
+from app.utils.segment_store import SegmentStore
+
+ORIGIN = {"lat": 12.9716, "lng": 77.5946}
+DESTINATION = {"lat": 12.9352, "lng": 77.6245}
+FRIDAY_10AM = "2025-11-28T10:21:00+05:30"
+FRIDAY_10PM = "2025-11-28T22:05:00+05:30"
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def pipeline(self):
+        return self
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def execute(self):
+        pass
+
+    def get(self, key):
+        return self.values.get(key)
+
+
+def _trip(started_at, minutes, distance_km=7.5):
+    return parse_ride_completed({
+        "origin": ORIGIN,
+        "destination": DESTINATION,
+        "started_at": started_at,
+        "actual_duration_s": minutes * 60,
+        "route_distance_km": distance_km,
+    })
+
+
+def test_rolling_aggregates_by_hour_of_week():
+    """Hour cells with enough trips are served; sparse hours use the pair's overall mean"""
+    history = EtaHistory(max_pairs=4, alpha=0.25, min_samples=2)
+    history.record_rows([_trip(FRIDAY_10AM, 30), _trip(FRIDAY_10AM, 20)])
+    history.record_rows([_trip(FRIDAY_10PM, 10)])
+
+    # Mean 10am duration, or the trip's distance at the mean 10am speed (18.75 km/h)
+    assert history.lookup(ORIGIN, DESTINATION, FRIDAY_10AM) == pytest.approx(1500, abs=1)
+    assert history.lookup(ORIGIN, DESTINATION, FRIDAY_10AM, distance_km=3.75) == pytest.approx(720, abs=1)
+    # One 10pm trip is too few; all three trips average 27.5 km/h
+    assert history.lookup(ORIGIN, DESTINATION, FRIDAY_10PM, distance_km=7.5) == pytest.approx(982, abs=1)
+    assert history.lookup(DESTINATION, ORIGIN, FRIDAY_10AM) is None
+
+    # Past 1/alpha trips the mean weights recent trips more
+    for _ in range(6):
+        history.record_rows([_trip(FRIDAY_10AM, 10)])
+    assert history.lookup(ORIGIN, DESTINATION, FRIDAY_10AM) < 800
+
+    history.record_rows([{**_trip(FRIDAY_10AM, 10), "dest_zone_lat": 200 + i} for i in range(5)])
+    assert history.stats()["pairs"] == 4 and history.dropped == 2
+
+
+def test_utc_lookup_reads_the_local_hour_recorded():
+    """A trip recorded at 09:00 IST is found by a lookup for the same instant sent as UTC"""
+    history = EtaHistory(max_pairs=4, alpha=0.25, min_samples=2)
+    monday_9am = "2025-11-24T09:00:00+05:30"
+    history.record_rows([_trip(monday_9am, 30), _trip(monday_9am, 30)])
+    history.record_rows([_trip("2025-11-24T03:30:00+05:30", 10)] * 2)
+
+    assert history.lookup(ORIGIN, DESTINATION, "2025-11-24T03:30:00Z") == pytest.approx(1800, abs=1)
+    assert history.lookup(ORIGIN, DESTINATION, monday_9am) == pytest.approx(1800, abs=1)
+
+
+def test_snapshot_feeds_predictions(monkeypatch):
+    """predict_eta fills historical_mean_eta from the published snapshot"""
+    client = _FakeRedis()
+    monkeypatch.setattr(eta_history, "get_redis", lambda: client)
+    monkeypatch.setattr(eta_history, "_history", None)
+    monkeypatch.setattr(eta_history, "_history_version", None)
+    monkeypatch.setattr(eta_history, "_history_checked_at", None)
+
+    history = EtaHistory()
+    history.record_rows([_trip(FRIDAY_10AM, 20)] * 3)
+    assert publish_snapshot(history)
+
+    features_seen = []
+    monkeypatch.setattr(eta_service, "cache_get", lambda key: None)
+    monkeypatch.setattr(eta_service, "cache_set", lambda key, value, ttl: True)
+    monkeypatch.setattr(eta_service, "get_model", lambda coord=None: object())
+    monkeypatch.setattr("app.models.infer.predict",
+                        lambda model, features: features_seen.append(features) or (1000.0, 0.9))
+
+    result = eta_service.predict_eta({"origin": ORIGIN, "destination": DESTINATION, "timestamp": FRIDAY_10AM})
+    assert result.confidence == 0.9
+    expected = lookup_historical_eta(ORIGIN, DESTINATION, FRIDAY_10AM, features_seen[0]["distance_km"])
+    assert features_seen[0]["historical_mean_eta"] == expected
+    assert expected == pytest.approx(features_seen[0]["distance_km"] / 22.5 * 3600, abs=1)
+
+
+def test_ingestor_updates_history(tmp_path):
+    """Ride-completed events update the table as they are ingested"""
+    history = EtaHistory(min_samples=1)
+    store = SegmentStore(str(tmp_path), SEGMENT_COLUMNS, segment_rows=2)
+    ingestor = RideIngestor(store, max_age_s=60, compact_interval_s=60, history=history)
+    event = {"origin": ORIGIN, "destination": DESTINATION, "started_at": FRIDAY_10AM,
+             "completed_at": "2025-11-28T10:41:00+05:30", "route_distance_km": 7.5}
+    messages = [Message(queue="ride_completed", body=json.dumps(event).encode(), delivery_tag=i,
+                        redelivered=False) for i in range(2)]
+
+    asyncio.run(ingestor.handle(messages))
+
+    assert history.stats()["trips"] == 2
+    assert history.lookup(ORIGIN, DESTINATION, FRIDAY_10AM) == pytest.approx(1200, abs=1)
@@ -0,0 +1,84 @@
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import eta_service, fare_service
+from app.services.fare_service import compute_fare
+from app.utils import redis_client
+
+client = TestClient(app)
+
+PAYLOAD = {
+    "origin": {"lat": 12.9716, "lng": 77.5946},
+    "destination": {"lat": 12.9352, "lng": 77.6245},
+    "timestamp": "2025-11-28T10:21:00+05:30",
+    "traffic_level": 1.0
+}
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value = self.data.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+
+def test_fare_cache_hit_returns_stored_body_verbatim(monkeypatch):
+    """A cached fare body is sent byte for byte, without recomputing it"""
+    stored = '{"fare": 99.5, "distance_km": 5.0, "currency": "INR"}'
+    monkeypatch.setattr(fare_service, "cache_get_raw", lambda key: stored)
+    monkeypatch.setattr(fare_service, "_calculate_fare", lambda *args: (_ for _ in ()).throw(AssertionError))
+
+    response = client.post("/fare/calc", json=PAYLOAD)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.text == stored
+
+
+def test_miss_caches_encoded_body_readable_by_both_paths(monkeypatch):
+    """The fast path caches the encoded body; compute_fare and batch readers decode the same entry"""
+    memory = MemoryRedis()
+    monkeypatch.setattr(redis_client, "_redis_client", memory)
+
+    first = client.post("/fare/calc", json=PAYLOAD)
+    second = client.post("/fare/calc", json=PAYLOAD)
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert len(memory.data) == 1
+    assert json.loads(next(iter(memory.data.values()))) == first.json()
+    assert compute_fare(dict(PAYLOAD)).model_dump() == first.json()
+
+
+def test_eta_fast_path_matches_predict_eta(monkeypatch):
+    """/predict/eta returns the same result as predict_eta and still validates the body"""
+    monkeypatch.setattr(redis_client, "_redis_client", MemoryRedis())
+
+    response = client.post("/predict/eta", json=PAYLOAD)
+    assert response.status_code == 200
+    monkeypatch.setattr(eta_service, "cache_get", lambda key: None)
+    assert response.json() == eta_service.predict_eta(dict(PAYLOAD)).model_dump()
+
+    invalid = client.post("/predict/eta", json={**PAYLOAD, "origin": {"lat": 120, "lng": 77.5}})
+    assert invalid.status_code == 422
+    assert invalid.json()["detail"][0]["loc"] == ["origin", "lat"]
+    assert client.post("/predict/eta", content=b"{not json").status_code == 422
+
+
+def test_fare_cache_keys_traffic_and_surge_separately(monkeypatch):
+    """Trips whose traffic x surge products round alike are cached and priced separately"""
+    memory = MemoryRedis()
+    monkeypatch.setattr(redis_client, "_redis_client", memory)
+    surges = iter([1.4, 1.0])
+    monkeypatch.setattr(fare_service, "get_surge_multiplier", lambda coord: next(surges))
+
+    surged = client.post("/fare/calc", json={**PAYLOAD, "traffic_level": 1.1}).json()
+    congested = client.post("/fare/calc", json={**PAYLOAD, "traffic_level": 1.5}).json()
+
+    assert len(memory.data) == 2
+    assert surged["fare"] != congested["fare"]
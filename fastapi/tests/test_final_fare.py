@@ -0,0 +1,78 @@
+import time
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.services.fare_service import compute_final_fare
+
+client = TestClient(app)
+
+M_PER_DEG = 111195.0
+
+
+def _trace(drive_s=600, wait_s=300, noise_m=1.0, seed=0):
+    """Drive north at 10 m/s, stop, then drive on; 1 Hz fixes with GPS noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(drive_s + wait_s + drive_s, dtype=float) + 1.7e9
+    metres = np.concatenate([
+        np.arange(drive_s) * 10.0,
+        np.full(wait_s, drive_s * 10.0),
+        drive_s * 10.0 + np.arange(drive_s) * 10.0,
+    ])
+    lat = 12.9 + (metres + rng.normal(0, noise_m, len(t))) / M_PER_DEG
+    lng = 77.6 + rng.normal(0, noise_m, len(t)) / M_PER_DEG
+    return np.column_stack([t, lat, lng])
+
+
+def test_final_fare_filters_jitter_and_charges_waiting():
+    """Distance ignores noise and spikes; the stop is charged as waiting time"""
+    trace = _trace()
+    trace[100, 1] += 0.05  # 5 km spike
+    trace[1000, 2] -= 0.05
+
+    result = compute_final_fare(trace)
+
+    assert abs(result.distance_km - 12.0) < 0.12
+    assert abs(result.waiting_time_s - 300) < 30
+    expected = settings.base_fare + settings.per_km_rate * result.distance_km \
+        + settings.per_min_waiting_rate * result.waiting_time_s / 60
+    assert abs(result.fare - expected) < 0.02
+    assert result.points_used < result.points_received
+
+
+def test_final_fare_is_fast_on_large_traces():
+    """A 10k-point trace prices in a few milliseconds"""
+    trace = _trace(drive_s=4500, wait_s=1000)
+    compute_final_fare(trace)
+
+    start = time.perf_counter()
+    for _ in range(10):
+        compute_final_fare(trace)
+    assert (time.perf_counter() - start) / 10 < 0.02
+
+
+def test_final_fare_endpoint_accepts_json_and_binary():
+    """JSON and packed float64 bodies give the same fare"""
+    trace = _trace(drive_s=120, wait_s=60)
+
+    as_json = client.post("/fare/final", json={"points": trace.tolist()})
+    as_binary = client.post("/fare/final", content=trace.astype("<f8").tobytes(),
+                            headers={"Content-Type": "application/octet-stream"})
+
+    assert as_json.status_code == 200
+    assert as_binary.status_code == 200
+    assert as_json.json() == as_binary.json()
+
+    truncated = client.post("/fare/final", content=b"\x00" * 30,
+                            headers={"Content-Type": "application/octet-stream"})
+    assert truncated.status_code == 422
+    assert client.post("/fare/final", json={"points": [[1.0, 12.9]] * 3}).status_code == 422
+
+
+def test_final_fare_rejects_malformed_json():
+    """A truncated JSON body is a 422 with a serializable error, not a 500"""
+    response = client.post("/fare/final", content=b'{"points": [[1,2',
+                           headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
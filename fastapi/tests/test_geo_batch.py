@@ -0,0 +1,80 @@
+import asyncio
+from app.services import geo_service
+from app.services.geocode_scheduler import GeocodeScheduler, RateLimiter
+
+
+def test_batch_dedups_cells_and_resolves_misses(monkeypatch):
+    """Points in the same cell are resolved once; misses go through the scheduler"""
+    upstream = []
+
+    async def fetch(lat, lon):
+        upstream.append((lat, lon))
+        return geo_service.ReverseGeoResponse(city="Bengaluru", locality=f"cell {lat}")
+
+    def cache_get_many(points):
+        return [({"city": "Mumbai", "locality": "Bandra"}, 0.0) if lat == 19.06 else (None, None)
+                for lat, lon in points]
+
+    scheduler = GeocodeScheduler(fetch, limiter=RateLimiter(100.0, key=None), dedup_radius_m=0)
+    monkeypatch.setattr(geo_service, "get_local_geocoder", lambda: None)
+    monkeypatch.setattr(geo_service, "geo_cache_get_many", cache_get_many)
+    monkeypatch.setattr(geo_service, "get_geocode_scheduler", lambda: scheduler)
+
+    points = [(12.97161, 77.59461), (12.97162, 77.59462), (19.06, 72.83), (12.99, 77.61)]
+    results, stats = asyncio.run(geo_service.reverse_geocode_batch(points, timeout=5))
+
+    assert len(upstream) == 2
+    assert stats == {"points": 4, "unique": 3, "local": 0, "cache": 1, "upstream": 2, "unresolved": 0}
+    assert results[0] == results[1]
+    assert results[2].city == "Mumbai"
+    assert results[3].locality == "cell 12.99"
+
+
+def test_batch_returns_placeholders_after_timeout(monkeypatch):
+    """Misses still queued at the deadline come back as unresolved placeholders"""
+    async def fetch(lat, lon):
+        await asyncio.sleep(1)
+        return geo_service.ReverseGeoResponse(city="Late")
+
+    scheduler = GeocodeScheduler(fetch, limiter=RateLimiter(100.0, key=None))
+    monkeypatch.setattr(geo_service, "get_local_geocoder", lambda: None)
+    monkeypatch.setattr(geo_service, "geo_cache_get_many", lambda points: [(None, None)] * len(points))
+    monkeypatch.setattr(geo_service, "get_geocode_scheduler", lambda: scheduler)
+
+    async def scenario():
+        try:
+            return await geo_service.reverse_geocode_batch([(10.0, 70.0)], timeout=0.05)
+        finally:
+            await scheduler.stop()
+
+    results, stats = asyncio.run(scenario())
+
+    assert stats["unresolved"] == 1
+    assert results[0].formatted_address == "Location: 10.0, 70.0"
+
+
+def test_backfill_task_geocodes_ride_endpoints(monkeypatch, tmp_path):
+    """The backfill task extracts unique endpoint cells from a rides CSV"""
+    from app.tasks.tasks import geocode_backfill_task
+
+    path = tmp_path / "rides.csv"
+    path.write_text(
+        "origin_zone_lat,origin_zone_lng,dest_zone_lat,dest_zone_lng,eta_seconds\n"
+        "12.97,77.59,12.93,77.62,900\n"
+        "12.97,77.59,13.00,77.70,1500\n"
+    )
+    batches = []
+
+    async def fake_batch(points, priority=None, timeout=None):
+        batches.append(points)
+        counts = {"local": 0, "cache": 1, "upstream": len(points) - 1, "unresolved": 0}
+        return [], counts
+
+    monkeypatch.setattr(geo_service, "reverse_geocode_batch", fake_batch)
+
+    result = geocode_backfill_task.apply(kwargs={"dataset_path": str(path)}).get()
+
+    assert result["status"] == "completed"
+    assert result["total_points"] == 4
+    assert result["unique_cells"] == 3
+    assert sorted(batches[0]) == [(12.93, 77.62), (12.97, 77.59), (13.0, 77.7)]
@@ -0,0 +1,54 @@
+import json
+from app.utils import geo_cache
+from app.utils.geo_cache import GeoCacheStats, geo_cache_get
+
+
+class _FakeGeoRedis:
+    def __init__(self, nearby, values):
+        self.nearby = nearby
+        self.values = values
+        self.removed = []
+
+    def geosearch(self, name, **kwargs):
+        return [item for item in self.nearby if item[1] <= kwargs["radius"]]
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def zrem(self, name, *members):
+        self.removed.extend(members)
+
+
+def test_near_hit_reuses_nearby_result(monkeypatch):
+    """A miss on the exact key reuses the closest live entry within the radius"""
+    client = _FakeGeoRedis(
+        nearby=[("geo:12.9717:77.5947", 9.5), ("geo:12.9718:77.5946", 14.2)],
+        values={"rapidride:geo:12.9718:77.5946": json.dumps({"locality": "MG Road", "city": "Bengaluru"})}
+    )
+    monkeypatch.setattr(geo_cache, "get_redis", lambda: client)
+    monkeypatch.setattr(geo_cache, "cache_get", lambda key: None)
+    monkeypatch.setattr(geo_cache, "stats", GeoCacheStats())
+
+    cached, distance = geo_cache_get(12.9716, 77.5946, radius_m=50)
+
+    assert cached["locality"] == "MG Road"
+    assert distance == 14.2
+    assert client.removed == ["geo:12.9717:77.5947"]  # Expired value pruned from the index
+    assert geo_cache.stats.snapshot()["near_hit_distance_m"]["le_25m"] == 1
+
+
+def test_no_reuse_outside_radius_or_without_locality(monkeypatch):
+    """Entries beyond the radius or without a locality are not reused"""
+    client = _FakeGeoRedis(
+        nearby=[("geo:12.9720:77.5950", 20.0), ("geo:12.9730:77.5960", 180.0)],
+        values={
+            "rapidride:geo:12.9720:77.5950": json.dumps({"locality": None, "city": "Bengaluru"}),
+            "rapidride:geo:12.9730:77.5960": json.dumps({"locality": "Shivajinagar"}),
+        }
+    )
+    monkeypatch.setattr(geo_cache, "get_redis", lambda: client)
+    monkeypatch.setattr(geo_cache, "cache_get", lambda key: None)
+    monkeypatch.setattr(geo_cache, "stats", GeoCacheStats())
+
+    assert geo_cache_get(12.9716, 77.5946, radius_m=50) == (None, None)
+    assert geo_cache.stats.snapshot()["misses"] == 1
@@ -0,0 +1,48 @@
+import time
+from app.utils import geo_cache, geo_store
+from app.utils.geo_cache import GeoCacheStats, geo_cache_get, geo_cache_set
+from app.utils.geo_store import GeoStore
+
+
+def test_store_write_behind_and_lookup(tmp_path):
+    """Queued writes are committed in the background and served exact or nearby"""
+    store = GeoStore(str(tmp_path / "geo.sqlite3"), flush_interval_s=0.05)
+    store.put(12.9716, 77.5946, {"locality": "MG Road", "city": "Bengaluru"})
+    store.put(12.9800, 77.6000, {"locality": None, "city": "Bengaluru"})
+    assert store.flush(timeout=2)
+
+    assert store.lookup(12.9716, 77.5946, radius_m=50) == ({"locality": "MG Road", "city": "Bengaluru"}, 0.0)
+    value, distance = store.lookup(12.97172, 77.59471, radius_m=50)
+    assert value["locality"] == "MG Road"
+    assert 10 < distance < 25
+    # Entries without a locality are not reused for neighbours
+    assert store.lookup(12.98005, 77.60005, radius_m=50) == (None, None)
+    store.close()
+
+
+def test_store_survives_redis_loss(tmp_path, monkeypatch):
+    """With Redis empty or down, results are read through from the store"""
+    store = GeoStore(str(tmp_path / "geo.sqlite3"), flush_interval_s=0.05)
+    monkeypatch.setattr(geo_store, "_geo_store", store)
+    monkeypatch.setattr(geo_cache, "get_redis", lambda: None)
+    monkeypatch.setattr(geo_cache, "stats", GeoCacheStats())
+
+    geo_cache_set(12.9716, 77.5946, {"locality": "MG Road"})
+    store.flush(timeout=2)
+
+    assert geo_cache_get(12.9716, 77.5946) == ({"locality": "MG Road"}, 0.0)
+    assert geo_cache.stats.snapshot()["store_hits"] == 1
+    store.close()
+
+
+def test_compact_drops_stale_rows(tmp_path):
+    """Compaction removes rows older than the retention window"""
+    store = GeoStore(str(tmp_path / "geo.sqlite3"), flush_interval_s=0.05)
+    store.put(1.0, 1.0, {"locality": "old"})
+    store.put(2.0, 2.0, {"locality": "new"})
+    store.flush(timeout=2)
+    store._conn().execute("UPDATE geocodes SET updated_at = ? WHERE lat = 1.0", (time.time() - 10 * 86400,))
+
+    assert store.compact(max_age_days=5) == 1
+    assert store.count() == 1
+    store.close()
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from app.services.geocode_scheduler import (
+    GeocodeScheduler, RateLimiter, UpstreamThrottled, PRIORITY_LIVE, PRIORITY_BACKFILL
+)
+
+
+def _scheduler(fetch, rate_per_s=50.0, **kwargs):
+    return GeocodeScheduler(fetch, limiter=RateLimiter(rate_per_s, key=None),
+                            dedup_radius_m=50, negative_ttl_s=30, max_in_flight=4, **kwargs)
+
+
+def test_nearby_concurrent_lookups_share_one_call():
+    """Identical and nearby in-flight lookups are served by one upstream call"""
+    calls = []
+
+    async def fetch(lat, lon):
+        calls.append((lat, lon))
+        await asyncio.sleep(0.05)
+        return {"locality": "MG Road"}
+
+    async def scenario():
+        scheduler = _scheduler(fetch)
+        results = await asyncio.gather(
+            scheduler.lookup(12.97160, 77.59460),
+            scheduler.lookup(12.97160, 77.59460),
+            scheduler.lookup(12.97175, 77.59470),  # ~20 m away
+            scheduler.lookup(12.98500, 77.60500),  # ~2 km away
+        )
+        await scheduler.stop()
+        return results, scheduler.stats
+
+    results, stats = asyncio.run(scenario())
+
+    assert all(r == {"locality": "MG Road"} for r in results)
+    assert len(calls) == 2
+    assert stats["deduplicated"] == 2
+
+
+def test_rate_limit_and_live_priority():
+    """Calls are spaced at the configured rate and live jobs overtake queued backfills"""
+    calls = []
+
+    async def fetch(lat, lon):
+        calls.append((lat, time.monotonic()))
+        return {"locality": str(lat)}
+
+    async def scenario():
+        scheduler = _scheduler(fetch, rate_per_s=20.0)
+        backfill = [asyncio.create_task(scheduler.lookup(10 + i, 70, priority=PRIORITY_BACKFILL))
+                    for i in range(5)]
+        await asyncio.sleep(0.01)
+        live = await scheduler.lookup(50, 70, priority=PRIORITY_LIVE)
+        await asyncio.gather(*backfill)
+        await scheduler.stop()
+        return live
+
+    assert asyncio.run(scenario()) == {"locality": "50"}
+
+    order = [lat for lat, _ in calls]
+    assert order.index(50) <= 2
+    gaps = [b - a for (_, a), (_, b) in zip(calls, calls[1:])]
+    assert min(gaps) >= 0.04
+
+
+def test_failures_are_negatively_cached_and_throttling_pauses():
+    """A failed lookup is not retried within the negative TTL; a 429 pauses dispatch"""
+    calls = []
+
+    async def fetch(lat, lon):
+        calls.append(lat)
+        if lat == 1:
+            return None
+        raise UpstreamThrottled()
+
+    async def scenario():
+        scheduler = _scheduler(fetch)
+        first = await scheduler.lookup(1, 1)
+        second = await scheduler.lookup(1, 1)
+        throttled = await scheduler.lookup(2, 2, timeout=0.1)
+        paused = scheduler._paused_until > time.monotonic()
+        await scheduler.stop()
+        return first, second, throttled, paused, scheduler.stats
+
+    first, second, throttled, paused, stats = asyncio.run(scenario())
+
+    assert (first, second, throttled) == (None, None, None)
+    assert calls == [1, 2]
+    assert stats["negative_hits"] == 1
+    assert paused
+
+
+def test_throttled_job_is_retried_not_negatively_cached(monkeypatch):
+    """A job hit by a 429 is requeued after the pause and its callers get the retry's result"""
+    from app.services import geocode_scheduler
+    monkeypatch.setattr(geocode_scheduler, "THROTTLE_PAUSE_S", 0.05)
+    calls = []
+
+    async def fetch(lat, lon):
+        calls.append(lat)
+        if len(calls) == 1:
+            raise UpstreamThrottled()
+        return {"locality": "Indiranagar"}
+
+    async def scenario():
+        scheduler = _scheduler(fetch)
+        result = await scheduler.lookup(3, 3)
+        again = await scheduler.lookup(3, 3)
+        await scheduler.stop()
+        return result, again, scheduler.stats
+
+    result, again, stats = asyncio.run(scenario())
+
+    assert result == again == {"locality": "Indiranagar"}
+    assert stats["throttled"] == 1
+    assert stats["negative_hits"] == 0
+
+
+def test_backfill_waiting_for_slot_joins_job_queued_meanwhile():
+    """A backfill that waited for a queue slot reuses a job created for the same point"""
+    calls = []
+
+    async def fetch(lat, lon):
+        calls.append(lat)
+        await asyncio.sleep(0.05)
+        return {"locality": str(lat)}
+
+    async def scenario():
+        scheduler = _scheduler(fetch, backfill_queue_size=1)
+        first = asyncio.create_task(scheduler.lookup(10, 70, priority=PRIORITY_BACKFILL))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(scheduler.lookup(20, 70, priority=PRIORITY_BACKFILL))
+        await asyncio.sleep(0)
+        live = await scheduler.lookup(20, 70, priority=PRIORITY_LIVE)
+        results = await asyncio.gather(first, waiting)
+        await scheduler.stop()
+        return live, results, scheduler
+
+    live, results, scheduler = asyncio.run(scenario())
+
+    assert live == results[1] == {"locality": "20"}
+    assert calls.count(20) == 1
+    assert scheduler._backfill_slots._value == 1
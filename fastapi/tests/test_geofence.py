@@ -0,0 +1,98 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.geofence import GeofenceIndex, points_in_rings
+from app.services.pricing_engine import CompiledRules
+
+client = TestClient(app)
+
+
+def _feature(fence_id, kind, rings, multi=False):
+    geometry = {"type": "MultiPolygon", "coordinates": rings} if multi else {"type": "Polygon", "coordinates": rings}
+    return {"type": "Feature", "properties": {"id": fence_id, "kind": kind}, "geometry": geometry}
+
+
+def _star(lat, lng, r_outer, r_inner, points=9):
+    angles = np.linspace(0, 2 * np.pi, 2 * points, endpoint=False)
+    radii = np.where(np.arange(2 * points) % 2, r_inner, r_outer)
+    return [[lng + r * np.cos(a), lat + r * np.sin(a)] for a, r in zip(angles, radii)]
+
+
+def _box(lat0, lng0, lat1, lng1):
+    return [[lng0, lat0], [lng1, lat0], [lng1, lat1], [lng0, lat1], [lng0, lat0]]
+
+
+FEATURES = [
+    # Service area (a star with a hole, plus the area around the airport), an airport and a restricted zone
+    _feature("city", "service_area", [[_star(12.97, 77.59, 0.3, 0.15), _box(12.95, 77.57, 12.99, 77.61)],
+                                      [_box(13.15, 77.65, 13.25, 77.75)]], multi=True),
+    _feature("airport", "airport", [_box(13.18, 77.675, 13.225, 77.725)]),
+    _feature("cantonment", "restricted", [[_box(12.99, 77.63, 13.01, 77.66)], [_box(12.90, 77.50, 12.91, 77.52)]],
+             multi=True),
+]
+
+
+def test_grid_index_matches_exact_point_in_polygon():
+    """Grid answers agree with a brute-force even-odd test for every fence"""
+    index = GeofenceIndex(FEATURES, cell_deg=0.02, fine_factor=4)
+    rng = np.random.default_rng(3)
+    lat = 12.6 + rng.random(20000) * 0.7
+    lng = 77.2 + rng.random(20000) * 0.7
+
+    found = index.fences_at_many(lat, lng)
+    for fence, rings in enumerate(index.rings):
+        expected = points_in_rings(lat, lng, rings)
+        assert np.array_equal(expected, np.array([fence in hits for hits in found]))
+
+    assert index.fences_at(12.97, 77.59) == []  # In the hole
+    assert index.fences_at(12.97, 77.75) == [0]
+    assert index.stats()["fine_cells"] > 0
+
+
+def test_quotes_apply_zone_fees_and_reject_unserviceable(monkeypatch):
+    """Airport trips pay the zone fee; trips into restricted or uncovered areas get no fares"""
+    rules = CompiledRules({
+        "version": "geo-1",
+        "vehicles": {"bike": {"base": 10, "per_km": 5}, "car": {"base": 40, "per_km": 15}},
+        "zone_fees": [{"kind": "airport", "amount": 100, "vehicles": ["car"]}],
+    })
+    monkeypatch.setattr("app.services.fare_service.get_pricing_rules", lambda: rules)
+    monkeypatch.setattr("app.services.fare_service.get_geofences", lambda: GeofenceIndex(FEATURES))
+    monkeypatch.setattr("app.services.fare_service.get_surge_multiplier", lambda coord: 1.0)
+    city = {"lat": 12.97, "lng": 77.75}
+    quote = lambda destination: {"origin": city, "destination": destination, "eta_seconds": 600}
+
+    response = client.post("/fare/quote/batch", json={"quotes": [
+        quote({"lat": 12.85, "lng": 77.75}),
+        quote({"lat": 13.20, "lng": 77.70}),
+        quote({"lat": 13.00, "lng": 77.64}),
+        quote({"lat": 13.50, "lng": 77.59}),
+    ]})
+    assert response.status_code == 200
+    plain, airport, restricted, outside = response.json()["results"]
+
+    assert plain["serviceable"] and plain["zones"] == ["city"]
+    assert airport["zones"] == ["city", "airport"]
+    assert airport["fares"]["car"] == round(40 + 15 * airport["distance_km"] + 100, 2)
+    assert airport["fares"]["bike"] == round(10 + 5 * airport["distance_km"], 2)
+    assert restricted["fares"] == {} and restricted["unserviceable_reason"] == "drop is in a restricted area"
+    assert not outside["serviceable"] and outside["unserviceable_reason"] == "drop is outside the service area"
+
+
+def test_geofence_endpoints(monkeypatch):
+    """Single and batch membership lookups"""
+    monkeypatch.setattr("app.api.geo.get_geofences", lambda: GeofenceIndex(FEATURES))
+
+    single = client.get("/geo/geofence", params={"lat": 13.2, "lng": 77.7})
+    assert single.status_code == 200
+    assert [f["id"] for f in single.json()["fences"]] == ["city", "airport"]
+    assert single.json()["serviceable"]
+
+    batch = client.post("/geo/geofence/batch", json={"points": [
+        {"lat": 12.97, "lng": 77.75}, {"lat": 12.905, "lng": 77.51},
+    ]})
+    assert batch.status_code == 200
+    results = batch.json()["results"]
+    assert results[0]["serviceable"] and [f["kind"] for f in results[0]["fences"]] == ["service_area"]
+    assert [f["id"] for f in results[1]["fences"]] == ["city", "cantonment"]
+    assert not results[1]["serviceable"]
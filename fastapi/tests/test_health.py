@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+from app.services import health_service
+from app.services.health_service import HealthMonitor
+
+
+def test_slow_probe_times_out(monkeypatch):
+    """A hanging dependency is reported as failed within the probe timeout"""
+    monkeypatch.setattr(health_service, "PROBES", {
+        "fast": lambda: True,
+        "slow": lambda: time.sleep(1) or True,
+    })
+    monitor = HealthMonitor(interval_s=60, timeout_s=0.1)
+
+    async def scenario():
+        start = time.perf_counter()
+        snapshot = await monitor.get_snapshot()
+        return snapshot, time.perf_counter() - start
+
+    snapshot, elapsed = asyncio.run(scenario())
+
+    assert elapsed < 0.5
+    assert snapshot["fast"]["ok"] is True
+    assert snapshot["slow"]["ok"] is False
+    assert "timed out" in snapshot["slow"]["error"]
+
+
+def test_hung_probe_is_not_restarted_while_running(monkeypatch):
+    """A probe still stuck from a previous cycle is reported, not started again"""
+    release = threading.Event()
+    started = []
+
+    def hanging():
+        started.append(1)
+        release.wait(2)
+        return True
+
+    monkeypatch.setattr(health_service, "PROBES", {"hanging": hanging})
+    monitor = HealthMonitor(interval_s=60, timeout_s=0.05)
+
+    async def scenario():
+        await monitor.refresh()
+        await monitor.refresh()
+        second = monitor.snapshot["hanging"]
+        release.set()
+        await asyncio.sleep(0.05)
+        await monitor.refresh()
+        return second, monitor.snapshot["hanging"]
+
+    second, third = asyncio.run(scenario())
+
+    assert "still running" in second["error"]
+    assert third["ok"] is True
+    assert len(started) == 2
+
+
+def test_readiness_requires_fresh_passing_probes(monkeypatch):
+    """Ready only when the snapshot is fresh and required probes pass"""
+    monkeypatch.setattr(health_service, "PROBES", {"redis": lambda: False, "model": lambda: True})
+    monkeypatch.setattr(health_service.settings, "health_required_probes", "model")
+    monitor = HealthMonitor(interval_s=60, timeout_s=1)
+
+    assert monitor.is_ready() is False
+    asyncio.run(monitor.refresh())
+    assert monitor.is_ready() is True
+
+    monkeypatch.setattr(health_service.settings, "health_required_probes", "model,redis")
+    assert monitor.is_ready() is False
+
+    monitor.checked_at -= health_service.settings.health_max_age_s + 1
+    monkeypatch.setattr(health_service.settings, "health_required_probes", "model")
+    assert monitor.is_ready() is False
@@ -0,0 +1,64 @@
+import asyncio
+from aiohttp import web
+from app.utils.http_client import HttpClient, RetryBudget
+
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_get("/reverse", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/reverse"
+
+
+def test_transient_errors_are_retried_on_pooled_connections():
+    """A 503 is retried and the success is served over a reused connection"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.transport)
+        if len(calls) == 1:
+            return web.Response(status=503)
+        return web.json_response({"display_name": "Bengaluru"})
+
+    async def scenario():
+        runner, url = await _serve(handler)
+        client = HttpClient(max_retries=2)
+        try:
+            first = await client.get_json(url, params={"lat": 1, "lon": 2})
+            second = await client.get_json(url, params={"lat": 1, "lon": 2})
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first == (200, {"display_name": "Bengaluru"})
+    assert second == (200, {"display_name": "Bengaluru"})
+    assert len(calls) == 3
+    assert len({id(transport) for transport in calls}) == 1
+
+
+def test_retry_budget_limits_retries():
+    """Retries stop once the budget is spent, even below max_retries"""
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        return web.Response(status=503)
+
+    async def scenario():
+        runner, url = await _serve(handler)
+        client = HttpClient(max_retries=5, retry_budget=RetryBudget(ratio=0, min_per_s=0, cap=1))
+        try:
+            return await client.get_json(url)
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    assert asyncio.run(scenario()) == (503, None)
+    assert len(calls) == 2
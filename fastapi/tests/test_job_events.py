@@ -0,0 +1,140 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import eta as eta_api
+from app.core.config import settings
+from app.utils.job_events import JobNotifier
+
+client = TestClient(app)
+
+RESULT = {"status": "completed", "eta_seconds": 900.0, "confidence": 0.85}
+
+
+class FakeBackend:
+    """Result backend whose job finishes after a number of readiness checks"""
+
+    def __init__(self, checks_until_done):
+        self.checks_until_done = checks_until_done
+        self.checks = 0
+        self.loop_reads = 0
+
+    @property
+    def done(self):
+        return self.checks >= self.checks_until_done
+
+    def AsyncResult(self, job_id):
+        return _FakeAsyncResult(self)
+
+
+class _FakeAsyncResult:
+    def __init__(self, backend):
+        self.backend = backend
+        try:
+            asyncio.get_running_loop()
+            backend.loop_reads += 1
+        except RuntimeError:
+            pass
+
+    def ready(self):
+        self.backend.checks += 1
+        return self.backend.done
+
+    @property
+    def state(self):
+        return "SUCCESS" if self.backend.done else "PENDING"
+
+    @property
+    def result(self):
+        return RESULT
+
+
+def _use_backend(monkeypatch, backend, poll_interval_s=0.01):
+    monkeypatch.setattr(eta_api, "celery_app", SimpleNamespace(AsyncResult=backend.AsyncResult))
+    monkeypatch.setattr(eta_api, "get_job_notifier", lambda: JobNotifier())
+    monkeypatch.setattr(settings, "job_poll_interval_s", poll_interval_s)
+
+
+def test_notification_wakes_waiter_without_polling():
+    """A published completion resolves the waiter long before its timeout"""
+    checks = []
+
+    async def scenario():
+        notifier = JobNotifier()
+        notifier.connected = True
+        waiter = asyncio.create_task(notifier.wait_for("job1", 5, lambda: checks.append(1) or False))
+        await asyncio.sleep(0.05)
+        notifier._dispatch(json.dumps({"task_id": "other", "state": "SUCCESS"}))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        notifier._dispatch(json.dumps({"task_id": "job1", "state": "SUCCESS"}))
+        finished = await asyncio.wait_for(waiter, 1)
+        return finished, notifier._waiters
+
+    finished, waiters = asyncio.run(scenario())
+
+    assert finished is True
+    assert len(checks) == 1
+    assert waiters == {}
+
+
+def test_poll_fallback_while_disconnected(monkeypatch):
+    """Without a subscription the waiter polls the backend until the job is ready"""
+    monkeypatch.setattr(settings, "job_poll_interval_s", 0.01)
+    backend = FakeBackend(checks_until_done=4)
+    result = backend.AsyncResult("job2")
+
+    async def scenario():
+        notifier = JobNotifier()
+        finished = await notifier.wait_for("job2", 1, result.ready)
+        timed_out = await notifier.wait_for("job3", 0.05, lambda: False)
+        return finished, timed_out
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert backend.checks == 4
+
+
+def test_status_long_poll_returns_when_job_finishes(monkeypatch):
+    """?wait= holds the request until the job is done, reading the backend off the event loop"""
+    backend = FakeBackend(checks_until_done=3)
+    _use_backend(monkeypatch, backend)
+
+    start = time.monotonic()
+    response = client.get("/predict/eta/status/job4", params={"wait": 5})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.json()["result"] == {"eta_seconds": 900.0, "confidence": 0.85}
+    assert time.monotonic() - start < 2
+    assert backend.loop_reads == 0
+
+
+def test_stream_sends_current_then_final_status(monkeypatch):
+    """/eta/stream emits the pending status, then the final one, then closes"""
+    backend = FakeBackend(checks_until_done=3)
+    _use_backend(monkeypatch, backend)
+
+    response = client.get("/predict/eta/stream/job5")
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line[len("data: "):])
+        for line in response.text.splitlines() if line.startswith("data: ")
+    ]
+    assert [event["status"] for event in events] == ["pending", "completed"]
+    assert events[-1]["result"]["eta_seconds"] == 900.0
+    assert backend.loop_reads == 0
+
+
+def test_stream_times_out_with_keepalives(monkeypatch):
+    """A job that never finishes gets keep-alives and then a timeout event"""
+    _use_backend(monkeypatch, FakeBackend(checks_until_done=10 ** 6))
+    monkeypatch.setattr(settings, "job_stream_timeout_s", 0.2)
+    monkeypatch.setattr(settings, "job_stream_keepalive_s", 0.05)
+
+    text = client.get("/predict/eta/stream/job6").text
+
+    assert ": keep-alive" in text
+    assert text.rstrip().endswith("event: timeout\ndata: {}")
@@ -0,0 +1,73 @@
+import json
+import time
+import pandas as pd
+from app.services import geo_service
+from app.services.local_geocoder import LocalGeocoder, build_index
+
+
+def _build(tmp_path):
+    pd.DataFrame([
+        {"lat": 12.9352, "lon": 77.6245, "city": "Bengaluru", "locality": "Koramangala",
+         "state": "Karnataka", "country": "India", "postcode": "560034"},
+        {"lat": 12.9784, "lon": 77.6408, "city": "Bengaluru", "locality": "Indiranagar",
+         "state": "Karnataka", "country": "India", "postcode": "560038"},
+        {"lat": 19.0596, "lon": 72.8295, "city": "Mumbai", "locality": "Bandra West",
+         "state": "Maharashtra", "country": "India", "postcode": "400050"},
+    ]).to_csv(tmp_path / "places.csv", index=False)
+
+    # Square "city limits" around Koramangala with a hole in the middle
+    outer = [[77.60, 12.92], [77.65, 12.92], [77.65, 12.95], [77.60, 12.95], [77.60, 12.92]]
+    hole = [[77.620, 12.930], [77.630, 12.930], [77.630, 12.940], [77.620, 12.940], [77.620, 12.930]]
+    with open(tmp_path / "bounds.geojson", "w") as f:
+        json.dump({"type": "FeatureCollection", "features": [{
+            "type": "Feature",
+            "properties": {"city": "Bengaluru Urban"},
+            "geometry": {"type": "Polygon", "coordinates": [outer, hole]},
+        }]}, f)
+
+    out = tmp_path / "index"
+    build_index(str(tmp_path / "places.csv"), str(out), str(tmp_path / "bounds.geojson"))
+    return str(out)
+
+
+def test_lookup_returns_nearest_place(tmp_path):
+    """Nearest gazetteer point supplies the address, polygons override their fields"""
+    geocoder = LocalGeocoder(_build(tmp_path), max_km=3.0)
+
+    near_indiranagar = geocoder.lookup(12.9790, 77.6400)
+    assert near_indiranagar["locality"] == "Indiranagar"
+    assert near_indiranagar["postcode"] == "560038"
+    assert near_indiranagar["distance_km"] < 0.2
+
+    inside_boundary = geocoder.lookup(12.9250, 77.6100)
+    assert inside_boundary["locality"] == "Koramangala"
+    assert inside_boundary["city"] == "Bengaluru Urban"
+
+    in_hole = geocoder.lookup(12.9352, 77.6245)
+    assert in_hole["city"] == "Bengaluru"
+
+    assert geocoder.lookup(13.5, 78.5) is None
+
+
+def test_lookup_is_fast(tmp_path):
+    """Lookups stay well under a millisecond"""
+    geocoder = LocalGeocoder(_build(tmp_path), max_km=3.0)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        geocoder.lookup(19.06, 72.83)
+    per_lookup_us = (time.perf_counter() - start) * 1e6 / 1000
+
+    assert per_lookup_us < 1000
+
+
+def test_sync_geocode_uses_local_index(tmp_path, monkeypatch):
+    """reverse_geocode_sync answers from the index instead of returning Unknown"""
+    geocoder = LocalGeocoder(_build(tmp_path), max_km=3.0)
+    monkeypatch.setattr(geo_service, "get_local_geocoder", lambda: geocoder)
+
+    result = geo_service.reverse_geocode_sync(19.0600, 72.8300)
+
+    assert result.city == "Mumbai"
+    assert result.postal_code == "400050"
+    assert result.formatted_address == "Bandra West, Mumbai, Maharashtra 400050, India"
@@ -0,0 +1,94 @@
+import os
+import joblib
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import eta_service, model_manager
+from app.services.model_manager import ModelManager, Region
+
+client = TestClient(app)
+
+BANGALORE = {"lat": 12.9716, "lng": 77.5946}
+MUMBAI = {"lat": 19.0760, "lng": 72.8777}
+PUNE = {"lat": 18.5204, "lng": 73.8567}
+
+
+def _regions(tmp_path):
+    regions = []
+    for name, bounds in (("bangalore", [12.7, 77.3, 13.3, 77.9]),
+                         ("mumbai", [18.8, 72.7, 19.3, 73.1]),
+                         ("pune", [18.4, 73.7, 18.7, 74.0])):
+        path = tmp_path / f"{name}.pkl"
+        joblib.dump({"city": name, "weights": np.zeros(1000)}, path)
+        regions.append(Region(name, str(path), bounds))
+    return regions
+
+
+def test_routes_by_region_and_evicts_lru(tmp_path):
+    """Requests load their city's model on demand; the least recently used is evicted"""
+    regions = _regions(tmp_path)
+    size = os.path.getsize(regions[0].path)
+    manager = ModelManager(regions, default="bangalore", max_bytes=2 * size)
+
+    assert manager.region_for({"lat": 28.61, "lng": 77.21}) == "bangalore"  # Uncovered: default
+    assert manager.model_for(BANGALORE)["city"] == "bangalore"
+    assert manager.model_for(MUMBAI)["city"] == "mumbai"
+    assert manager.model_for(BANGALORE)["city"] == "bangalore"
+    assert manager.model_for(PUNE)["city"] == "pune"  # Over budget: mumbai goes
+
+    stats = manager.stats()["models"]
+    assert [name for name, s in stats.items() if s["loaded"]] == ["bangalore", "pune"]
+    assert stats["bangalore"]["hits"] == 1 and stats["bangalore"]["loads"] == 1
+    assert stats["mumbai"]["evictions"] == 1
+    assert manager.loaded_bytes <= 2 * size
+
+    assert manager.model_for(MUMBAI)["city"] == "mumbai"
+    assert manager.stats()["models"]["mumbai"]["loads"] == 2
+
+
+def test_reloads_changed_files_and_keeps_last_good(tmp_path, monkeypatch):
+    """Replaced model files are picked up; a broken file keeps the previous model"""
+    monkeypatch.setattr(model_manager.settings, "model_check_interval_s", 0)
+    regions = _regions(tmp_path)
+    manager = ModelManager(regions[:1], default="bangalore")
+    path = regions[0].path
+
+    assert manager.get("bangalore")["city"] == "bangalore"
+    joblib.dump({"city": "bangalore-v2"}, path)
+    os.utime(path, ns=(0, 10**18))
+    assert manager.get("bangalore")["city"] == "bangalore-v2"
+
+    with open(path, "wb") as f:
+        f.write(b"not a model")
+    os.utime(path, ns=(0, 2 * 10**18))
+    assert manager.get("bangalore")["city"] == "bangalore-v2"
+    assert manager.stats()["models"]["bangalore"]["load_errors"] == 1
+
+
+def test_batch_scores_each_region_with_its_model(tmp_path, monkeypatch):
+    """Batch misses are grouped per region; uncovered regions fall back to the baseline"""
+    regions = _regions(tmp_path)
+    monkeypatch.setattr(model_manager, "_manager", ModelManager(regions[:2], default=None))
+    monkeypatch.setattr(eta_service, "cache_get_many", lambda keys: [None] * len(keys))
+    monkeypatch.setattr(eta_service, "cache_set_many", lambda values, ttl: True)
+    calls = []
+
+    def fake_batch_predict(model, features_list):
+        calls.append((model["city"], len(features_list)))
+        return [(600.0 if model["city"] == "bangalore" else 900.0, 0.85)] * len(features_list)
+
+    monkeypatch.setattr("app.models.infer.batch_predict", fake_batch_predict)
+    timestamp = "2025-11-28T10:21:00+05:30"
+    offset = lambda c: {"lat": c["lat"] + 0.02, "lng": c["lng"]}
+    payloads = [{"origin": c, "destination": offset(c), "timestamp": timestamp}
+                for c in (BANGALORE, MUMBAI, BANGALORE, PUNE)]
+
+    results = eta_service.predict_eta_batch(payloads)
+
+    assert sorted(calls) == [("bangalore", 2), ("mumbai", 1)]
+    assert [r["eta_seconds"] for r in results[:3]] == [600, 900, 600]
+    assert results[3]["confidence"] == 0.7
+
+    response = client.get("/predict/models")
+    assert response.status_code == 200
+    assert response.json()["models"]["mumbai"]["loads"] == 1
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+import joblib
+import pytest
+from app.services import eta_service, model_manager
+from app.services.model_manager import ModelManager, Region
+from app.tasks import celery_app
+
+
+class HashRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+
+@pytest.fixture
+def counted_model(tmp_path, monkeypatch):
+    """Default-region model whose loads and predictions are counted"""
+    path = tmp_path / "bangalore.pkl"
+    joblib.dump({"city": "bangalore"}, path)
+    manager = ModelManager([Region("bangalore", str(path), None)], default="bangalore")
+    monkeypatch.setattr(model_manager, "_manager", manager)
+    monkeypatch.setattr(celery_app.settings, "model_preload", True)
+
+    counts = {"loads": 0, "predictions": 0}
+
+    def load_model(model_path, mmap_mode=None):
+        counts["loads"] += 1
+        return joblib.load(model_path)
+
+    def predict(model, features):
+        counts["predictions"] += 1
+        assert model["city"] == "bangalore"
+        return 600.0, 0.85
+
+    monkeypatch.setattr("app.models.infer.load_model", load_model)
+    monkeypatch.setattr("app.models.infer.predict", predict)
+    return counts
+
+
+def test_warm_model_loads_and_predicts_once(counted_model):
+    """Warm-up loads the default model and runs exactly one prediction"""
+    elapsed = eta_service.warm_model()
+
+    assert elapsed >= 0
+    assert counted_model == {"loads": 1, "predictions": 1}
+    assert eta_service.is_model_loaded()
+
+
+def test_warm_model_without_model_skips_prediction(monkeypatch, counted_model):
+    """With no usable model there is nothing to warm"""
+    monkeypatch.setattr(model_manager, "_manager", ModelManager([], default=None))
+
+    eta_service.warm_model()
+
+    assert counted_model == {"loads": 0, "predictions": 0}
+
+
+def test_worker_hooks_share_the_parent_load(monkeypatch, counted_model):
+    """The parent loads the model once; pool processes only warm it and report the time"""
+    monkeypatch.setattr(celery_app, "gc", SimpleNamespace(freeze=lambda: None))
+    redis = HashRedis()
+    monkeypatch.setattr(celery_app, "get_redis", lambda: redis)
+
+    celery_app.preload_model()
+    celery_app.warm_worker_process()
+    celery_app.warm_worker_process()
+
+    assert counted_model == {"loads": 1, "predictions": 3}
+    reported = redis.hashes[f"{celery_app.KEY_PREFIX}workers:time_to_first_prediction"]
+    assert len(reported) == 1
+    assert all(value >= 0 for value in reported.values())
+
+
+def test_worker_hooks_respect_preload_setting(monkeypatch, counted_model):
+    """MODEL_PRELOAD=false leaves loading to the first request"""
+    monkeypatch.setattr(celery_app.settings, "model_preload", False)
+
+    celery_app.preload_model()
+    celery_app.warm_worker_process()
+
+    assert counted_model == {"loads": 0, "predictions": 0}
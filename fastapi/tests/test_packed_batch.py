@@ -0,0 +1,100 @@
+import math
+from datetime import datetime
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.services.packed_batch import (
+    MEDIA_TYPE, OP_ETA, OP_FARE, OP_GEOFENCE, STATUS_INVALID, STATUS_OK, STATUS_UNSERVICEABLE,
+    QUERY_DTYPE, decode_results, encode_queries
+)
+
+client = TestClient(app)
+
+TIMESTAMP = "2025-11-28T10:21:00+05:30"
+ORIGIN = {"lat": 12.9716, "lng": 77.5946}
+DESTINATION = {"lat": 12.9352, "lng": 77.6245}
+AIRPORT = {"lat": 13.2, "lng": 77.7}
+DELHI = {"lat": 28.6, "lng": 77.2}
+
+
+def post_packed(queries):
+    response = client.post("/batch/packed", content=encode_queries(queries), headers={"Content-Type": MEDIA_TYPE})
+    assert response.status_code == 200
+    vehicle_types = response.headers["X-Vehicle-Types"].split(",")
+    assert int(response.headers["X-Record-Size"]) == 48 + 8 * len(vehicle_types)
+    return decode_results(response.content, len(vehicle_types)), vehicle_types, response.headers
+
+
+def test_packed_results_match_json_endpoints():
+    """Fare, ETA and geofence answers in one frame match the JSON endpoints"""
+    unix_ts = datetime.fromisoformat(TIMESTAMP).timestamp()
+    trip = {"origin": ORIGIN, "destination": AIRPORT, "timestamp": unix_ts, "traffic_level": 1.2}
+    results, vehicle_types, headers = post_packed([
+        {**trip, "op": OP_FARE},
+        {**trip, "op": OP_ETA},
+        {"op": OP_GEOFENCE, "origin": AIRPORT},
+    ])
+
+    quote = client.post("/fare/quote", json={**trip, "timestamp": TIMESTAMP}).json()
+    assert results[0]["status"] == STATUS_OK
+    assert dict(zip(vehicle_types, results[0]["fares"].tolist())) == quote["fares"]
+    assert math.isclose(results[0]["distance_km"], quote["distance_km"])
+    assert headers["X-Rules-Version"] == quote["rules_version"]
+    fences = headers["X-Geofences"].split(",")
+    assert [f for i, f in enumerate(fences) if results[0]["dest_fences"] >> i & 1] == quote["zones"]
+    assert np.isnan(results[0]["eta_seconds"])
+
+    eta = client.post("/predict/eta", json={**trip, "timestamp": TIMESTAMP}).json()
+    assert results[1]["eta_seconds"] == eta["eta_seconds"]
+    assert results[1]["confidence"] == eta["confidence"]
+    assert np.isnan(results[1]["fares"]).all()
+
+    membership = client.get("/geo/geofence", params=AIRPORT).json()
+    assert [f for i, f in enumerate(fences) if results[2]["origin_fences"] >> i & 1] == [
+        fence["id"] for fence in membership["fences"]
+    ]
+
+
+def test_packed_statuses_and_fare_with_predicted_eta():
+    """Unserviceable and invalid queries are flagged; fare+ETA prices the predicted duration"""
+    results, _, _ = post_packed([
+        {"op": OP_FARE | OP_ETA, "origin": ORIGIN, "destination": DESTINATION},
+        {"op": OP_FARE, "origin": ORIGIN, "destination": DELHI},
+        {"op": OP_GEOFENCE, "origin": DELHI},
+        {"op": 8, "origin": ORIGIN},
+        {"op": OP_ETA, "origin": ORIGIN, "destination": {"lat": 95.0, "lng": 77.6}},
+        {"op": OP_FARE, "origin": ORIGIN, "destination": DESTINATION, "traffic_level": 9.0},
+    ])
+
+    assert results[0]["status"] == STATUS_OK
+    assert results[0]["duration_min"] == round(results[0]["eta_seconds"] / 60, 1)
+    assert results[1]["status"] == STATUS_UNSERVICEABLE
+    assert np.isnan(results[1]["fares"]).all()
+    assert results[2]["status"] == STATUS_UNSERVICEABLE
+    assert results["status"][3:].tolist() == [STATUS_INVALID] * 3
+
+
+def test_packed_frame_errors(monkeypatch):
+    """Truncated frames are rejected and oversized batches refused"""
+    body = encode_queries([{"op": OP_GEOFENCE, "origin": ORIGIN}] * 3)
+    assert len(body) == 3 * QUERY_DTYPE.itemsize
+    assert client.post("/batch/packed", content=body[:-1], headers={"Content-Type": MEDIA_TYPE}).status_code == 422
+
+    monkeypatch.setattr(settings, "packed_batch_max_queries", 2)
+    assert client.post("/batch/packed", content=body, headers={"Content-Type": MEDIA_TYPE}).status_code == 413
+    assert len(client.post("/batch/packed", content=b"", headers={"Content-Type": MEDIA_TYPE}).content) == 0
+
+
+def test_packed_prices_with_the_snapshot_it_describes(monkeypatch):
+    """Fares are priced with the same rules and fences the headers describe, even across a reload"""
+    def reloaded():
+        raise AssertionError("pricing must reuse the frame's snapshot")
+
+    monkeypatch.setattr("app.services.fare_service.get_pricing_rules", reloaded)
+    monkeypatch.setattr("app.services.fare_service.get_geofences", reloaded)
+
+    results, vehicle_types, _ = post_packed([{"op": OP_FARE, "origin": ORIGIN, "destination": AIRPORT}])
+
+    assert results[0]["status"] == STATUS_OK
+    assert not np.isnan(results[0]["fares"]).any()
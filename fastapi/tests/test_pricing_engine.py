@@ -0,0 +1,104 @@
+import json
+import os
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import pricing_engine
+from app.services.pricing_engine import CompiledRules, get_pricing_rules, minute_of_week
+
+client = TestClient(app)
+
+RULES = {
+    "version": "test-1",
+    "vehicles": {
+        "bike": {"base": 10, "per_km": 5, "per_min": 1, "minimum": 30, "surge_cap": 1.5},
+        "car": {"base": 40, "per_km": 15, "per_min": 2, "minimum": 60, "surge_cap": 3.0},
+    },
+    "time_bands": [
+        {"name": "night", "start": "23:00", "end": "05:00", "multiplier": 1.5},
+        {"name": "peak", "start": "08:00", "end": "10:00", "days": [0, 1, 2, 3, 4],
+         "multiplier": 2.0, "vehicles": ["car"]},
+    ],
+}
+
+
+def test_rules_evaluate_all_vehicles_in_one_pass():
+    """Rates, bands, surge caps and minimums apply per vehicle"""
+    rules = CompiledRules(RULES)
+    monday_noon = minute_of_week("2025-11-24T12:00:00+05:30")
+    monday_peak = minute_of_week("2025-11-24T09:00:00+05:30")
+    tuesday_early = minute_of_week("2025-11-25T02:00:00+05:30")  # Monday's night band
+    saturday_peak = minute_of_week("2025-11-29T09:00:00+05:30")
+
+    fares = rules.evaluate(
+        distance_km=np.array([10.0, 10.0, 10.0, 10.0, 0.5]),
+        duration_min=np.array([20.0, 20.0, 20.0, 20.0, 2.0]),
+        minute_of_week=np.array([monday_noon, monday_peak, tuesday_early, saturday_peak, monday_noon]),
+        surge=np.array([1.0, 1.0, 1.0, 1.0, 1.0]),
+    )
+    assert fares.tolist() == [
+        [80.0, 230.0],
+        [80.0, 460.0],
+        [120.0, 345.0],
+        [80.0, 230.0],
+        [30.0, 60.0],
+    ]
+
+    surged = rules.evaluate(np.array([10.0]), np.array([20.0]), np.array([monday_noon]), np.array([2.0]))
+    assert surged.tolist() == [[120.0, 460.0]]
+
+
+def test_utc_timestamps_use_local_time_bands():
+    """A "Z" timestamp is banded by its local time, the same as its +05:30 equivalent"""
+    rules = CompiledRules(RULES)
+    monday_peak_utc = minute_of_week("2025-11-24T03:30:00Z")  # 09:00 IST
+    monday_night_utc = minute_of_week("2025-11-24T18:00:00Z")  # 23:30 IST
+
+    assert monday_peak_utc == minute_of_week("2025-11-24T09:00:00+05:30")
+    fares = rules.evaluate(np.array([10.0, 10.0]), np.array([20.0, 20.0]),
+                           np.array([monday_peak_utc, monday_night_utc]), np.array([1.0, 1.0]))
+    assert fares.tolist() == [[80.0, 460.0], [120.0, 345.0]]
+
+
+def test_rules_hot_reload_and_keep_last_good(tmp_path, monkeypatch):
+    """Rule file edits are picked up without a restart; broken edits are ignored"""
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(RULES))
+    monkeypatch.setattr(pricing_engine.settings, "pricing_rules_path", str(path))
+    monkeypatch.setattr(pricing_engine.settings, "pricing_rules_check_interval_s", 0)
+    monkeypatch.setattr(pricing_engine, "_rules", None)
+    monkeypatch.setattr(pricing_engine, "_rules_version", None)
+
+    assert get_pricing_rules().version == "test-1"
+
+    path.write_text(json.dumps({**RULES, "version": "test-2"}))
+    os.utime(path, ns=(0, 10**18))
+    assert get_pricing_rules().version == "test-2"
+
+    path.write_text('{"vehicles": {"bike": {"base": "cheap"}}}')
+    os.utime(path, ns=(0, 2 * 10**18))
+    assert get_pricing_rules().version == "test-2"
+
+
+def test_quote_endpoints(monkeypatch):
+    """Single and batch quotes price the requested vehicle types"""
+    monkeypatch.setattr("app.services.fare_service.get_pricing_rules", lambda: CompiledRules(RULES))
+    quote = {
+        "origin": {"lat": 12.9716, "lng": 77.5946},
+        "destination": {"lat": 12.9352, "lng": 77.6245},
+        "timestamp": "2025-11-24T12:00:00+05:30",
+        "eta_seconds": 900,
+    }
+
+    single = client.post("/fare/quote", json=quote)
+    assert single.status_code == 200
+    data = single.json()
+    assert set(data["fares"]) == {"bike", "car"}
+    assert data["rules_version"] == "test-1"
+    assert data["fares"]["car"] == round(40 + 15 * data["distance_km"] + 2 * 15, 2)
+
+    batch = client.post("/fare/quote/batch", json={"quotes": [quote, {**quote, "vehicle_types": ["bike"]}]})
+    assert batch.status_code == 200
+    results = batch.json()["results"]
+    assert results[0] == data
+    assert set(results[1]["fares"]) == {"bike"}
@@ -0,0 +1,168 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.tasks import tasks
+from app.tasks.tasks import bulk_eta_chunk_task, merge_bulk_eta_results
+from app.utils import result_store
+from app.utils.result_store import _next_id
+
+client = TestClient(app)
+
+
+class StreamRedis:
+    """In-memory stand-in for the stream and hash commands the result store uses"""
+
+    def __init__(self):
+        self.streams = {}
+        self.hashes = {}
+        self.last_ms = 1700000000000
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def xadd(self, key, fields):
+        stream = self.streams.setdefault(key, [])
+        stream_id = f"{self.last_ms}-{len(stream)}"
+        stream.append((stream_id, dict(fields)))
+        return stream_id
+
+    def xrange(self, key, min="-", max="+", count=None):
+        def order(stream_id):
+            ms, seq = stream_id.split("-")
+            return int(ms), int(seq)
+
+        entries = [
+            entry for entry in self.streams.get(key, [])
+            if min == "-" or order(entry[0]) >= order(min)
+        ]
+        return entries[:count] if count else entries
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.hashes.setdefault(key, {})
+        if field is not None:
+            fields[field] = str(value)
+        for name, item in (mapping or {}).items():
+            fields[name] = str(item)
+
+    def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def expire(self, key, ttl):
+        return True
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = StreamRedis()
+    monkeypatch.setattr(result_store, "get_redis", lambda: fake)
+    monkeypatch.setattr(tasks, "get_redis", lambda: None)
+    return fake
+
+
+def _rows(start, n):
+    return [{"request_id": f"req_{i}", "eta_seconds": 600.0 + i} for i in range(start, start + n)]
+
+
+def test_next_id_is_strictly_after_cursor():
+    """Cursor paging starts just after the last entry returned"""
+    assert _next_id("1700000000000-4") == "1700000000000-5"
+    assert _next_id("1700000000000") == "1700000000000-1"
+
+
+def test_append_and_page_with_cursor(redis):
+    """Appended chunks are read back in order, page by page, with running status"""
+    assert result_store.append_results("job1", _rows(0, 3))
+    assert result_store.append_results("job1", _rows(3, 2))
+
+    first = result_store.read_results("job1", limit=3)
+    second = result_store.read_results("job1", cursor=first["next_cursor"], limit=3)
+    empty = result_store.read_results("job1", cursor=second["next_cursor"], limit=3)
+
+    assert [row["request_id"] for row in first["items"] + second["items"]] == [f"req_{i}" for i in range(5)]
+    assert empty["items"] == []
+    assert empty["next_cursor"] == second["next_cursor"]
+    assert first["meta"] == {"status": "running", "stored": 5, "total": None}
+
+
+def test_mark_complete_records_status_and_total(redis):
+    """Final status and total are visible through the job metadata"""
+    result_store.append_results("job2", _rows(0, 2))
+    result_store.mark_complete("job2", 2, status="failed")
+
+    assert result_store.get_job_meta("job2") == {"status": "failed", "stored": 2, "total": 2}
+    assert result_store.get_job_meta("missing") is None
+
+
+def test_store_unavailable(monkeypatch):
+    """Appends report failure and reads raise when Redis is down"""
+    monkeypatch.setattr(result_store, "get_redis", lambda: None)
+
+    assert not result_store.append_results("job3", _rows(0, 1))
+    assert not result_store.mark_complete("job3", 1)
+    with pytest.raises(RuntimeError):
+        result_store.read_results("job3")
+
+
+def test_results_endpoint_pages_until_complete(redis):
+    """GET /tasks/{id}/results pages through stored rows and reports completion"""
+    result_store.append_results("job4", _rows(0, 3))
+
+    page = client.get("/tasks/job4/results", params={"limit": 2}).json()
+    assert [row["request_id"] for row in page["items"]] == ["req_0", "req_1"]
+    assert page["complete"] is False
+    assert page["stored"] == 3
+
+    result_store.mark_complete("job4", 3)
+    page = client.get("/tasks/job4/results", params={"cursor": page["next_cursor"]}).json()
+    assert [row["request_id"] for row in page["items"]] == ["req_2"]
+    assert page["complete"] is True
+    assert page["total"] == 3
+
+    assert client.get("/tasks/unknown/results").status_code == 404
+
+
+def test_failed_chunk_marks_job_failed(redis):
+    """A chunk that cannot be scored fails the job instead of stalling the chord"""
+    good = bulk_eta_chunk_task.run([{"id": "ok", "origin": {"lat": 12.9, "lng": 77.6},
+                                     "destination": {"lat": 12.95, "lng": 77.62}}], 0, "job5", 2)
+    bad = bulk_eta_chunk_task.run([{"id": "broken"}], 1, "job5", 2)
+
+    assert good["stored"] is True
+    assert "error" in bad
+
+    summary = merge_bulk_eta_results([good, bad], job_id="job5")
+    assert summary["status"] == "failed"
+    assert "results_url" not in summary
+    assert result_store.get_job_meta("job5")["status"] == "failed"
+    assert client.get("/tasks/job5/results").json()["complete"] is True
+
+
+def test_partially_stored_results_are_not_mixed(redis):
+    """If only some chunks reached the store, the job fails rather than returning a subset"""
+    stored = {"count": 2, "stored": True, "results": []}
+    inline = {"count": 1, "stored": False, "results": _rows(2, 1)}
+
+    summary = merge_bulk_eta_results([stored, inline], job_id="job6")
+
+    assert summary["status"] == "failed"
+    assert "results" not in summary and "results_url" not in summary
+    assert result_store.get_job_meta("job6")["status"] == "failed"
+
+    complete = merge_bulk_eta_results([stored, dict(stored)], job_id="job7")
+    assert complete["results_url"] == "/tasks/job7/results"
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from datetime import datetime
+import pytest
+from app.models.trainer import ETAModelTrainer
+from app.services.ride_ingest import RideIngestor, SEGMENT_COLUMNS, parse_ride_completed
+from app.utils.rmq_consumer import Message
+from app.utils.segment_store import SegmentStore, load_segments, read_manifest
+
+
+def _event(i):
+    return {
+        "event_type": "ride_completed",
+        "ride_id": f"ride_{i}",
+        "origin": {"lat": 12.9716, "lng": 77.5946},
+        "destination": {"lat": 12.9352, "lng": 77.6245 + i * 0.001},
+        "started_at": "2025-11-28T10:21:00+05:30",
+        "completed_at": "2025-11-28T10:41:00+05:30",
+        "route_distance_km": 7.5,
+    }
+
+
+def _message(i, body=None):
+    return Message(queue="ride_completed", body=body or json.dumps(_event(i)).encode(),
+                   delivery_tag=i + 1, redelivered=False)
+
+
+def test_parse_ride_completed():
+    """Event fields map onto trainer features and the duration target"""
+    row = parse_ride_completed(_event(0))
+
+    assert row["eta_seconds"] == 1200
+    assert row["distance_km"] == 7.5
+    assert row["hour"] == 10
+    assert row["avg_speed_kmh"] == pytest.approx(22.5)
+    assert set(row) == set(SEGMENT_COLUMNS)
+
+
+def test_parse_rejects_unusable_events():
+    """Events without a usable duration or coordinates are skipped"""
+    assert parse_ride_completed({**_event(0), "completed_at": "2025-11-28T10:00:00+05:30"}) is None
+    assert parse_ride_completed({"destination": {"lat": 12.9, "lng": 77.6}}) is None
+
+
+def test_epoch_and_iso_timestamps_agree():
+    """Epoch (s/ms) and ISO timestamps for the same instant give the same features"""
+    iso = parse_ride_completed(_event(0))
+    started = datetime.fromisoformat(_event(0)["started_at"]).timestamp()
+    epoch = parse_ride_completed({**_event(0), "started_at": started, "completed_at": (started + 1200) * 1000})
+
+    assert epoch == iso
+    utc = parse_ride_completed({**_event(0), "started_at": "2025-11-28T04:51:00Z"})
+    assert utc["hour"] == 10
+
+
+def test_ingest_writes_fixed_size_segments(tmp_path):
+    """Full segments are written as rows arrive; the trainer reads the directory directly"""
+    store = SegmentStore(str(tmp_path), SEGMENT_COLUMNS, segment_rows=4)
+    ingestor = RideIngestor(store, max_age_s=60, compact_interval_s=60)
+
+    async def scenario():
+        first = asyncio.create_task(ingestor.handle([_message(i) for i in range(3)]))
+        await asyncio.sleep(0)
+        assert not first.done()  # Not durable yet, so not acked yet
+        second = asyncio.create_task(ingestor.handle(
+            [_message(i) for i in range(3, 6)] + [_message(99, body=b"not json")]
+        ))
+        await asyncio.wait_for(first, 1)
+        assert not second.done()  # Two of its rows are still buffered
+        await ingestor.flush()
+        await asyncio.wait_for(second, 1)
+
+    asyncio.run(scenario())
+
+    assert [seg["rows"] for seg in read_manifest(str(tmp_path))] == [4, 2]
+    assert ingestor.skipped == 1
+    df = ETAModelTrainer().load_data(str(tmp_path))
+    assert len(df) == 6
+    assert set(SEGMENT_COLUMNS) <= set(df.columns)
+
+
+def test_compaction_merges_small_segments(tmp_path):
+    """Short segments from time-based flushes are merged into full-size ones"""
+    store = SegmentStore(str(tmp_path), SEGMENT_COLUMNS, segment_rows=4)
+    for i in range(4):
+        store.append([parse_ride_completed(_event(i))])
+        store.flush()
+
+    merged = store.compact()
+
+    assert merged == 4
+    assert [seg["rows"] for seg in read_manifest(str(tmp_path))] == [4]
+    assert len(load_segments(str(tmp_path))) == 4
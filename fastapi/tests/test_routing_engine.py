@@ -0,0 +1,89 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from app.services import routing_engine
+from app.services.routing_engine import RoutingEngine, build_from_edges, build_graph
+
+
+def _grid(tmp_path, size=20, step=0.002):
+    """Two-way street grid; every 4th row is a faster one-way (eastbound) avenue"""
+    lat, lon, src, dst, speed = [], [], [], [], []
+    for r in range(size):
+        for c in range(size):
+            lat.append(12.9 + r * step)
+            lon.append(77.6 + c * step)
+    for r in range(size):
+        for c in range(size):
+            v = r * size + c
+            if c + 1 < size:
+                if r % 4 == 0:
+                    src.append(v), dst.append(v + 1), speed.append(50)
+                else:
+                    src += [v, v + 1]; dst += [v + 1, v]; speed += [20, 20]
+            if r + 1 < size:
+                src += [v, v + size]; dst += [v + size, v]; speed += [20, 20]
+    out = str(tmp_path / "routing")
+    build_from_edges(np.array(lat), np.array(lon), np.array(src), np.array(dst),
+                     np.array(speed, dtype=float), out, n_landmarks=4)
+    return out
+
+
+def test_route_matches_dijkstra(tmp_path):
+    """A* with landmarks returns the exact shortest travel time"""
+    engine = RoutingEngine(_grid(tmp_path))
+    graph = csr_matrix((np.array(engine._time), np.array(engine._indices), np.array(engine._indptr)),
+                       shape=(engine.n, engine.n))
+    rng = np.random.default_rng(0)
+    for source, target in rng.integers(0, engine.n, size=(20, 2)):
+        expected = dijkstra(graph, indices=int(source))[int(target)]
+        time_s, _ = engine._shortest(int(source), int(target))
+        assert abs(time_s - expected) < 1e-3
+
+
+def test_route_respects_one_way_and_snaps(tmp_path):
+    """Driving distance exceeds straight-line, and one-way avenues are asymmetric"""
+    engine = RoutingEngine(_grid(tmp_path))
+    west = {"lat": 12.9, "lng": 77.6}
+    east = {"lat": 12.9, "lng": 77.638}
+
+    there = engine.route(west, east)
+    back = engine.route(east, west)
+    assert there["distance_km"] > 4.0
+    assert back["duration_s"] > there["duration_s"]
+
+    diagonal = engine.route({"lat": 12.9001, "lng": 77.6001}, {"lat": 12.93, "lng": 77.63})
+    assert diagonal["distance_km"] > routing_engine.haversine_km(
+        {"lat": 12.9, "lng": 77.6}, {"lat": 12.93, "lng": 77.63})
+    assert engine.route(west, {"lat": 13.5, "lng": 77.6}) is None
+
+    many = engine.route_many(west, [east, {"lat": 12.93, "lng": 77.63}, {"lat": 13.5, "lng": 77.6}])
+    assert many[0] == there
+    assert many[1]["duration_s"] == engine.route(west, {"lat": 12.93, "lng": 77.63})["duration_s"]
+    assert many[2] is None
+
+
+def test_build_graph_from_osm(tmp_path, monkeypatch):
+    """OSM ways become directed edges; footways are dropped; trip distance uses the graph"""
+    (tmp_path / "map.osm").write_text("""<?xml version="1.0"?>
+<osm version="0.6">
+  <node id="1" lat="12.900" lon="77.600"/>
+  <node id="2" lat="12.900" lon="77.610"/>
+  <node id="3" lat="12.910" lon="77.610"/>
+  <node id="4" lat="12.910" lon="77.600"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="primary"/></way>
+  <way id="11"><nd ref="3"/><nd ref="4"/><nd ref="1"/><tag k="highway" v="residential"/><tag k="oneway" v="yes"/></way>
+  <way id="12"><nd ref="1"/><nd ref="3"/><tag k="highway" v="footway"/></way>
+</osm>""")
+    out = tmp_path / "routing"
+    meta = build_graph(str(tmp_path / "map.osm"), str(out), n_landmarks=2)
+    assert meta["nodes"] == 4
+    assert meta["edges"] == 6
+
+    engine = RoutingEngine(str(out))
+    monkeypatch.setattr(routing_engine, "_engine", engine)
+    monkeypatch.setattr(routing_engine, "_engine_checked", True)
+    monkeypatch.setattr(routing_engine.settings, "distance_source", "routing")
+
+    # 1 -> 3 must go round via 2 (the footway diagonal is not drivable)
+    distance = routing_engine.trip_distance_km({"lat": 12.9, "lng": 77.6}, {"lat": 12.91, "lng": 77.61})
+    assert 2.1 < distance < 2.3
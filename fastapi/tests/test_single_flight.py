@@ -0,0 +1,127 @@
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import eta as eta_api
+from app.tasks.tasks import async_eta_prediction_task
+from app.utils import single_flight
+
+client = TestClient(app)
+
+PAYLOAD = {
+    "origin": {"lat": 12.9716, "lng": 77.5946},
+    "destination": {"lat": 12.9352, "lng": 77.6245},
+    "timestamp": "2025-11-28T10:21:00+05:30",
+    "traffic_level": 1.0
+}
+
+
+class ClaimRedis:
+    """In-memory stand-in for SET NX / GET and the release script"""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def eval(self, script, numkeys, key, owner_id):
+        if self.data.get(key) == owner_id:
+            del self.data[key]
+            return 1
+        return 0
+
+
+class _FakeTask:
+    def __init__(self):
+        self.submitted = []
+
+    def apply_async(self, args=None, task_id=None):
+        self.submitted.append(task_id)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = ClaimRedis()
+    monkeypatch.setattr(single_flight, "get_redis", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def queue(monkeypatch, redis):
+    task = _FakeTask()
+    monkeypatch.setattr(eta_api, "async_eta_prediction_task", task)
+    monkeypatch.setattr(eta_api, "cache_get", lambda key: None)
+    return task
+
+
+def test_claim_is_exclusive_until_released(redis):
+    """The first claimant owns the key; only the owner can release it"""
+    assert single_flight.claim("k", "job-a", 60) is None
+    assert single_flight.claim("k", "job-b", 60) == "job-a"
+
+    assert not single_flight.release("k", "job-b")
+    assert single_flight.release("k", "job-a")
+    assert single_flight.claim("k", "job-b", 60) is None
+
+
+def test_claim_without_redis_never_coalesces(monkeypatch):
+    """With Redis down every caller does its own work"""
+    monkeypatch.setattr(single_flight, "get_redis", lambda: None)
+
+    assert single_flight.claim("k", "job-a", 60) is None
+    assert single_flight.claim("k", "job-b", 60) is None
+    assert not single_flight.release("k", "job-a")
+
+
+def test_identical_async_requests_share_a_job(queue):
+    """A second identical request gets the first request's job ID and enqueues nothing"""
+    first = client.post("/predict/eta/async", json=PAYLOAD).json()
+    second = client.post("/predict/eta/async", json=PAYLOAD).json()
+    other = client.post("/predict/eta/async", json={**PAYLOAD, "traffic_level": 2.0}).json()
+
+    assert second["job_id"] == first["job_id"]
+    assert second["status"] == "pending"
+    assert other["job_id"] != first["job_id"]
+    assert queue.submitted == [first["job_id"], other["job_id"]]
+
+
+def test_cached_async_request_completes_immediately(monkeypatch, queue, redis):
+    """A cache hit returns the result without claiming or enqueuing"""
+    stored = []
+    monkeypatch.setattr(eta_api, "cache_get", lambda key: {"eta_seconds": 720.0, "confidence": 0.9})
+    monkeypatch.setattr(eta_api, "celery_app", SimpleNamespace(backend=SimpleNamespace(
+        store_result=lambda job_id, result, state: stored.append((job_id, state))
+    )))
+
+    response = client.post("/predict/eta/async", json=PAYLOAD).json()
+
+    assert response["status"] == "completed"
+    assert response["result"] == {"eta_seconds": 720.0, "confidence": 0.9}
+    assert stored == [(response["job_id"], "SUCCESS")]
+    assert queue.submitted == []
+    assert redis.data == {}
+
+
+def test_failed_task_releases_its_claim(monkeypatch, queue, redis):
+    """When the prediction fails the claim is dropped so the next request enqueues afresh"""
+    def broken(request_data):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr("app.services.eta_service.predict_eta", broken)
+    first = client.post("/predict/eta/async", json=PAYLOAD).json()
+    assert len(redis.data) == 1
+
+    result = async_eta_prediction_task.apply(args=[PAYLOAD], task_id=first["job_id"]).get()
+
+    assert result["status"] == "failed"
+    assert redis.data == {}
+    retry = client.post("/predict/eta/async", json=PAYLOAD).json()
+    assert retry["job_id"] != first["job_id"]
+    assert queue.submitted == [first["job_id"], retry["job_id"]]
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import numpy as np
+from app.services import surge_engine
+from app.services.fare_service import compute_fare
+from app.services.surge_engine import SurgeConsumer, SurgeEngine, get_surge_multiplier, publish_snapshot
+from app.utils.rmq_consumer import Message
+
+KORAMANGALA = {"lat": 12.9352, "lng": 77.6245}
+ZONE = "129_776"
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def get(self, key):
+        return self.values.get(key)
+
+
+def _requests(engine, n, now, point=KORAMANGALA):
+    engine.record_requests(np.full(n, point["lat"]), np.full(n, point["lng"]), now=now)
+
+
+def test_demand_surges_and_expires_with_window():
+    """Requests per available driver drive the multiplier; old requests fall out"""
+    engine = SurgeEngine(window_s=60, bucket_s=10, driver_ttl_s=600)
+    for i in range(4):
+        engine.record_driver(f"d{i}", KORAMANGALA["lat"], KORAMANGALA["lng"], True, now=1000)
+    _requests(engine, 25, now=1000)
+
+    for step in range(6):
+        surging = engine.tick(now=1001 + step)
+    # 25 requests / (4 + 1) drivers = 5 -> 1 + 0.5 * (5 - 1)
+    assert surging == {ZONE: 3.0}
+
+    # A few more drivers come online
+    for i in range(4, 9):
+        engine.record_driver(f"d{i}", KORAMANGALA["lat"], KORAMANGALA["lng"], True, now=1010)
+    for step in range(6):
+        surging = engine.tick(now=1011 + step)
+    assert surging == {ZONE: 1.8}
+
+    for step in range(8):
+        surging = engine.tick(now=1070 + step)
+    assert surging == {}
+    assert engine.stats()["requests_in_window"] == 0
+
+
+def test_drivers_move_go_offline_and_expire():
+    """Supply follows each driver's latest event and drops silent drivers"""
+    engine = SurgeEngine(window_s=60, bucket_s=10, driver_ttl_s=30)
+    other = {"lat": 13.05, "lng": 77.59}
+
+    engine.record_driver("a", KORAMANGALA["lat"], KORAMANGALA["lng"], True, now=100)
+    engine.record_driver("b", KORAMANGALA["lat"], KORAMANGALA["lng"], True, now=100)
+    engine.record_driver("a", other["lat"], other["lng"], True, now=105)
+    assert engine.supply[:2].tolist() == [1, 1]
+
+    engine.record_driver("b", 0.0, 0.0, False, now=112)
+    assert engine.supply[:2].tolist() == [0, 1]
+
+    engine.record_driver("c", KORAMANGALA["lat"], KORAMANGALA["lng"], True, now=125)
+    engine.tick(now=131)  # "a" last seen in the 100-110 bucket
+    assert engine.supply[:2].tolist() == [1, 0]
+    assert engine.stats()["available_drivers"] == 1
+
+
+def test_consumer_handlers_parse_events():
+    """Request and driver events from the queues land in the engine"""
+    engine = SurgeEngine()
+    handlers = SurgeConsumer(engine)
+
+    def message(body):
+        return Message(queue="q", body=json.dumps(body).encode(), delivery_tag=1, redelivered=False)
+
+    asyncio.run(handlers.handle_requests([
+        message({"pickup": KORAMANGALA}),
+        message({"origin": {"lat": 12.94, "lng": 77.63}}),
+        message({"ride_id": "no location"}),
+    ]))
+    asyncio.run(handlers.handle_drivers([
+        message({"driver_id": 7, "location": KORAMANGALA, "status": "online"}),
+        message({"driver_id": 8, "location": KORAMANGALA, "available": False}),
+        message({"status": "online"}),
+    ]))
+
+    assert engine.stats()["requests_in_window"] == 2
+    assert engine.stats()["available_drivers"] == 1
+    assert handlers.skipped == 2
+
+
+def test_published_snapshot_feeds_fare(monkeypatch):
+    """Workers read the shared snapshot and compute_fare applies the zone multiplier"""
+    client = _FakeRedis()
+    monkeypatch.setattr(surge_engine, "get_redis", lambda: client)
+    monkeypatch.setattr(surge_engine, "_snapshot_checked_at", None)
+    monkeypatch.setattr("app.services.fare_service.cache_get", lambda key: None)
+    monkeypatch.setattr("app.services.fare_service.cache_set", lambda key, value, ttl: True)
+    payload = {"origin": KORAMANGALA, "destination": {"lat": 12.9716, "lng": 77.5946}}
+
+    base = compute_fare(payload).fare
+    assert publish_snapshot({ZONE: 1.5})
+    monkeypatch.setattr(surge_engine, "_snapshot_checked_at", None)
+
+    assert get_surge_multiplier(KORAMANGALA) == 1.5
+    assert get_surge_multiplier({"lat": 19.06, "lng": 72.83}) == 1.0
+    assert abs(compute_fare(payload).fare - base * 1.5) < 0.02